@@ -13,6 +13,110 @@ MYSQL_USER = os.getenv("MYSQL_USER")
 MYSQL_PASS = os.getenv("MYSQL_PASS")
 MYSQL_DB = os.getenv("MYSQL_DB")
 
+# Database executor configuration (blocking pymysql calls run here, off the event loop)
+DB_EXECUTOR_WORKERS = int(os.getenv("DB_EXECUTOR_WORKERS", "8"))
+
+# Database connection pool configuration (seconds for all timeouts)
+DB_POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "1"))
+DB_POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", str(DB_EXECUTOR_WORKERS)))
+DB_POOL_MAX_LIFETIME = float(os.getenv("DB_POOL_MAX_LIFETIME", "1800"))
+DB_POOL_IDLE_TIMEOUT = float(os.getenv("DB_POOL_IDLE_TIMEOUT", "300"))
+DB_POOL_WAIT_TIMEOUT = float(os.getenv("DB_POOL_WAIT_TIMEOUT", "10"))
+
+# Circuit breaker: consecutive failures or timeouts before queries fail fast, and seconds until a
+# probe query is let through (doubling after each failed probe, up to the maximum)
+DB_BREAKER_FAILURE_THRESHOLD = int(os.getenv("DB_BREAKER_FAILURE_THRESHOLD", "3"))
+DB_BREAKER_RESET_TIMEOUT = float(os.getenv("DB_BREAKER_RESET_TIMEOUT", "30"))
+DB_BREAKER_MAX_RESET_TIMEOUT = float(os.getenv("DB_BREAKER_MAX_RESET_TIMEOUT", "300"))
+
+# Query deadlines in seconds: socket read/write ceiling, and the default per-query deadline
+# (query classes tighten it per method in QUERY_TIMEOUTS)
+DB_READ_TIMEOUT = float(os.getenv("DB_READ_TIMEOUT", "30"))
+DB_QUERY_TIMEOUT = float(os.getenv("DB_QUERY_TIMEOUT", "20"))
+
+# Read-only SQLite copy of coverage/ODC/ODP/customer data served while MySQL is down
+# (empty path disables), and seconds between background refreshes of it
+OFFLINE_SNAPSHOT_PATH = os.getenv("OFFLINE_SNAPSHOT_PATH", "offline_snapshot.sqlite3")
+OFFLINE_SNAPSHOT_INTERVAL = float(os.getenv("OFFLINE_SNAPSHOT_INTERVAL", "900"))
+
+# Seconds the coverage location list is served from memory before its change check runs again
+LOCATION_CACHE_TTL = float(os.getenv("LOCATION_CACHE_TTL", "300"))
+
+# Query result cache: memory budget, TTLs for coverage/ODC/ODP-only and customer-dependent
+# queries, extra seconds a hot entry may be served while it refreshes in the background,
+# and seconds between polls of table update times (any change invalidates dependent results)
+QUERY_CACHE_MAX_BYTES = int(os.getenv("QUERY_CACHE_MAX_BYTES", str(32 * 1024 * 1024)))
+TOPOLOGY_CACHE_TTL = float(os.getenv("TOPOLOGY_CACHE_TTL", "600"))
+CUSTOMER_CACHE_TTL = float(os.getenv("CUSTOMER_CACHE_TTL", "120"))
+QUERY_CACHE_STALE_TTL = float(os.getenv("QUERY_CACHE_STALE_TTL", "60"))
+TABLE_VERSION_POLL_INTERVAL = float(os.getenv("TABLE_VERSION_POLL_INTERVAL", "15"))
+
+# Seconds between change checks of the in-memory per-ODP used-port summary
+PORT_USAGE_REFRESH_INTERVAL = float(os.getenv("PORT_USAGE_REFRESH_INTERVAL", "30"))
+
+# Seconds between change checks of the in-memory customer search index
+CUSTOMER_INDEX_REFRESH_INTERVAL = float(os.getenv("CUSTOMER_INDEX_REFRESH_INTERVAL", "60"))
+
+# Seconds between change checks of the in-memory coverage/ODC/ODP/customer topology snapshot
+TOPOLOGY_REFRESH_INTERVAL = float(os.getenv("TOPOLOGY_REFRESH_INTERVAL", "60"))
+
+# Typo-tolerant name suggestions: maximum edit distance per word and time budget per query
+FUZZY_MAX_EDIT_DISTANCE = int(os.getenv("FUZZY_MAX_EDIT_DISTANCE", "2"))
+FUZZY_SEARCH_BUDGET_MS = float(os.getenv("FUZZY_SEARCH_BUDGET_MS", "50"))
+
+# Customers per search result page (one Telegram message per page)
+CUSTOMER_SEARCH_PAGE_SIZE = int(os.getenv("CUSTOMER_SEARCH_PAGE_SIZE", "8"))
+
+# ODPs per page of the port availability view (one Telegram message per page)
+PORT_PAGE_SIZE = int(os.getenv("PORT_PAGE_SIZE", "10"))
+
+# Telegram user ids allowed to run admin commands such as /utilization (comma-separated)
+ADMIN_USER_IDS = {int(user_id) for user_id in os.getenv("ADMIN_USER_IDS", "").split(",") if user_id.strip()}
+
+# Nearest ODP search from a shared location: results shown, search radius in km, and grid
+# cell size of the in-memory ODP index in degrees (0.01° is about 1.1 km)
+NEAREST_ODP_COUNT = int(os.getenv("NEAREST_ODP_COUNT", "5"))
+NEAREST_ODP_MAX_DISTANCE_KM = float(os.getenv("NEAREST_ODP_MAX_DISTANCE_KM", "10"))
+NEAREST_ODP_CELL_DEGREES = float(os.getenv("NEAREST_ODP_CELL_DEGREES", "0.01"))
+
+# Raw coordinate strings whose parsed decimal value is kept in memory
+COORDINATE_CACHE_SIZE = int(os.getenv("COORDINATE_CACHE_SIZE", "8192"))
+
+# Read the lat_decimal/lng_decimal columns filled by tools/backfill_coordinates.py, so maps
+# links are built without parsing (enable only after the columns have been added)
+COORDINATE_DECIMAL_COLUMNS = os.getenv("COORDINATE_DECIMAL_COLUMNS", "false").lower() in ("1", "true", "yes")
+
+# Per-user session store bounds: users kept, idle seconds before eviction, total memory budget
+SESSION_MAX_USERS = int(os.getenv("SESSION_MAX_USERS", "500"))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", "1800"))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", str(64 * 1024 * 1024)))
+
+# Updates handled at the same time across all chats; one chat's updates are always handled in order
+MAX_CONCURRENT_UPDATES = int(os.getenv("MAX_CONCURRENT_UPDATES", "16"))
+
+# Worker processes; above 1 a front process receives updates and shards them by chat id,
+# each worker running the full handler stack with its own sessions, caches and DB pool
+BOT_WORKERS = int(os.getenv("BOT_WORKERS", "1"))
+
+# Conversation states and session data survive restarts in this SQLite file (empty disables);
+# changes are written in the background at most every PERSISTENCE_FLUSH_INTERVAL seconds.
+# With BOT_WORKERS above 1 each worker keeps its own file (bot_state.worker0.sqlite3, ...);
+# changing the worker count moves chats between workers, so their saved state is not found
+PERSISTENCE_PATH = os.getenv("PERSISTENCE_PATH", "bot_state.sqlite3")
+PERSISTENCE_FLUSH_INTERVAL = float(os.getenv("PERSISTENCE_FLUSH_INTERVAL", "5"))
+
+# Update delivery: "polling" (default) or "webhook"
+BOT_MODE = os.getenv("BOT_MODE", "polling").lower()
+
+# Webhook mode: local listen address and path; WEBHOOK_URL is the public URL registered with
+# Telegram (leave empty to run the server without registering, e.g. for local testing)
+WEBHOOK_LISTEN = os.getenv("WEBHOOK_LISTEN", "127.0.0.1")
+WEBHOOK_PORT = int(os.getenv("WEBHOOK_PORT", "8443"))
+WEBHOOK_PATH = os.getenv("WEBHOOK_PATH", "telegram")
+WEBHOOK_URL = os.getenv("WEBHOOK_URL", "")
+WEBHOOK_SECRET_TOKEN = os.getenv("WEBHOOK_SECRET_TOKEN", "")
+WEBHOOK_MAX_CONNECTIONS = int(os.getenv("WEBHOOK_MAX_CONNECTIONS", "40"))
+
 # Logging configuration
 logging.basicConfig(
     format="%(asctime)s - %(name)s - %(levelname)s - %(message)s",
@@ -27,4 +131,7 @@ def validate_environment():
     if missing_vars:
         raise EnvironmentError(f"Missing required environment variables: {missing_vars}")
     
+    if BOT_MODE not in ("polling", "webhook"):
+        raise EnvironmentError(f"BOT_MODE must be 'polling' or 'webhook', got '{BOT_MODE}'")
+    
     return True
\ No newline at end of file
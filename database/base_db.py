@@ -1,13 +1,186 @@
 import pymysql
+import asyncio
+import functools
 import logging
-from config.settings import MYSQL_HOST, MYSQL_USER, MYSQL_PASS, MYSQL_DB, MYSQL_PORT
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config.settings import (
+    MYSQL_HOST, MYSQL_USER, MYSQL_PASS, MYSQL_DB, MYSQL_PORT, DB_EXECUTOR_WORKERS,
+    DB_POOL_MIN_SIZE, DB_POOL_MAX_SIZE, DB_POOL_MAX_LIFETIME, DB_POOL_IDLE_TIMEOUT, DB_POOL_WAIT_TIMEOUT,
+    QUERY_CACHE_MAX_BYTES, TABLE_VERSION_POLL_INTERVAL, DB_BREAKER_FAILURE_THRESHOLD, DB_BREAKER_RESET_TIMEOUT,
+    DB_BREAKER_MAX_RESET_TIMEOUT, OFFLINE_SNAPSHOT_PATH, OFFLINE_SNAPSHOT_INTERVAL, DB_READ_TIMEOUT, DB_QUERY_TIMEOUT
+)
+from database.connection_pool import ConnectionPool, PoolTimeoutError
+from database.query_cache import QueryCache, TableVersions
+from database.circuit_breaker import CircuitBreaker
+from database.offline_snapshot import OfflineSnapshot, SnapshotRows
 from contextlib import contextmanager
 import time
 
 logger = logging.getLogger(__name__)
 
+# Bounded executor shared by all query classes so blocking pymysql calls never run on the event loop
+db_executor = ThreadPoolExecutor(max_workers=DB_EXECUTOR_WORKERS, thread_name_prefix="db")
+
+class QueryTimeoutError(pymysql.OperationalError):
+    """A query ran past its deadline (client side or MAX_EXECUTION_TIME on the server)"""
+
+
+class CircuitOpenError(pymysql.OperationalError):
+    """The circuit breaker is failing queries fast and no offline snapshot can answer"""
+
+
+# Deadline of the query method running on this executor thread, as a time.monotonic() value
+_deadline = threading.local()
+
+@contextmanager
+def query_deadline(seconds):
+    """Queries run inside share one deadline seconds from now; nested deadlines only tighten"""
+    previous = getattr(_deadline, 'at', None)
+    at = time.monotonic() + seconds
+    _deadline.at = at if previous is None else min(previous, at)
+    try:
+        yield
+    finally:
+        _deadline.at = previous
+
+@contextmanager
+def refresh_queries():
+    """Queries run inside refresh an in-memory structure rather than answer the current request
+
+    They get a DB_QUERY_TIMEOUT deadline of their own instead of the request's, and they are
+    not counted by the circuit breaker: a slow rebuild says nothing about whether MySQL is up.
+    """
+    previous = getattr(_deadline, 'at', None), getattr(_deadline, 'uncounted', False)
+    _deadline.at = time.monotonic() + DB_QUERY_TIMEOUT
+    _deadline.uncounted = True
+    try:
+        yield
+    finally:
+        _deadline.at, _deadline.uncounted = previous
+
+def _query_timeout():
+    """Seconds the next query may take: DB_QUERY_TIMEOUT, or less if the method's deadline is closer"""
+    at = getattr(_deadline, 'at', None)
+    if at is None:
+        return DB_QUERY_TIMEOUT
+    return min(DB_QUERY_TIMEOUT, at - time.monotonic())
+
+class AsyncQueryProxy:
+    """Awaitable view of a query object: every public method runs in the database executor
+
+    A method listed in the target's QUERY_TIMEOUTS runs under that many seconds of deadline.
+    """
+
+    def __init__(self, target):
+        self._target = target
+
+    def __getattr__(self, name):
+        method = getattr(self._target, name)
+        if not callable(method):
+            return method
+        timeout = getattr(self._target, 'QUERY_TIMEOUTS', {}).get(name)
+
+        def call(*args, **kwargs):
+            if timeout is None:
+                return method(*args, **kwargs)
+            with query_deadline(timeout):
+                return method(*args, **kwargs)
+
+        @functools.wraps(method)
+        async def run_in_executor(*args, **kwargs):
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(db_executor, functools.partial(call, *args, **kwargs))
+
+        return run_in_executor
+
+# One pool shared by every query class; created on first use
+_pool = None
+_pool_lock = threading.Lock()
+
+class _Flight:
+    """One in-flight query execution that identical concurrent calls wait on"""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+# Single-flight state shared by every query class: (query, params, row_type) -> _Flight
+_flights = {}
+_flights_lock = threading.Lock()
+_flight_stats = {
+    'executed': 0,
+    'coalesced': 0,
+}
+
+# Result cache for queries that pass a CachePolicy, invalidated through per-table versions
+query_cache = QueryCache(QUERY_CACHE_MAX_BYTES)
+table_versions = TableVersions(TABLE_VERSION_POLL_INTERVAL)
+
+# While MySQL is unreachable reads are answered from a local snapshot instead
+circuit_breaker = CircuitBreaker(DB_BREAKER_FAILURE_THRESHOLD, DB_BREAKER_RESET_TIMEOUT, DB_BREAKER_MAX_RESET_TIMEOUT)
+offline_snapshot = OfflineSnapshot(OFFLINE_SNAPSHOT_PATH, OFFLINE_SNAPSHOT_INTERVAL)
+
+# ER_QUERY_TIMEOUT from MAX_EXECUTION_TIME, and CR_SERVER_LOST when the client read timeout fires
+SERVER_TIMEOUT_ERRNO = 3024
+SERVER_LOST_ERRNO = 2013
+
+# CR_CONN_HOST_ERROR, CR_SERVER_GONE_ERROR and CR_SERVER_LOST: the server is unreachable or the
+# connection dropped. Other OperationalErrors (deadlocks, lock wait timeouts) are the server answering.
+CONNECTION_LOST_ERRNOS = frozenset((2003, 2006, SERVER_LOST_ERRNO))
+
+def _errno(error):
+    return error.args[0] if error.args else None
+
+def is_connection_failure(error):
+    """Whether error says MySQL is unreachable or the connection is gone, as opposed to a failed statement"""
+    if isinstance(error, (pymysql.InterfaceError, PoolTimeoutError)):
+        return True
+    return isinstance(error, pymysql.OperationalError) and _errno(error) in CONNECTION_LOST_ERRNOS
+
+# Extra seconds the socket read timeout allows past the deadline, so the server-side limit fires first
+READ_TIMEOUT_GRACE = 1.0
+
+def _with_execution_time_hint(query, timeout):
+    """Add a MAX_EXECUTION_TIME optimizer hint to a SELECT (ignored by servers without it)"""
+    return re.sub(
+        r"^\s*SELECT\b", f"SELECT /*+ MAX_EXECUTION_TIME({max(int(timeout * 1000), 1)}) */", query,
+        count=1, flags=re.IGNORECASE
+    )
+
+@contextmanager
+def _narrowed_read_timeout(conn, seconds):
+    """Lower conn's socket read timeout to seconds for the duration, then restore DB_READ_TIMEOUT
+
+    pymysql has no public way to change read_timeout after connecting; it keeps the value in
+    the private _read_timeout and applies it to every socket read. Written against pymysql
+    1.1.0 as pinned in requirements.txt: re-check this attribute when upgrading. Without it
+    the connect-time DB_READ_TIMEOUT still applies and only the server-side limit is tighter.
+    """
+    if not hasattr(conn, '_read_timeout'):
+        yield
+        return
+    conn._read_timeout = seconds
+    try:
+        yield
+    finally:
+        conn._read_timeout = DB_READ_TIMEOUT
+
+def _own_copy(rows):
+    """New list of the same rows; offline snapshot results keep their as_of"""
+    if isinstance(rows, SnapshotRows):
+        return SnapshotRows(rows, rows.as_of)
+    return list(rows)
+
 class BaseDatabase:
     """Base database class with common connection functionality"""
+
+    # method name -> seconds all its queries together may take when called through .aio
+    QUERY_TIMEOUTS = {}
     
     def __init__(self):
         self.connection_params = {
@@ -17,8 +190,31 @@ class BaseDatabase:
             'password': MYSQL_PASS,
             'db': MYSQL_DB,
             'cursorclass': pymysql.cursors.DictCursor,
-            'connect_timeout': 10
+            'connect_timeout': 10,
+            # Ceiling for any single socket read/write; per-query deadlines are usually shorter
+            'read_timeout': DB_READ_TIMEOUT,
+            'write_timeout': DB_READ_TIMEOUT,
+            # Pooled connections are reused, so never leave a read snapshot open between queries
+            'autocommit': True
         }
+        self.aio = AsyncQueryProxy(self)
+
+    @property
+    def pool(self):
+        """Shared connection pool"""
+        global _pool
+        if _pool is None:
+            with _pool_lock:
+                if _pool is None:
+                    _pool = ConnectionPool(
+                        self.connection_params,
+                        min_size=DB_POOL_MIN_SIZE,
+                        max_size=DB_POOL_MAX_SIZE,
+                        max_lifetime=DB_POOL_MAX_LIFETIME,
+                        idle_timeout=DB_POOL_IDLE_TIMEOUT,
+                        wait_timeout=DB_POOL_WAIT_TIMEOUT
+                    )
+        return _pool
     
     def get_connection(self):
         """Get database connection"""
@@ -30,30 +226,187 @@ class BaseDatabase:
 
     @contextmanager
     def get_db_connection(self):
-        """Context manager for database connections"""
-        connection = None
+        """Context manager for pooled database connections"""
+        pooled = None
+        discard = False
         try:
-            connection = self.get_connection()
-            yield connection
+            pooled = self.pool.acquire()
+            yield pooled.connection
         except Exception as e:
             logger.error(f"Database error in context manager: {e}")
-            if connection:
+            if pooled:
+                # Connection-level failures leave the socket in an unknown state; a statement the
+                # server rejected or stopped (deadlock, MAX_EXECUTION_TIME) leaves it usable
+                discard = is_connection_failure(e)
                 try:
-                    connection.rollback()
+                    pooled.connection.rollback()
                 except:
-                    pass
+                    discard = True
             raise
         finally:
-            if connection:
-                try:
-                    connection.close()
-                except Exception as e:
-                    logger.error(f"Error closing connection: {e}")
+            if pooled:
+                self.pool.release(pooled, discard=discard)
     
-    def execute_query(self, query, params=None):
-        """Execute a single query and return results"""
+    def execute_query(self, query, params=None, row_type=None, coalesce=True, cache=None):
+        """Execute a single query and return results
+
+        Rows are dicts by default; with a Record subclass as row_type they are read
+        through a plain tuple cursor and mapped into that compact record type.
+        Identical calls made while one is already running wait for it and share its rows
+        instead of running again; pass coalesce=False for statements that must each run.
+        With a CachePolicy as cache, results are reused until its TTL passes or one of
+        its tables changes. Rows may be shared with other callers: treat them as read-only.
+        """
+        key = (query, params, row_type)
+        try:
+            hash(key)
+        except TypeError:
+            coalesce = False
+            cache = None
+
+        if cache is not None:
+            # Versions are read before the query runs, so a change racing it invalidates the entry
+            versions = table_versions.current(self, cache.tables)
+            cached, revalidate = query_cache.get(key, versions)
+            if cached is not None:
+                if revalidate:
+                    db_executor.submit(self._revalidate, key, cache)
+                return list(cached)
+            result = self._execute_once(key)
+            if getattr(result, "as_of", None) is not None:
+                # Offline snapshot rows must not outlive the outage in the cache
+                return result
+            query_cache.put(key, result, versions, cache)
+            return list(result)
+
+        if not coalesce:
+            return self._run_query(query, params, row_type)
+        return self._execute_once(key)
+
+    def _execute_once(self, key):
+        """Run the query, or wait for an identical one already running and share its result"""
+        with _flights_lock:
+            flight = _flights.get(key)
+            leader = flight is None
+            if leader:
+                flight = _flights[key] = _Flight()
+                _flight_stats['executed'] += 1
+            else:
+                _flight_stats['coalesced'] += 1
+
+        if not leader:
+            if not flight.done.wait(max(_query_timeout(), 0)):
+                raise QueryTimeoutError(SERVER_LOST_ERRNO, "Deadline passed waiting for an identical query")
+            if flight.error is not None:
+                raise flight.error
+            # Own list per caller; the rows themselves are shared
+            return _own_copy(flight.result)
+
+        try:
+            flight.result = self._run_query(*key)
+            return flight.result
+        except Exception as e:
+            flight.error = e
+            raise
+        finally:
+            with _flights_lock:
+                del _flights[key]
+            flight.done.set()
+
+    def _revalidate(self, key, cache):
+        """Refresh a hot cache entry in the background while callers are served the stale one"""
+        try:
+            versions = table_versions.current(self, cache.tables)
+            result = self._execute_once(key)
+            if getattr(result, "as_of", None) is None:
+                query_cache.put(key, result, versions, cache)
+        except Exception as e:
+            logger.warning(f"Background cache refresh failed: {e}")
+        finally:
+            query_cache.end_revalidation(key)
+
+    def get_cache_stats(self):
+        """Result cache counters plus the current table versions"""
+        stats = query_cache.get_stats()
+        stats['table_versions'] = table_versions.get_versions()
+        return stats
+
+    def get_coalesce_stats(self):
+        """Query executions vs. calls served by an identical in-flight execution"""
+        with _flights_lock:
+            stats = dict(_flight_stats)
+            stats['in_flight'] = len(_flights)
+        calls = stats['executed'] + stats['coalesced']
+        stats['coalesce_ratio'] = stats['coalesced'] / calls if calls else 0.0
+        return stats
+
+    def _run_query(self, query, params, row_type):
+        """Execute the query on MySQL, or on the offline snapshot while MySQL is unreachable"""
+        timeout = _query_timeout()
+        if timeout <= 0:
+            # The method's deadline passed on earlier queries; not counted against the database
+            raise QueryTimeoutError(SERVER_LOST_ERRNO, "Query deadline passed before it started")
+
+        counted = not getattr(_deadline, 'uncounted', False)
+        # Refreshes never take the half-open probe, since their outcome is not recorded
+        allowed = circuit_breaker.allow() if counted else not circuit_breaker.is_open
+        if not allowed:
+            if offline_snapshot.is_available:
+                return offline_snapshot.execute(query, params, row_type)
+            raise CircuitOpenError(SERVER_LOST_ERRNO, "Database circuit open, failing fast")
+
+        started = time.monotonic()
+        try:
+            result = self._run_mysql_query(query, params, row_type, timeout)
+        except Exception as e:
+            errno = _errno(e)
+            timed_out = isinstance(e, pymysql.OperationalError) and (errno == SERVER_TIMEOUT_ERRNO or (
+                errno == SERVER_LOST_ERRNO and time.monotonic() - started >= timeout
+            ))
+            if not timed_out and not is_connection_failure(e):
+                # The server answered, even if with an error (a deadlock or lock wait timeout
+                # included), so the failure count is left alone; only a probe closes the circuit
+                if counted and circuit_breaker.is_open:
+                    circuit_breaker.record_success()
+                raise
+            if counted:
+                circuit_breaker.record_failure(timeout=timed_out)
+            if offline_snapshot.is_available:
+                logger.warning(f"MySQL unavailable, answering from offline snapshot of {offline_snapshot.as_of}: {e}")
+                return offline_snapshot.execute(query, params, row_type)
+            if timed_out:
+                raise QueryTimeoutError(errno, f"Query exceeded its {timeout:.1f}s deadline") from e
+            raise
+        if counted:
+            circuit_breaker.record_success()
+        if offline_snapshot.claim_refresh():
+            # Refresh in the background while MySQL is answering
+            db_executor.submit(self.refresh_offline_snapshot)
+        return result
+
+    def refresh_offline_snapshot(self):
+        """Copy the navigation tables into the offline snapshot file"""
+        offline_snapshot.refresh(self.get_db_connection)
+
+    def get_pool_stats(self):
+        """Connection pool counters; None until the first query has created the pool"""
+        return _pool.get_stats() if _pool is not None else None
+
+    def get_availability_stats(self):
+        """Circuit breaker (failures, timeouts, probes) and offline snapshot state"""
+        return {'circuit': circuit_breaker.get_stats(), 'offline_snapshot': offline_snapshot.get_stats()}
+
+    def _run_mysql_query(self, query, params, row_type, timeout):
+        """Execute the query on a pooled connection within timeout seconds"""
+        query = _with_execution_time_hint(query, timeout)
         with self.get_db_connection() as conn:
-            with conn.cursor() as cursor:
-                cursor.execute(query, params or ())
-                return cursor.fetchall()
+            with _narrowed_read_timeout(conn, min(timeout + READ_TIMEOUT_GRACE, DB_READ_TIMEOUT)):
+                if row_type is None:
+                    with conn.cursor() as cursor:
+                        cursor.execute(query, params or ())
+                        return cursor.fetchall()
+                with conn.cursor(pymysql.cursors.Cursor) as cursor:
+                    cursor.execute(query, params or ())
+                    columns = [column[0] for column in cursor.description]
+                    return row_type.from_rows(columns, cursor.fetchall())
     
\ No newline at end of file
@@ -0,0 +1,119 @@
+import logging
+import threading
+import time
+from database.base_db import table_versions, db_executor, refresh_queries
+
+logger = logging.getLogger(__name__)
+
+UNCHANGED = "unchanged"
+APPENDED = "appended"
+CHANGED = "changed"
+
+class TableChange:
+    """Result of a change check: status plus the id range that was appended"""
+
+    __slots__ = ("status", "low_id", "high_id", "fingerprint")
+
+    def __init__(self, status, low_id, high_id, fingerprint):
+        self.status = status
+        self.low_id = low_id
+        self.high_id = high_id
+        self.fingerprint = fingerprint
+
+
+class TableChangeTracker:
+    """Detects whether a table is unchanged, only appended to, or otherwise modified
+
+    One aggregate query computes a CRC32 checksum over the tracked columns, both
+    for the whole table and for the rows up to the last seen id. If the latter
+    still matches, existing rows are untouched and only ids in (low_id, high_id]
+    need to be read.
+    """
+
+    def __init__(self, db, table, id_column, columns):
+        self.db = db
+        row_expr = f"CRC32(CONCAT_WS('|', {id_column}, {', '.join(columns)}))"
+        # Per-row checksum expression, also usable by consumers diffing individual rows
+        self.row_expr = row_expr
+        self.fingerprint_sql = f"""
+        SELECT
+            COUNT(*) as total,
+            COALESCE(MAX({id_column}), 0) as max_id,
+            COALESCE(SUM(CASE WHEN {id_column} <= %s THEN {row_expr} ELSE 0 END), 0) as known_checksum,
+            COALESCE(SUM({row_expr}), 0) as checksum
+        FROM {table}
+        """
+        self.table = table
+        self.max_id = 0
+        self.checksum = None
+
+    @property
+    def has_baseline(self):
+        return self.checksum is not None
+
+    def check(self):
+        """Compare the table with the last accepted fingerprint"""
+        fingerprint = self.db.execute_query(self.fingerprint_sql, (self.max_id,))[0]
+        if self.has_baseline and fingerprint["checksum"] == self.checksum:
+            status = UNCHANGED
+        elif (
+            self.has_baseline
+            and fingerprint["known_checksum"] == self.checksum
+            and fingerprint["max_id"] >= self.max_id
+        ):
+            status = APPENDED
+        else:
+            status = CHANGED
+        return TableChange(status, self.max_id, fingerprint["max_id"], fingerprint)
+
+    def accept(self, change):
+        """Record a change as applied; call only after the consumer caught up"""
+        if self.has_baseline and change.status != UNCHANGED:
+            table_versions.bump(self.table)
+        self.max_id = change.fingerprint["max_id"]
+        self.checksum = change.fingerprint["checksum"]
+
+    def reset(self):
+        self.max_id = 0
+        self.checksum = None
+
+
+class RefreshedStructure:
+    """ensure_fresh() for in-memory structures kept in sync by refresh(seen_at)
+
+    Subclasses provide refresh_interval, _refreshed_at, is_ready and refresh(seen_at). The
+    first build runs inline, as there is nothing to serve yet. After that a stale structure
+    keeps being served while one refresh runs on the database executor, so no request waits
+    for a rebuild or spends its deadline on one.
+    """
+
+    # Named in the log when a background refresh fails and the old data stays in use
+    DESCRIPTION = "structure"
+
+    _refresh_claimed = None  # _refreshed_at value a background refresh was submitted for
+    _claim_lock = threading.Lock()
+
+    def ensure_fresh(self):
+        """Refresh if older than refresh_interval; keep serving the old data meanwhile and on failure"""
+        seen_at = self._refreshed_at
+        if self.is_ready and time.monotonic() - seen_at < self.refresh_interval:
+            return
+        if not self.is_ready:
+            with refresh_queries():
+                self.refresh(seen_at)
+            return
+        with self._claim_lock:
+            if self._refresh_claimed == seen_at:
+                return
+            self._refresh_claimed = seen_at
+        db_executor.submit(self._refresh_in_background, seen_at)
+
+    def _refresh_in_background(self, seen_at):
+        try:
+            with refresh_queries():
+                self.refresh(seen_at)
+        except Exception as e:
+            logger.error(f"{self.DESCRIPTION} refresh failed, serving the previous one: {e}")
+            # Let the next stale read try again
+            with self._claim_lock:
+                self._refresh_claimed = None
@@ -0,0 +1,95 @@
+import logging
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+class CircuitBreaker:
+    """Stops sending queries to a database that keeps failing or timing out
+
+    After failure_threshold consecutive failures the breaker opens and callers fail fast.
+    Once the open period has passed, one probe query is let through (half-open): success
+    closes the breaker, failure opens it again for twice as long, up to max_reset_timeout.
+    """
+
+    def __init__(self, failure_threshold, reset_timeout, max_reset_timeout=None):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.max_reset_timeout = max_reset_timeout or reset_timeout
+        self._state = CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._open_for = reset_timeout
+        self._lock = threading.Lock()
+        self.stats = {
+            'trips': 0,
+            'failures': 0,
+            'timeouts': 0,
+            'rejected': 0,
+            'probes': 0,
+            'probe_failures': 0,
+        }
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state
+
+    @property
+    def is_open(self):
+        """Whether queries are currently being failed fast"""
+        with self._lock:
+            return self._state != CLOSED
+
+    def allow(self):
+        """Whether a query may go to the database now; in half-open state only the probe may"""
+        with self._lock:
+            if self._state == CLOSED:
+                return True
+            if self._state == OPEN and time.monotonic() - self._opened_at >= self._open_for:
+                self._state = HALF_OPEN
+                self.stats['probes'] += 1
+                logger.info("Circuit half-open, probing the database")
+                return True
+            self.stats['rejected'] += 1
+            return False
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        logger.warning(f"Circuit open for {self._open_for:.0f}s after {self._failures} database failures")
+
+    def record_success(self):
+        with self._lock:
+            if self._state != CLOSED:
+                logger.info("Database answering again, circuit closed")
+            self._state = CLOSED
+            self._failures = 0
+            self._open_for = self.reset_timeout
+
+    def record_failure(self, timeout=False):
+        """Count a connection failure or timeout; timeout=True also counts it as a timeout"""
+        with self._lock:
+            self._failures += 1
+            self.stats['failures'] += 1
+            if timeout:
+                self.stats['timeouts'] += 1
+            if self._state == HALF_OPEN:
+                self.stats['probe_failures'] += 1
+                self._open_for = min(self._open_for * 2, self.max_reset_timeout)
+                self._open()
+            elif self._state == CLOSED and self._failures >= self.failure_threshold:
+                self.stats['trips'] += 1
+                self._open()
+
+    def get_stats(self):
+        with self._lock:
+            stats = dict(self.stats)
+            stats['state'] = self._state
+            stats['consecutive_failures'] = self._failures
+            stats['open_for'] = self._open_for
+        return stats
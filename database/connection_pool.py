@@ -0,0 +1,179 @@
+import logging
+import threading
+import time
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+class PoolTimeoutError(Exception):
+    """Raised when no pooled connection becomes available within the wait timeout"""
+
+
+class PooledConnection:
+    """Bookkeeping wrapper around a raw pymysql connection"""
+
+    __slots__ = ("connection", "created_at", "last_used_at")
+
+    def __init__(self, connection):
+        now = time.monotonic()
+        self.connection = connection
+        self.created_at = now
+        self.last_used_at = now
+
+
+class ConnectionPool:
+    """Bounded, thread-safe pymysql connection pool"""
+
+    def __init__(self, connection_params, min_size=1, max_size=10, max_lifetime=1800,
+                 idle_timeout=300, wait_timeout=10):
+        self.connection_params = connection_params
+        self.min_size = min_size
+        self.max_size = max(max_size, min_size, 1)
+        self.max_lifetime = max_lifetime
+        self.idle_timeout = idle_timeout
+        self.wait_timeout = wait_timeout
+
+        self._idle = []  # LIFO stack so hot connections are reused and cold ones age out
+        self._size = 0
+        self._closed = False  # set by close_all(); connections released afterwards are closed
+        self._condition = threading.Condition()
+
+        self.stats = {
+            'created': 0,
+            'closed': 0,
+            'checkouts': 0,
+            'waits': 0,
+            'wait_time_total': 0.0,
+            'wait_time_max': 0.0,
+            'wait_timeouts': 0,
+            'failed_pings': 0,
+            'recycled': 0,
+            'reaped': 0,
+        }
+
+    def _open(self):
+        """Open a new raw connection (called without the lock held)"""
+        connection = pymysql.connect(**self.connection_params)
+        with self._condition:
+            self.stats['created'] += 1
+        return PooledConnection(connection)
+
+    def _close(self, pooled, reason):
+        """Close a raw connection and release its slot"""
+        try:
+            pooled.connection.close()
+        except Exception as e:
+            logger.debug(f"Error closing pooled connection ({reason}): {e}")
+        with self._condition:
+            self._size -= 1
+            self.stats['closed'] += 1
+            self._condition.notify()
+
+    def _is_expired(self, pooled, now):
+        return self.max_lifetime and now - pooled.created_at > self.max_lifetime
+
+    def _reap_idle(self, now):
+        """Pop idle connections past idle_timeout while keeping min_size open (lock held)"""
+        reaped = []
+        if not self.idle_timeout:
+            return reaped
+        # Oldest idle connections sit at the bottom of the stack
+        while self._idle and self._size - len(reaped) > self.min_size:
+            if now - self._idle[0].last_used_at <= self.idle_timeout:
+                break
+            reaped.append(self._idle.pop(0))
+        self.stats['reaped'] += len(reaped)
+        return reaped
+
+    def acquire(self):
+        """Check out a live connection, opening one if the pool is below max_size"""
+        wait_started = None
+        while True:
+            pooled = None
+            reaped = []
+            with self._condition:
+                now = time.monotonic()
+                reaped = self._reap_idle(now)
+                if self._idle:
+                    pooled = self._idle.pop()
+                elif self._size < self.max_size:
+                    self._size += 1
+                else:
+                    if wait_started is None:
+                        wait_started = now
+                        self.stats['waits'] += 1
+                    remaining = self.wait_timeout - (now - wait_started)
+                    if remaining <= 0:
+                        self.stats['wait_timeouts'] += 1
+                        raise PoolTimeoutError(
+                            f"No database connection available after {self.wait_timeout}s "
+                            f"(pool size {self._size}/{self.max_size})"
+                        )
+                    self._condition.wait(remaining)
+                    continue
+
+            for stale in reaped:
+                self._close(stale, "idle")
+
+            if pooled is None:
+                try:
+                    pooled = self._open()
+                except Exception:
+                    with self._condition:
+                        self._size -= 1
+                        self._condition.notify()
+                    raise
+            elif self._is_expired(pooled, time.monotonic()):
+                with self._condition:
+                    self.stats['recycled'] += 1
+                self._close(pooled, "lifetime")
+                continue
+            else:
+                try:
+                    pooled.connection.ping(reconnect=False)
+                except Exception as e:
+                    logger.warning(f"Discarding dead pooled connection: {e}")
+                    with self._condition:
+                        self.stats['failed_pings'] += 1
+                    self._close(pooled, "ping")
+                    continue
+
+            with self._condition:
+                self.stats['checkouts'] += 1
+                if wait_started is not None:
+                    waited = time.monotonic() - wait_started
+                    self.stats['wait_time_total'] += waited
+                    self.stats['wait_time_max'] = max(self.stats['wait_time_max'], waited)
+            return pooled
+
+    def release(self, pooled, discard=False):
+        """Return a connection to the pool, or close it if it is broken or expired"""
+        now = time.monotonic()
+        if discard or self._is_expired(pooled, now):
+            self._close(pooled, "discard" if discard else "lifetime")
+            return
+        pooled.last_used_at = now
+        with self._condition:
+            closed = self._closed
+            if not closed:
+                self._idle.append(pooled)
+                self._condition.notify()
+        if closed:
+            self._close(pooled, "shutdown")
+
+    def close_all(self):
+        """Close every idle connection (checked-out ones are closed on release)"""
+        with self._condition:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for pooled in idle:
+            self._close(pooled, "shutdown")
+
+    def get_stats(self):
+        """Snapshot of pool counters for logging/inspection"""
+        with self._condition:
+            stats = dict(self.stats)
+            stats['size'] = self._size
+            stats['idle'] = len(self._idle)
+            stats['in_use'] = self._size - len(self._idle)
+        return stats
@@ -0,0 +1,327 @@
+import bisect
+import logging
+import re
+import threading
+import time
+from database.base_db import BaseDatabase
+from database.change_tracker import RefreshedStructure, TableChangeTracker, APPENDED, CHANGED
+from config.settings import CUSTOMER_INDEX_REFRESH_INTERVAL, FUZZY_MAX_EDIT_DISTANCE, FUZZY_SEARCH_BUDGET_MS
+
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 3
+
+# SymSpell-style deletes are generated from this many leading characters only, bounding index size
+FUZZY_PREFIX_LENGTH = 7
+
+def normalize_name(name):
+    """Lowercase and collapse whitespace so index keys and queries compare equal"""
+    return re.sub(r"\s+", " ", str(name or "")).strip().lower()
+
+def name_ngrams(text):
+    """Character trigrams of an already normalized string"""
+    return {text[i:i + NGRAM_SIZE] for i in range(len(text) - NGRAM_SIZE + 1)}
+
+def normalize_phone(phone):
+    """Digits only, without the +62 / 62 / 0 prefix, so every spelling of a number shares one key"""
+    digits = re.sub(r"\D", "", str(phone or ""))
+    if digits.startswith("62"):
+        digits = digits[2:]
+    return digits.lstrip("0")
+
+def address_tokens(address):
+    """Lowercase alphanumeric words of an address"""
+    return re.findall(r"[a-z0-9]+", str(address or "").lower())
+
+def word_deletes(word, max_distance):
+    """All strings reachable from the word's prefix by deleting up to max_distance characters"""
+    word = word[:FUZZY_PREFIX_LENGTH]
+    deletes = {word}
+    frontier = {word}
+    for _ in range(max_distance):
+        frontier = {w[:i] + w[i + 1:] for w in frontier for i in range(len(w))}
+        deletes |= frontier
+    return deletes
+
+def edit_distance(a, b, max_distance):
+    """Levenshtein distance, or max_distance + 1 as soon as it is known to exceed max_distance"""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous = list(range(len(b) + 1))
+    for i, char_a in enumerate(a, 1):
+        current = [i]
+        for j, char_b in enumerate(b, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (char_a != char_b)))
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous = current
+    return previous[-1]
+
+def allowed_distance(word):
+    """Short words tolerate fewer typos, otherwise almost everything is a near-miss"""
+    if len(word) <= 3:
+        return 0
+    if len(word) <= 5:
+        return min(1, FUZZY_MAX_EDIT_DISTANCE)
+    return FUZZY_MAX_EDIT_DISTANCE
+
+class CustomerSearchIndex(RefreshedStructure):
+    """In-memory name, phone and address indexes over customers, kept in sync with the customer table"""
+
+    DESCRIPTION = "Customer index"
+
+    FULL_SQL = "SELECT customer_id, name, no_wa, address FROM customer WHERE customer_id <= %s"
+
+    APPENDED_SQL = "SELECT customer_id, name, no_wa, address FROM customer WHERE customer_id > %s AND customer_id <= %s"
+
+    # Attributes swapped in one step after an off-to-the-side rebuild
+    STRUCTURES = (
+        "_names", "_display", "_postings", "_words", "_deletes",
+        "_phones", "_phones_sorted", "_phones_reversed", "_address_postings", "_address_tokens_sorted",
+    )
+
+    # Cap on how many address words one query prefix may expand to
+    MAX_PREFIX_EXPANSION = 200
+
+    def __init__(self, db, refresh_interval):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.tracker = TableChangeTracker(db, "customer", "customer_id", ["name", "no_wa", "address"])
+        self._names = {}     # customer_id -> normalized name
+        self._display = {}   # customer_id -> name as stored, for suggestions
+        self._postings = {}  # trigram -> set of customer_id
+        self._words = {}     # name word -> set of customer_id
+        self._deletes = {}   # delete key -> set of name words
+        self._phones = {}               # normalized phone -> set of customer_id
+        self._phones_sorted = []        # sorted distinct normalized phones, for prefix lookups
+        self._phones_reversed = []      # same with reversed digits, for "last digits" lookups
+        self._address_postings = {}     # address word -> set of customer_id
+        self._address_tokens_sorted = []  # sorted distinct address words for prefix lookups
+        self._refreshed_at = 0.0
+        self._lock = threading.RLock()          # guards the structures above
+        self._refresh_lock = threading.Lock()   # serializes refreshes
+
+    @property
+    def is_ready(self):
+        return self.tracker.has_baseline
+
+    def _add(self, customer_id, name, phone, address):
+        normalized = normalize_name(name)
+        self._names[customer_id] = normalized
+        self._display[customer_id] = str(name or "").strip()
+        for gram in name_ngrams(normalized):
+            self._postings.setdefault(gram, set()).add(customer_id)
+        for word in normalized.split(" "):
+            if word not in self._words:
+                self._words[word] = set()
+                for key in word_deletes(word, FUZZY_MAX_EDIT_DISTANCE):
+                    self._deletes.setdefault(key, set()).add(word)
+            self._words[word].add(customer_id)
+
+        phone = normalize_phone(phone)
+        if phone:
+            if phone not in self._phones:
+                self._phones[phone] = set()
+                self._phones_sorted.append(phone)
+                self._phones_reversed.append(phone[::-1])
+            self._phones[phone].add(customer_id)
+
+        for token in set(address_tokens(address)):
+            if token not in self._address_postings:
+                self._address_postings[token] = set()
+                self._address_tokens_sorted.append(token)
+            self._address_postings[token].add(customer_id)
+
+    def _load(self, rows):
+        for row in rows:
+            self._add(row["customer_id"], row["name"], row["no_wa"], row["address"])
+        # New keys were appended; one sort per batch is cheap on already sorted data
+        self._phones_sorted.sort()
+        self._phones_reversed.sort()
+        self._address_tokens_sorted.sort()
+
+    def refresh(self, seen_at=None):
+        """Rebuild, or index only appended customers when existing rows are untouched
+
+        seen_at is the refresh time a caller found stale; if another caller refreshed while
+        this one waited for the lock, there is nothing left to do.
+        """
+        with self._refresh_lock:
+            if seen_at is not None and self._refreshed_at != seen_at:
+                return
+            change = self.tracker.check()
+            if change.status == APPENDED:
+                rows = self.db.execute_query(self.APPENDED_SQL, (change.low_id, change.high_id))
+                with self._lock:
+                    self._load(rows)
+                logger.info(f"Indexed {len(rows)} new customer names")
+            elif change.status == CHANGED:
+                started = time.perf_counter()
+                rows = self.db.execute_query(self.FULL_SQL, (change.high_id,))
+                # Build off to the side so searches keep using the old index until the swap
+                fresh = CustomerSearchIndex(self.db, self.refresh_interval)
+                fresh._load(rows)
+                with self._lock:
+                    for attribute in self.STRUCTURES:
+                        setattr(self, attribute, getattr(fresh, attribute))
+                logger.info(
+                    f"Built customer name index: {len(self._names)} names, {len(self._postings)} trigrams, "
+                    f"{len(self._deletes)} fuzzy keys in {time.perf_counter() - started:.2f}s"
+                )
+            self.tracker.accept(change)
+            self._refreshed_at = time.monotonic()
+
+    def _candidates(self, term):
+        grams = name_ngrams(term)
+        if not grams:
+            # Shorter than one trigram: a scan of the in-memory names is still cheap
+            return self._names.keys()
+        postings = sorted((self._postings.get(gram, set()) for gram in grams), key=len)
+        candidates = set(postings[0])
+        for posting in postings[1:]:
+            candidates &= posting
+            if not candidates:
+                break
+        return candidates
+
+    @staticmethod
+    def _rank(term, name):
+        """Whole-name prefix first, then word prefix, then any substring"""
+        if name.startswith(term):
+            return 0
+        if f" {term}" in name:
+            return 1
+        return 2
+
+    def search(self, term):
+        """Return (score, customer_id) of customers whose name contains term, best matches first
+
+        Like every search method here, the result is sorted by (score, customer_id), so a
+        page can continue after the last pair shown even if the index changed meanwhile.
+        """
+        term = normalize_name(term)
+        if not term:
+            return []
+        with self._lock:
+            names = self._names
+            matches = [
+                ((self._rank(term, names[customer_id]), names[customer_id]), customer_id)
+                for customer_id in self._candidates(term)
+                if term in names[customer_id]
+            ]
+        matches.sort()
+        return matches
+
+    def _similar_words(self, token, deadline):
+        """Index words within the allowed edit distance of token, as {word: distance}"""
+        max_distance = allowed_distance(token)
+        similar = {}
+        if max_distance == 0:
+            if token in self._words:
+                similar[token] = 0
+            return similar
+        for key in word_deletes(token, max_distance):
+            for word in self._deletes.get(key, ()):
+                if word in similar:
+                    continue
+                distance = edit_distance(token, word, max_distance)
+                if distance <= max_distance:
+                    similar[word] = distance
+            if time.perf_counter() > deadline:
+                break
+        return similar
+
+    def fuzzy_search(self, term, limit=5):
+        """Return ids of customers whose name words are near-misses of the term's words
+
+        Only customers matching the most query words are kept, ranked by total edit distance.
+        The lookup stops at FUZZY_SEARCH_BUDGET_MS and ranks whatever was found.
+        """
+        tokens = [token for token in normalize_name(term).split(" ") if token]
+        if not tokens:
+            return []
+        deadline = time.perf_counter() + FUZZY_SEARCH_BUDGET_MS / 1000
+        scores = {}  # customer_id -> [matched tokens, total distance]
+        with self._lock:
+            for token in tokens:
+                best = {}
+                for word, distance in self._similar_words(token, deadline).items():
+                    for customer_id in self._words[word]:
+                        if distance < best.get(customer_id, distance + 1):
+                            best[customer_id] = distance
+                for customer_id, distance in best.items():
+                    score = scores.setdefault(customer_id, [0, 0])
+                    score[0] += 1
+                    score[1] += distance
+                if time.perf_counter() > deadline:
+                    logger.info(f"Fuzzy search for '{term}' hit its {FUZZY_SEARCH_BUDGET_MS}ms budget")
+                    break
+            # Only customers matching as many query words as the best candidate are near-misses
+            best_matched = max((matched for matched, _ in scores.values()), default=0)
+            ranked = sorted(
+                ((customer_id, score) for customer_id, score in scores.items() if score[0] == best_matched),
+                key=lambda item: (item[1][1], self._names[item[0]])
+            )
+            return [customer_id for customer_id, _ in ranked[:limit]]
+
+    @staticmethod
+    def _with_prefix(sorted_keys, prefix, limit):
+        """Keys of a sorted string list that start with prefix (at most limit), found by binary search"""
+        low = bisect.bisect_left(sorted_keys, prefix)
+        high = bisect.bisect_left(sorted_keys, prefix + "\uffff")
+        return sorted_keys[low:high if limit is None else min(high, low + limit)]
+
+    def search_phone(self, phone, limit=None):
+        """Exact match on the normalized number, else numbers starting, then ending with the digits
+
+        limit caps the results; by default every match is returned, for the caller to page.
+        """
+        digits = re.sub(r"\D", "", str(phone or ""))
+        phone = normalize_phone(digits)
+        if not digits:
+            return []
+        with self._lock:
+            if phone in self._phones:
+                numbers = [(0, phone)]
+            else:
+                prefixed = self._with_prefix(self._phones_sorted, phone, limit) if phone else []
+                numbers = [(0, number) for number in prefixed]
+                # Trailing digits are matched as typed, prefix stripping only applies to the start
+                numbers += [
+                    (1, reversed_number[::-1])
+                    for reversed_number in self._with_prefix(self._phones_reversed, digits[::-1], limit)
+                ]
+            scores = {}
+            for score in numbers:
+                for customer_id in self._phones[score[1]]:
+                    scores[customer_id] = min(scores.get(customer_id, score), score)
+        ranked = sorted((score, customer_id) for customer_id, score in scores.items())
+        return ranked if limit is None else ranked[:limit]
+
+    def search_address(self, address, limit=None):
+        """Customers whose address contains every query word (the last one may be a prefix), by name
+
+        limit caps the results; by default every match is returned, for the caller to page.
+        """
+        tokens = address_tokens(address)
+        if not tokens:
+            return []
+        with self._lock:
+            candidates = None
+            for position, token in enumerate(tokens):
+                if position == len(tokens) - 1:
+                    words = self._with_prefix(self._address_tokens_sorted, token, self.MAX_PREFIX_EXPANSION)
+                    matching = set().union(*(self._address_postings[word] for word in words)) if words else set()
+                else:
+                    matching = self._address_postings.get(token, set())
+                candidates = set(matching) if candidates is None else candidates & matching
+                if not candidates:
+                    return []
+            ranked = sorted(((self._names[customer_id],), customer_id) for customer_id in candidates)
+        return ranked if limit is None else ranked[:limit]
+
+    def display_name(self, customer_id):
+        """Customer name as stored in the database"""
+        return self._display.get(customer_id, "")
+
+customer_index = CustomerSearchIndex(BaseDatabase(), CUSTOMER_INDEX_REFRESH_INTERVAL)
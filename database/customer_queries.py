@@ -1,18 +1,133 @@
+import bisect
 import pymysql
 import logging
 from database.shared_queries import SharedQueries
+from database.customer_index import customer_index, normalize_phone
+from database.records import OdpRow, CustomerRow
+from database.query_cache import CachePolicy
+from config.settings import CUSTOMER_SEARCH_PAGE_SIZE, CUSTOMER_CACHE_TTL, QUERY_CACHE_STALE_TTL
 
 
 logger = logging.getLogger(__name__)
 
+class SearchPage:
+    """One page of customer search results plus the cursor of the page after it"""
+
+    __slots__ = ("customers", "next_cursor", "total", "restarted")
+
+    def __init__(self, customers, next_cursor=None, total=None, restarted=False):
+        self.customers = customers
+        self.next_cursor = next_cursor
+        self.total = total  # None when only the LIKE fallback answered and the total is unknown
+        # The cursor came from the other search path, so this is the first page again
+        self.restarted = restarted
+
+
 class CustomerQueries(SharedQueries):
     """Database queries related to customer management"""
 
+    SEARCH_PAGE_SIZE = CUSTOMER_SEARCH_PAGE_SIZE
+
+    ODPS_BY_COVERAGE_CACHE = CachePolicy(
+        CUSTOMER_CACHE_TTL, ("coverage", "m_odc", "m_odp", "customer"), QUERY_CACHE_STALE_TTL
+    )
+    CUSTOMERS_BY_ODP_CACHE = CachePolicy(
+        CUSTOMER_CACHE_TTL, ("customer", "m_odp", "m_odc", "coverage"), QUERY_CACHE_STALE_TTL
+    )
+
+    # Interactive lookups: better a quick "try again" than a chat waiting on a slow query
+    QUERY_TIMEOUTS = {
+        **SharedQueries.QUERY_TIMEOUTS,
+        "search_customers_page": 5,
+        "suggest_customers": 3,
+        "get_customers_by_ids": 5,
+        "get_odps_by_coverage": 5,
+        "get_customers_by_odp": 5,
+    }
+
+    # Columns the LIKE fallback may search, as the SQL expression matched against the term;
+    # never interpolate anything else into the SQL. Numbers are stored with spaces, dashes,
+    # dots, brackets or a leading +, so they are compared as bare digits like the typed term.
+    LIKE_SEARCH_COLUMNS = {
+        "name": "c.name",
+        "no_wa": (
+            "REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(REPLACE(c.no_wa, ' ', ''), '-', ''), '.', ''), "
+            "'(', ''), ')', ''), '+', '')"
+        ),
+        "address": "c.address",
+    }
+
+    # mode -> (index search method, LIKE column, LIKE term normalizer)
+    SEARCH_MODES = {
+        "name": (customer_index.search, "name", str),
+        "phone": (customer_index.search_phone, "no_wa", normalize_phone),
+        "address": (customer_index.search_address, "address", str),
+    }
+
+    def search_customers_page(self, mode, term, cursor=None, limit=None):
+        """Get one page of search results for mode 'name', 'phone' or 'address'
+
+        The cursor is opaque to callers: ("index", (score, customer_id)) of the previous page's
+        last index hit, or ("like", (name, customer_id)) for the LIKE fallback. Either way the
+        next page starts after that row, so customers added or removed meanwhile never shift
+        the pages. A cursor from the other path (the index went down or came back between
+        pages) cannot be compared, so the search starts over and the page says so.
+        """
+        index_search, like_column, normalize = self.SEARCH_MODES[mode]
+        limit = limit or self.SEARCH_PAGE_SIZE
+        try:
+            customer_index.ensure_fresh()
+        except Exception as e:
+            logger.error(f"Customer index unavailable, falling back to LIKE search: {e}")
+            return self._search_customers_like(like_column, normalize(term), cursor, limit)
+
+        restarted = cursor is not None and cursor[0] != "index"
+        hits = index_search(term)
+        start = bisect.bisect_right(hits, cursor[1]) if cursor and not restarted else 0
+        page_hits = hits[start:start + limit]
+        next_cursor = ("index", page_hits[-1]) if start + limit < len(hits) else None
+        result = self.get_customers_by_ids([customer_id for _, customer_id in page_hits])
+        logger.info(f"Found {len(hits)} customers matching {like_column} '{term}', showing {len(result)}")
+        return SearchPage(result, next_cursor, len(hits), restarted)
+
     def search_customers_by_name(self, customer_name):
-        """Search customers by name (partial match)"""
+        """Search customers by name (partial match), first page only"""
+        return self.search_customers_page("name", customer_name).customers
+
+    def search_customers_by_phone(self, phone):
+        """Search customers by WhatsApp number in any +62/62/0 spelling, or by its first/last digits"""
+        return self.search_customers_page("phone", phone).customers
+
+    def search_customers_by_address(self, address):
+        """Search customers whose address contains every word of the query"""
+        return self.search_customers_page("address", address).customers
+
+    def suggest_customers(self, customer_name, limit=5):
+        """Typo-tolerant suggestions as (customer_id, name), answered from the index without a query"""
         try:
-            sql = """
+            customer_index.ensure_fresh()
+        except Exception as e:
+            logger.error(f"Customer index unavailable, no suggestions for '{customer_name}': {e}")
+            return []
+        customer_ids = customer_index.fuzzy_search(customer_name, limit=limit)
+        logger.info(f"Found {len(customer_ids)} suggestions for '{customer_name}'")
+        return [(customer_id, customer_index.display_name(customer_id)) for customer_id in customer_ids]
+
+    def _search_customers_like(self, column, term, cursor, limit):
+        """Keyset-paginated LIKE scan on one column (used when the index cannot be built)"""
+        if column not in self.LIKE_SEARCH_COLUMNS:
+            raise ValueError(f"Unsupported search column: {column}")
+        restarted = cursor is not None and cursor[0] != "like"
+        if restarted:
+            cursor = None
+        if not term:
+            # Nothing left after normalizing (e.g. only "+62"): an empty LIKE would match everyone
+            return SearchPage([], restarted=restarted)
+        try:
+            keyset = "AND (c.name > %s OR (c.name = %s AND c.customer_id > %s))" if cursor else ""
+            sql = f"""
             SELECT 
+                c.customer_id,
                 c.name,
                 c.address,
                 c.no_port_odp,
@@ -22,23 +137,65 @@ class CustomerQueries(SharedQueries):
                 cov.c_name,
                 odp.latitude as odp_latitude,  
                 odp.longitude as odp_longitude 
+                {self._decimal_coordinate_columns('odp', 'odp')}
             FROM customer c
             JOIN m_odp odp ON c.id_odp = odp.id_odp
             JOIN m_odc odc ON c.id_odc = odc.id_odc
             JOIN coverage cov ON odc.coverage_odc = cov.coverage_id
-            WHERE c.name LIKE %s 
-            ORDER BY c.name
-            LIMIT 20
+            WHERE {self.LIKE_SEARCH_COLUMNS[column]} LIKE %s {keyset}
+            ORDER BY c.name, c.customer_id
+            LIMIT %s
             """
-            search_term = f"%{customer_name}%"
-            result = self.execute_query(sql, (search_term,))
-            logger.info(f"Found {len(result)} customers matching '{customer_name}'")
-            return result
+            params = [f"%{term}%"]
+            if cursor:
+                last_name, last_id = cursor[1]
+                params += [last_name, last_name, last_id]
+            # One extra row tells whether a next page exists without a COUNT(*)
+            params.append(limit + 1)
+            result = self.execute_query(sql, tuple(params), row_type=CustomerRow)
+            customers = result[:limit]
+            next_cursor = ("like", (customers[-1].name, customers[-1].customer_id)) if len(result) > limit else None
+            logger.info(f"Found {len(customers)} customers matching {column} '{term}'")
+            return SearchPage(customers, next_cursor, restarted=restarted)
+        except pymysql.Error as e:
+            logger.error(f"MySQL error in _search_customers_like: {e}")
+            return SearchPage([])
+        except Exception as e:
+            logger.error(f"Unexpected error in _search_customers_like: {e}")
+            return SearchPage([])
+
+    def get_customers_by_ids(self, customer_ids):
+        """Hydrate customers by primary key, keeping the order of customer_ids"""
+        if not customer_ids:
+            return []
+        try:
+            sql = f"""
+            SELECT 
+                c.customer_id,
+                c.name,
+                c.address,
+                c.no_port_odp,
+                c.no_wa,
+                odp.code_odp,
+                odc.code_odc,
+                cov.c_name,
+                odp.latitude as odp_latitude,  
+                odp.longitude as odp_longitude 
+                {self._decimal_coordinate_columns('odp', 'odp')}
+            FROM customer c
+            JOIN m_odp odp ON c.id_odp = odp.id_odp
+            JOIN m_odc odc ON c.id_odc = odc.id_odc
+            JOIN coverage cov ON odc.coverage_odc = cov.coverage_id
+            WHERE c.customer_id IN %s
+            """
+            result = self.execute_query(sql, (tuple(customer_ids),), row_type=CustomerRow)
+            by_id = {row.customer_id: row for row in result}
+            return [by_id[customer_id] for customer_id in customer_ids if customer_id in by_id]
         except pymysql.Error as e:
-            logger.error(f"MySQL error in search_customers_by_name: {e}")
+            logger.error(f"MySQL error in get_customers_by_ids: {e}")
             return []
         except Exception as e:
-            logger.error(f"Unexpected error in search_customers_by_name: {e}")
+            logger.error(f"Unexpected error in get_customers_by_ids: {e}")
             return []
     
     def get_odps_by_coverage(self, coverage_id):
@@ -61,7 +218,7 @@ class CustomerQueries(SharedQueries):
             HAVING customer_count > 0
             ORDER BY odc.code_odc, odp.code_odp
             """
-            result = self.execute_query(sql, (coverage_id,))
+            result = self.execute_query(sql, (coverage_id,), row_type=OdpRow, cache=self.ODPS_BY_COVERAGE_CACHE)
             logger.info(f"Retrieved {len(result)} ODPs with customers for coverage_id: {coverage_id}")
             return result
         except pymysql.Error as e:
@@ -89,7 +246,7 @@ class CustomerQueries(SharedQueries):
             WHERE c.id_odp = %s 
             ORDER BY c.no_port_odp
             """
-            result = self.execute_query(sql, (id_odp,))
+            result = self.execute_query(sql, (id_odp,), row_type=CustomerRow, cache=self.CUSTOMERS_BY_ODP_CACHE)
             logger.info(f"Retrieved {len(result)} customers for id_odp: {id_odp}")
             return result
         except pymysql.Error as e:
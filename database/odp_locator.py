@@ -0,0 +1,177 @@
+import heapq
+import logging
+import math
+import threading
+import time
+from database.base_db import AsyncQueryProxy
+from database.port_usage import port_usage
+from database.records import OdpRow
+from database.topology import network_topology
+from utils.geo import normalize_coordinates
+from config.settings import NEAREST_ODP_CELL_DEGREES, NEAREST_ODP_MAX_DISTANCE_KM
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    """Great-circle distance between two points in decimal degrees"""
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = math.sin((lat2 - lat1) / 2) ** 2 + math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(a))
+
+def _ring_cells(row, col, ring):
+    """Grid cells on the square ring at Chebyshev distance ring around (row, col)"""
+    if ring == 0:
+        yield row, col
+        return
+    for offset in range(-ring, ring + 1):
+        yield row - ring, col + offset
+        yield row + ring, col + offset
+    for offset in range(-ring + 1, ring):
+        yield row + offset, col - ring
+        yield row + offset, col + ring
+
+
+class OdpGridIndex:
+    """ODP positions bucketed into cell_degrees × cell_degrees grid cells, built from one topology snapshot"""
+
+    __slots__ = ("version", "cell_degrees", "cells", "size")
+
+    def __init__(self, version, cell_degrees, cells, size):
+        self.version = version
+        self.cell_degrees = cell_degrees
+        self.cells = cells  # (row, col) -> [(latitude, longitude, id_odp)]
+        self.size = size
+
+    def _cell(self, latitude, longitude):
+        return math.floor(latitude / self.cell_degrees), math.floor(longitude / self.cell_degrees)
+
+    @classmethod
+    def build(cls, snapshot, cell_degrees):
+        """Index every ODP of the snapshot with usable coordinates; the others cannot be located
+
+        Backfilled lat_decimal/lng_decimal are taken as they are; only ODPs without them
+        have their raw coordinate strings parsed.
+        """
+        odps = snapshot.nodes["m_odp"]
+        pairs, raw_ids = {}, []
+        for id_odp, odp in odps.items():
+            lat_decimal, lng_decimal = odp.get("lat_decimal"), odp.get("lng_decimal")
+            if lat_decimal is not None and lng_decimal is not None:
+                pairs[id_odp] = (float(lat_decimal), float(lng_decimal))
+            else:
+                raw_ids.append(id_odp)
+        pairs.update(zip(raw_ids, normalize_coordinates(
+            [odps[i].latitude for i in raw_ids], [odps[i].longitude for i in raw_ids]
+        )))
+        index = cls(snapshot.version, cell_degrees, {}, 0)
+        for id_odp, pair in pairs.items():
+            if pair is not None:
+                index.cells.setdefault(index._cell(*pair), []).append((pair[0], pair[1], id_odp))
+                index.size += 1
+        return index
+
+    def _min_ring_distance_km(self, latitude, ring):
+        """Lower bound on the distance to any point in ring, from anywhere in the centre cell"""
+        if ring <= 1:
+            return 0.0
+        # A degree of longitude is shortest at the ring's edge farthest from the equator
+        edge_latitude = min(abs(latitude) + ring * self.cell_degrees, 89.0)
+        return (ring - 1) * self.cell_degrees * KM_PER_DEGREE * math.cos(math.radians(edge_latitude))
+
+    def nearest(self, latitude, longitude, k, max_distance_km, accept=None):
+        """Up to k (distance_km, id_odp) pairs within max_distance_km, nearest first
+
+        Rings of cells are scanned outward from the query's cell and the scan stops as
+        soon as no unscanned cell can hold anything closer than the k-th best so far.
+        accept(id_odp) filters candidates.
+        """
+        row, col = self._cell(latitude, longitude)
+        best = []  # max-heap of the k nearest as (-distance, id_odp)
+        ring = 0
+        while True:
+            bound = self._min_ring_distance_km(latitude, ring)
+            if bound > max_distance_km or (len(best) == k and bound > -best[0][0]):
+                break
+            for cell in _ring_cells(row, col, ring):
+                for odp_latitude, odp_longitude, id_odp in self.cells.get(cell, ()):
+                    distance = haversine_km(latitude, longitude, odp_latitude, odp_longitude)
+                    if distance > max_distance_km or (len(best) == k and distance >= -best[0][0]):
+                        continue
+                    if accept is not None and not accept(id_odp):
+                        continue
+                    if len(best) < k:
+                        heapq.heappush(best, (-distance, id_odp))
+                    else:
+                        heapq.heapreplace(best, (-distance, id_odp))
+            ring += 1
+        return sorted((-distance, id_odp) for distance, id_odp in best)
+
+
+class NearestOdpLocator:
+    """Answers "closest ODPs with free ports" from memory: topology snapshot, grid index, port usage"""
+
+    def __init__(self, topology, usage, cell_degrees, max_distance_km):
+        self.topology = topology
+        self.usage = usage
+        self.cell_degrees = cell_degrees
+        self.max_distance_km = max_distance_km
+        self._index = None
+        self._lock = threading.Lock()
+        self.aio = AsyncQueryProxy(self)
+
+    def _get_index(self, snapshot):
+        """Grid index for snapshot, rebuilt only when the topology version changes"""
+        index = self._index
+        if index is not None and index.version == snapshot.version:
+            return index
+        with self._lock:
+            if self._index is None or self._index.version != snapshot.version:
+                started = time.perf_counter()
+                self._index = OdpGridIndex.build(snapshot, self.cell_degrees)
+                logger.info(
+                    f"ODP grid index v{snapshot.version}: {self._index.size} ODPs in {len(self._index.cells)} cells "
+                    f"in {(time.perf_counter() - started) * 1000:.1f} ms"
+                )
+            return self._index
+
+    def nearest_available(self, latitude, longitude, k):
+        """Up to k nearest ODPs with at least one free port, as OdpRows with distance_km; None if unavailable"""
+        try:
+            snapshot = self.topology.get_snapshot()
+            if snapshot is None:
+                return None
+            self.usage.ensure_fresh()
+            index = self._get_index(snapshot)
+            odps, odcs = snapshot.nodes["m_odp"], snapshot.nodes["m_odc"]
+
+            def has_free_port(id_odp):
+                total_port = odps[id_odp].total_port
+                return total_port is not None and total_port - self.usage.used_ports(id_odp) > 0
+
+            started = time.perf_counter()
+            found = index.nearest(latitude, longitude, k, self.max_distance_km, has_free_port)
+            values = []
+            for distance, id_odp in found:
+                odp = odps[id_odp]
+                odc = odcs.get(odp.id_odc)
+                values.append((
+                    id_odp, odp.code_odp, odc.code_odc if odc else None,
+                    snapshot.coverage_name(odc.coverage_id) if odc else None,
+                    odp.total_port, odp.total_port - self.usage.used_ports(id_odp),
+                    odp.latitude, odp.longitude, odp.get("lat_decimal"), odp.get("lng_decimal"), distance
+                ))
+            logger.info(
+                f"Nearest ODP search at ({latitude:.5f}, {longitude:.5f}): {len(values)} found "
+                f"in {(time.perf_counter() - started) * 1000:.2f} ms"
+            )
+            columns = ("id_odp", "code_odp", "code_odc", "c_name", "total_port", "odp_available_port",
+                       "odp_latitude", "odp_longitude", "odp_lat_decimal", "odp_lng_decimal", "distance_km")
+            return OdpRow.from_rows(columns, values)
+        except Exception as e:
+            logger.error(f"Error in nearest_available: {e}")
+            return None
+
+odp_locator = NearestOdpLocator(network_topology, port_usage, NEAREST_ODP_CELL_DEGREES, NEAREST_ODP_MAX_DISTANCE_KM)
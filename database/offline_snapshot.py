@@ -0,0 +1,205 @@
+import datetime
+import decimal
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import zlib
+from contextlib import closing
+import pymysql
+from config.settings import COORDINATE_DECIMAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+# Decimal coordinates are stored as text, as MySQL renders them
+sqlite3.register_adapter(decimal.Decimal, str)
+
+class SnapshotRows(list):
+    """Query result served from the offline snapshot; as_of is when the snapshot was taken"""
+
+    def __init__(self, rows, as_of):
+        super().__init__(rows)
+        self.as_of = as_of
+
+
+def _crc32(value):
+    return None if value is None else zlib.crc32(str(value).encode())
+
+def _concat_ws(separator, *values):
+    # Like MySQL, NULL arguments are skipped
+    return separator.join(str(value) for value in values if value is not None)
+
+
+class OfflineSnapshot:
+    """Read-only SQLite copy of the tables the bot reads, for serving while MySQL is down
+
+    The copy is written to a temporary file and renamed over the previous one, so readers
+    always open a complete snapshot. Queries written for MySQL run on it unchanged:
+    %s placeholders become ?, "IN %s" expands its tuple, CRC32 and CONCAT_WS are provided.
+    """
+
+    # Backfilled decimal coordinates, mirrored when the queries read them
+    COORDINATE_COLUMNS = ("lat_decimal", "lng_decimal") if COORDINATE_DECIMAL_COLUMNS else ()
+
+    # table -> mirrored columns
+    TABLES = {
+        "coverage": ("coverage_id", "c_name"),
+        "m_odc": ("id_odc", "code_odc", "coverage_odc", "latitude", "longitude") + COORDINATE_COLUMNS,
+        "m_odp": ("id_odp", "code_odp", "code_odc", "latitude", "longitude", "total_port") + COORDINATE_COLUMNS,
+        "customer": ("customer_id", "name", "address", "no_port_odp", "no_wa", "id_odp", "id_odc"),
+    }
+
+    INDEXES = (
+        "CREATE INDEX m_odc_coverage ON m_odc (coverage_odc)",
+        "CREATE INDEX m_odp_odc ON m_odp (code_odc)",
+        "CREATE INDEX customer_odp ON customer (id_odp)",
+    )
+
+    COPY_BATCH_SIZE = 5000
+
+    def __init__(self, path, refresh_interval):
+        self.path = path
+        self.refresh_interval = refresh_interval
+        self._refreshing = threading.Lock()
+        self._as_of = None
+        self._claimed_at = None
+        self._claim_lock = threading.Lock()
+        self.stats = {
+            'refreshes': 0,
+            'refresh_errors': 0,
+            'queries_served': 0,
+        }
+
+    @property
+    def enabled(self):
+        return bool(self.path)
+
+    @property
+    def as_of(self):
+        """When the snapshot on disk was taken, or None if there is none"""
+        if self._as_of is None and self.enabled and os.path.exists(self.path):
+            try:
+                with closing(self._connect()) as connection:
+                    row = connection.execute("SELECT taken_at FROM snapshot_meta").fetchone()
+                self._as_of = datetime.datetime.fromtimestamp(row[0]) if row else None
+            except sqlite3.Error as e:
+                logger.error(f"Offline snapshot {self.path} unreadable: {e}")
+        return self._as_of
+
+    @property
+    def is_available(self):
+        return self.as_of is not None
+
+    def claim_refresh(self):
+        """True for exactly one caller once a refresh is due; failed attempts wait a full interval"""
+        if not self.enabled:
+            return False
+        now = time.monotonic()
+        with self._claim_lock:
+            if self._claimed_at is not None and now - self._claimed_at < self.refresh_interval:
+                return False
+            as_of = self.as_of
+            if as_of is not None and (datetime.datetime.now() - as_of).total_seconds() < self.refresh_interval:
+                return False
+            self._claimed_at = now
+            return True
+
+    def _connect(self):
+        connection = sqlite3.connect(f"file:{self.path}?mode=ro", uri=True)
+        connection.create_function("CRC32", 1, _crc32, deterministic=True)
+        connection.create_function("CONCAT_WS", -1, _concat_ws, deterministic=True)
+        return connection
+
+    def refresh(self, get_db_connection):
+        """Copy the mirrored tables into a new snapshot file; skipped if a refresh is running"""
+        if not self._refreshing.acquire(blocking=False):
+            return
+        temporary_path = f"{self.path}.{os.getpid()}.tmp"
+        started = time.perf_counter()
+        try:
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+            taken_at = time.time()
+            snapshot = sqlite3.connect(temporary_path)
+            try:
+                copied = {}
+                with get_db_connection() as connection:
+                    for table, columns in self.TABLES.items():
+                        snapshot.execute(f"CREATE TABLE {table} ({columns[0]} INTEGER PRIMARY KEY, {', '.join(columns[1:])})")
+                        copied[table] = self._copy_table(connection, snapshot, table, columns)
+                for statement in self.INDEXES:
+                    snapshot.execute(statement)
+                snapshot.execute("CREATE TABLE snapshot_meta (taken_at REAL)")
+                snapshot.execute("INSERT INTO snapshot_meta VALUES (?)", (taken_at,))
+                snapshot.commit()
+            finally:
+                snapshot.close()
+            os.replace(temporary_path, self.path)
+            self._as_of = datetime.datetime.fromtimestamp(taken_at)
+            self.stats['refreshes'] += 1
+            logger.info(
+                f"Offline snapshot written to {self.path}: "
+                + ", ".join(f"{count} {table}" for table, count in copied.items())
+                + f" in {time.perf_counter() - started:.2f}s"
+            )
+        except Exception as e:
+            self.stats['refresh_errors'] += 1
+            logger.error(f"Offline snapshot refresh failed, keeping the previous one: {e}")
+            if os.path.exists(temporary_path):
+                os.remove(temporary_path)
+        finally:
+            self._refreshing.release()
+
+    def _copy_table(self, connection, snapshot, table, columns):
+        insert = f"INSERT INTO {table} VALUES ({', '.join('?' * len(columns))})"
+        count = 0
+        # Unbuffered cursor: rows stream in batches instead of being held in memory at once
+        with connection.cursor(pymysql.cursors.SSCursor) as cursor:
+            cursor.execute(f"SELECT {', '.join(columns)} FROM {table}")
+            while True:
+                rows = cursor.fetchmany(self.COPY_BATCH_SIZE)
+                if not rows:
+                    break
+                snapshot.executemany(insert, rows)
+                count += len(rows)
+        return count
+
+    @staticmethod
+    def translate(query, params):
+        """MySQL-style query and params as SQLite-style"""
+        params = list(params or ())
+        parts = re.split(r"(IN\s+%s|%s)", query)
+        sql, values = [], []
+        for part in parts:
+            if re.fullmatch(r"IN\s+%s", part):
+                items = tuple(params.pop(0))
+                sql.append(f"IN ({', '.join('?' * len(items))})")
+                values.extend(items)
+            elif part == "%s":
+                sql.append("?")
+                values.append(params.pop(0))
+            else:
+                sql.append(part)
+        return "".join(sql), values
+
+    def execute(self, query, params=None, row_type=None):
+        """Run a MySQL-style read query on the snapshot; rows carry the snapshot's as_of"""
+        as_of = self.as_of
+        if as_of is None:
+            raise sqlite3.OperationalError("No offline snapshot available")
+        sql, values = self.translate(query, params)
+        with closing(self._connect()) as connection:
+            cursor = connection.execute(sql, values)
+            columns = [column[0] for column in cursor.description]
+            rows = cursor.fetchall()
+        self.stats['queries_served'] += 1
+        if row_type is not None:
+            return SnapshotRows(row_type.from_rows(columns, rows), as_of)
+        return SnapshotRows([dict(zip(columns, row)) for row in rows], as_of)
+
+    def get_stats(self):
+        stats = dict(self.stats)
+        stats['as_of'] = self.as_of.isoformat() if self.as_of else None
+        return stats
@@ -1,44 +1,57 @@
 import pymysql
 import logging
 from database.shared_queries import SharedQueries
+from database.port_usage import port_usage
+from database.records import OdpRow
+from database.query_cache import CachePolicy
+from database.offline_snapshot import SnapshotRows
+from config.settings import TOPOLOGY_CACHE_TTL, QUERY_CACHE_STALE_TTL
 
 
 logger = logging.getLogger(__name__)
 
 class PortQueries(SharedQueries):
     """Database queries related to port availability and ODC/ODP management"""
+
+    # Used ports are filled in from the in-memory summary, so the query itself is topology only
+    LOCATION_DATA_CACHE = CachePolicy(TOPOLOGY_CACHE_TTL, ("coverage", "m_odc", "m_odp"), QUERY_CACHE_STALE_TTL)
+
+    QUERY_TIMEOUTS = {**SharedQueries.QUERY_TIMEOUTS, "get_location_data": 8}
     
     def get_location_data(self, coverage_id):
         """Get ODC and ODP data for port availability"""
-        conn = None
         try:
-            sql = """
+            # Only the chosen coverage's ODPs are read; used ports come from the in-memory summary
+            sql = f"""
             SELECT 
                 c.c_name,
                 odc.code_odc,
                 odc.latitude as odc_latitude,
                 odc.longitude as odc_longitude,
+                odp.id_odp,
                 odp.code_odp,
                 odp.latitude as odp_latitude,
                 odp.longitude as odp_longitude,
-                odp.total_port,
-                COALESCE(customer_count.used_ports, 0) as used_ports,
-                (odp.total_port - COALESCE(customer_count.used_ports, 0)) as odp_available_port
+                odp.total_port
+                {self._decimal_coordinate_columns('odc', 'odc')}
+                {self._decimal_coordinate_columns('odp', 'odp')}
             FROM coverage c
             JOIN m_odc odc ON c.coverage_id = odc.coverage_odc
             JOIN m_odp odp ON odc.id_odc = odp.code_odc
-            LEFT JOIN (
-                SELECT 
-                    id_odp, 
-                    COUNT(*) as used_ports
-                FROM customer 
-                GROUP BY id_odp
-            ) customer_count ON odp.id_odp = customer_count.id_odp
             WHERE c.coverage_id = %s
             ORDER BY odc.code_odc, odp.code_odp
             """
-            result = self.execute_query(sql, (coverage_id,))
+            port_usage.ensure_fresh()
+            rows = self.execute_query(sql, (coverage_id,), row_type=OdpRow, cache=self.LOCATION_DATA_CACHE)
+            # Cached rows are shared, so the usage fields go on copies
+            result = [row.copy() for row in rows]
+            for row in result:
+                row.used_ports = port_usage.used_ports(row.id_odp)
+                row.odp_available_port = row.total_port - row.used_ports if row.total_port is not None else None
+            if getattr(rows, "as_of", None) is not None:
+                result = SnapshotRows(result, rows.as_of)
             logger.info(f"Retrieved {len(result)} records for coverage_id: {coverage_id}")
+            logger.debug(f"Query coalescing: {self.get_coalesce_stats()}, cache: {self.get_cache_stats()}")
             return result
         except pymysql.Error as e:
             logger.error(f"MySQL error in get_location_data: {e}")
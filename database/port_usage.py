@@ -0,0 +1,71 @@
+import logging
+import threading
+import time
+from database.base_db import BaseDatabase
+from database.change_tracker import RefreshedStructure, TableChangeTracker, APPENDED, CHANGED
+from config.settings import PORT_USAGE_REFRESH_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+class PortUsageSummary(RefreshedStructure):
+    """In-memory per-ODP used-port counts, maintained incrementally from the customer table"""
+
+    DESCRIPTION = "Port usage summary"
+
+    # Both reads stop at the fingerprint's max_id so rows inserted meanwhile are counted exactly once
+    FULL_SQL = "SELECT id_odp, COUNT(*) as used_ports FROM customer WHERE customer_id <= %s GROUP BY id_odp"
+
+    APPENDED_SQL = """
+    SELECT id_odp, COUNT(*) as used_ports
+    FROM customer
+    WHERE customer_id > %s AND customer_id <= %s
+    GROUP BY id_odp
+    """
+
+    def __init__(self, db, refresh_interval):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.tracker = TableChangeTracker(db, "customer", "customer_id", ["id_odp"])
+        self._used_ports = {}
+        self._refreshed_at = 0.0
+        self._lock = threading.Lock()
+
+    @property
+    def is_ready(self):
+        return self.tracker.has_baseline
+
+    def _rebuild(self, change):
+        rows = self.db.execute_query(self.FULL_SQL, (change.high_id,))
+        self._used_ports = {row["id_odp"]: row["used_ports"] for row in rows}
+        logger.info(f"Rebuilt port usage summary for {len(self._used_ports)} ODPs")
+
+    def _apply_appended(self, change):
+        rows = self.db.execute_query(self.APPENDED_SQL, (change.low_id, change.high_id))
+        used_ports = dict(self._used_ports)
+        for row in rows:
+            used_ports[row["id_odp"]] = used_ports.get(row["id_odp"], 0) + row["used_ports"]
+        self._used_ports = used_ports
+        logger.info(f"Applied customers {change.low_id + 1}-{change.high_id} to port usage summary")
+
+    def refresh(self, seen_at=None):
+        """Bring the summary up to date, reading only appended customers when possible
+
+        seen_at is the refresh time a caller found stale; if another caller refreshed while
+        this one waited for the lock, there is nothing left to do.
+        """
+        with self._lock:
+            if seen_at is not None and self._refreshed_at != seen_at:
+                return
+            change = self.tracker.check()
+            if change.status == APPENDED:
+                self._apply_appended(change)
+            elif change.status == CHANGED:
+                self._rebuild(change)
+            self.tracker.accept(change)
+            self._refreshed_at = time.monotonic()
+
+    def used_ports(self, id_odp):
+        """Customers currently attached to an ODP"""
+        return self._used_ports.get(id_odp, 0)
+
+port_usage = PortUsageSummary(BaseDatabase(), PORT_USAGE_REFRESH_INTERVAL)
@@ -0,0 +1,196 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from utils.session_store import estimate_size
+
+logger = logging.getLogger(__name__)
+
+class CachePolicy:
+    """How long a query's result may be reused, and which tables it depends on
+
+    An entry is served while fresh (ttl seconds) and its tables' versions are unchanged.
+    A hot entry may be served up to stale_ttl seconds past its ttl while one background
+    call refreshes it.
+    """
+
+    __slots__ = ("ttl", "tables", "stale_ttl")
+
+    def __init__(self, ttl, tables, stale_ttl=0):
+        self.ttl = ttl
+        self.tables = tuple(tables)
+        self.stale_ttl = stale_ttl
+
+
+class _CacheEntry:
+    __slots__ = ("value", "size", "versions", "expires_at", "stale_until", "hits")
+
+    def __init__(self, value, size, versions, expires_at, stale_until, hits):
+        self.value = value
+        self.size = size
+        self.versions = versions
+        self.expires_at = expires_at
+        self.stale_until = stale_until
+        self.hits = hits
+
+
+class TableVersions:
+    """Per-table version counters, bumped whenever a table is seen to change
+
+    Changes are picked up by polling information_schema.TABLES.UPDATE_TIME for the tables
+    that cached queries depend on, and from in-process change detectors calling bump().
+    UPDATE_TIME can be NULL (e.g. InnoDB right after a server restart) or cached by the
+    server (information_schema_stats_expiry); TTLs bound staleness in that case.
+    """
+
+    UPDATE_TIMES_SQL = """
+    SELECT TABLE_NAME as table_name, UPDATE_TIME as update_time
+    FROM information_schema.TABLES
+    WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME IN %s
+    """
+
+    def __init__(self, poll_interval):
+        self.poll_interval = poll_interval
+        self._versions = {}
+        self._update_times = {}
+        self._tables = set()
+        self._polled_at = 0.0
+        self._lock = threading.Lock()
+        self._poll_lock = threading.Lock()
+
+    def bump(self, table):
+        with self._lock:
+            self._versions[table] = self._versions.get(table, 0) + 1
+        logger.info(f"Table {table} changed, cached results depending on it are invalidated")
+
+    def _poll(self, db):
+        rows = db.execute_query(self.UPDATE_TIMES_SQL, (tuple(sorted(self._tables)),))
+        for row in rows:
+            table, update_time = row["table_name"], row["update_time"]
+            known = self._update_times.get(table)
+            self._update_times[table] = update_time
+            if known is not None and update_time != known:
+                self.bump(table)
+
+    def current(self, db, tables):
+        """Version tuple for tables, polling update times first when the last poll is old enough"""
+        new_tables = not self._tables.issuperset(tables)
+        if new_tables:
+            with self._lock:
+                self._tables.update(tables)
+        if (new_tables or time.monotonic() - self._polled_at >= self.poll_interval) and self._poll_lock.acquire(blocking=False):
+            # One caller polls; the others go on with the versions known so far
+            try:
+                self._poll(db)
+            except Exception as e:
+                logger.warning(f"Table update time poll failed, keeping known versions: {e}")
+            finally:
+                self._polled_at = time.monotonic()
+                self._poll_lock.release()
+        with self._lock:
+            return tuple(self._versions.get(table, 0) for table in tables)
+
+    def get_versions(self):
+        with self._lock:
+            return dict(self._versions)
+
+
+class QueryCache:
+    """Memory-bounded LRU of query results keyed by (query, params, row_type)"""
+
+    # Entries read at least this often may be served stale while they refresh
+    HOT_HITS = 3
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self._entries = OrderedDict()  # least recently used first
+        self._total_bytes = 0
+        self._revalidating = set()
+        self._lock = threading.Lock()
+        self.stats = {
+            'hits': 0,
+            'stale_hits': 0,
+            'misses': 0,
+            'invalidations': 0,
+            'expirations': 0,
+            'evictions': 0,
+            'revalidations': 0,
+            'too_large': 0,
+        }
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._total_bytes -= entry.size
+
+    def get(self, key, versions):
+        """Return (value, revalidate); value is None on a miss, revalidate asks the caller to refresh"""
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.stats['misses'] += 1
+                return None, False
+            if entry.versions != versions:
+                self._remove(key)
+                self.stats['invalidations'] += 1
+                self.stats['misses'] += 1
+                return None, False
+            if now < entry.expires_at:
+                entry.hits += 1
+                self._entries.move_to_end(key)
+                self.stats['hits'] += 1
+                return entry.value, False
+            if now < entry.stale_until and entry.hits >= self.HOT_HITS:
+                entry.hits += 1
+                self._entries.move_to_end(key)
+                self.stats['stale_hits'] += 1
+                revalidate = key not in self._revalidating
+                if revalidate:
+                    self._revalidating.add(key)
+                    self.stats['revalidations'] += 1
+                return entry.value, revalidate
+            self._remove(key)
+            self.stats['expirations'] += 1
+            self.stats['misses'] += 1
+            return None, False
+
+    def put(self, key, value, versions, policy):
+        size = estimate_size(value)
+        now = time.monotonic()
+        with self._lock:
+            self._revalidating.discard(key)
+            previous = self._entries.get(key)
+            hits = 0
+            if previous is not None:
+                # A refreshed hot entry stays hot
+                hits = previous.hits
+                self._remove(key)
+            if size > self.max_bytes:
+                self.stats['too_large'] += 1
+                return
+            self._entries[key] = _CacheEntry(
+                value, size, versions, now + policy.ttl, now + policy.ttl + policy.stale_ttl, hits
+            )
+            self._total_bytes += size
+            while self._total_bytes > self.max_bytes:
+                self._remove(next(iter(self._entries)))
+                self.stats['evictions'] += 1
+
+    def end_revalidation(self, key):
+        with self._lock:
+            self._revalidating.discard(key)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._total_bytes = 0
+
+    def get_stats(self):
+        """Counters plus current occupancy and hit ratio"""
+        with self._lock:
+            stats = dict(self.stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._total_bytes
+        lookups = stats['hits'] + stats['stale_hits'] + stats['misses']
+        stats['hit_ratio'] = (stats['hits'] + stats['stale_hits']) / lookups if lookups else 0.0
+        return stats
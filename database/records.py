@@ -0,0 +1,116 @@
+"""Compact row types for tuple-cursor query results"""
+
+class Record:
+    """Base row type: fields live in __slots__, no per-row dict or key strings
+
+    Rows also answer the dict-style calls the formatters and handlers use
+    (row.get(key, default), row[key], key in row). Like a dict from DictCursor,
+    a field the query did not select is absent rather than None.
+    """
+
+    __slots__ = ()
+
+    # Low-cardinality columns repeated on many rows; equal values share one string object
+    SHARED_FIELDS = ()
+
+    @classmethod
+    def from_rows(cls, columns, rows):
+        """Build records from a cursor description's column names and value tuples"""
+        shared_positions = [i for i, column in enumerate(columns) if column in cls.SHARED_FIELDS]
+        shared_values = {}
+        records = []
+        for values in rows:
+            record = cls.__new__(cls)
+            if shared_positions:
+                values = list(values)
+                for i in shared_positions:
+                    values[i] = shared_values.setdefault(values[i], values[i])
+            for column, value in zip(columns, values):
+                setattr(record, column, value)
+            records.append(record)
+        return records
+
+    def get(self, key, default=None):
+        return getattr(self, key, default)
+
+    def __getitem__(self, key):
+        try:
+            return getattr(self, key)
+        except AttributeError:
+            raise KeyError(key) from None
+
+    def __setitem__(self, key, value):
+        setattr(self, key, value)
+
+    def __contains__(self, key):
+        return hasattr(self, key)
+
+    def keys(self):
+        return [field for field in self.__slots__ if hasattr(self, field)]
+
+    def copy(self):
+        """Shallow copy, for callers that add fields to rows other callers may share"""
+        record = type(self).__new__(type(self))
+        for field in self.keys():
+            setattr(record, field, getattr(self, field))
+        return record
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.keys()}
+
+    def __repr__(self):
+        return f"{type(self).__name__}({self.to_dict()})"
+
+
+class OdpRow(Record):
+    """ODP row for port availability and ODP selection"""
+
+    __slots__ = (
+        "id_odp", "c_name",
+        "code_odc", "odc_latitude", "odc_longitude",
+        "code_odp", "odp_latitude", "odp_longitude",
+        "total_port", "used_ports", "odp_available_port", "customer_count",
+        "odc_lat_decimal", "odc_lng_decimal", "odp_lat_decimal", "odp_lng_decimal", "distance_km",
+    )
+
+    SHARED_FIELDS = ("c_name", "code_odc", "odc_latitude", "odc_longitude", "odc_lat_decimal", "odc_lng_decimal")
+
+
+class CustomerRow(Record):
+    """Customer row for search results and ODP customer lists"""
+
+    __slots__ = (
+        "customer_id", "name", "address", "no_port_odp", "no_wa",
+        "code_odp", "code_odc", "c_name", "odp_latitude", "odp_longitude",
+        "odp_lat_decimal", "odp_lng_decimal",
+    )
+
+    SHARED_FIELDS = (
+        "code_odp", "code_odc", "c_name", "odp_latitude", "odp_longitude", "odp_lat_decimal", "odp_lng_decimal"
+    )
+
+
+class CoverageNode(Record):
+    """Coverage area in the in-memory topology snapshot"""
+
+    __slots__ = ("coverage_id", "c_name", "row_crc")
+
+
+class OdcNode(Record):
+    """ODC in the in-memory topology snapshot"""
+
+    __slots__ = ("id_odc", "code_odc", "coverage_id", "latitude", "longitude", "row_crc")
+
+
+class OdpNode(Record):
+    """ODP in the in-memory topology snapshot"""
+
+    __slots__ = (
+        "id_odp", "code_odp", "id_odc", "latitude", "longitude", "lat_decimal", "lng_decimal", "total_port", "row_crc"
+    )
+
+
+class CustomerNode(Record):
+    """Customer in the in-memory topology snapshot, only the fields navigation shows"""
+
+    __slots__ = ("customer_id", "name", "address", "no_port_odp", "id_odp", "id_odc", "row_crc")
@@ -0,0 +1,135 @@
+from database.base_db import BaseDatabase
+import logging
+import time
+import numpy as np
+import pymysql
+
+logger = logging.getLogger(__name__)
+
+# Utilization bucket edges in percent for ODPs that still have a free port
+UTILIZATION_BUCKETS = (0, 25, 50, 75, 90, 100)
+
+# Groups smaller than this many ports are left out of the most-utilized lists (one full small ODP says little)
+ROLLUP_MIN_PORTS = 16
+
+def _rollup(group_ids, total, used, saturated):
+    """Per-group ODP count, ports, used ports and saturated ODPs, via one bincount per measure"""
+    groups, inverse = np.unique(group_ids, return_inverse=True)
+    count = len(groups)
+    return {
+        'ids': groups,
+        'odps': np.bincount(inverse, minlength=count),
+        'total': np.bincount(inverse, weights=total, minlength=count).astype(np.int64),
+        'used': np.bincount(inverse, weights=used, minlength=count).astype(np.int64),
+        'saturated': np.bincount(inverse, weights=saturated, minlength=count).astype(np.int64),
+    }
+
+def _top_groups(rollup, names, top_n, min_ports):
+    """(name, odps, used, total, utilization, saturated) of the most utilized groups with at least min_ports ports"""
+    total, used = rollup['total'], rollup['used']
+    utilization = np.divide(used, total, out=np.zeros(len(total)), where=total > 0)
+    eligible = np.flatnonzero(total >= min_ports)
+    # Highest utilization first, more used ports breaking ties
+    order = eligible[np.lexsort((-used[eligible], -utilization[eligible]))][:top_n]
+    return [
+        (
+            names.get(rollup['ids'][i], 'N/A'), int(rollup['odps'][i]), int(used[i]), int(total[i]),
+            float(utilization[i]), int(rollup['saturated'][i])
+        )
+        for i in order
+    ]
+
+def compute_utilization(arrays, odc_names, coverage_names, top_n=10, min_ports=ROLLUP_MIN_PORTS):
+    """Network-wide utilization summary from per-ODP arrays (total_port, used_ports, id_odc, coverage_id)"""
+    total = arrays['total_port']
+    used = arrays['used_ports']
+    has_ports = total > 0
+    saturated = has_ports & (used >= total)
+    # Customers beyond an ODP's capacity are reported as over capacity, not as extra utilization
+    used_in_capacity = np.where(has_ports, np.minimum(used, total), 0)
+    utilization = np.divide(used_in_capacity, total, out=np.zeros(len(total)), where=has_ports) * 100
+
+    # Saturated ODPs are counted on their own, so 100% is not mixed into 90-100%
+    histogram, _ = np.histogram(utilization[has_ports & ~saturated], bins=np.array(UTILIZATION_BUCKETS, dtype=float))
+    distribution = list(zip(UTILIZATION_BUCKETS[:-1], UTILIZATION_BUCKETS[1:], histogram.tolist()))
+
+    network_total = int(total[has_ports].sum())
+    network_used = int(used_in_capacity.sum())
+    percentiles = np.percentile(utilization[has_ports], (50, 90)) if has_ports.any() else (0.0, 0.0)
+    return {
+        'odps': len(total),
+        'odps_without_ports': int((~has_ports).sum()),
+        'total_ports': network_total,
+        'used_ports': network_used,
+        'free_ports': network_total - network_used,
+        'utilization': network_used / network_total if network_total else 0.0,
+        'median_utilization': float(percentiles[0]),
+        'p90_utilization': float(percentiles[1]),
+        'distribution': distribution,
+        'saturated': int(saturated.sum()),
+        'over_capacity': int((has_ports & (used > total)).sum()),
+        'empty': int((has_ports & (used == 0)).sum()),
+        'top_coverages': _top_groups(
+            _rollup(arrays['coverage_id'], total, used_in_capacity, saturated), coverage_names, top_n, min_ports
+        ),
+        'top_odcs': _top_groups(
+            _rollup(arrays['id_odc'], total, used_in_capacity, saturated), odc_names, top_n, min_ports
+        ),
+    }
+
+
+class ReportQueries(BaseDatabase):
+    """Network-wide capacity reports for administrators"""
+
+    # Every ODP with its ODC, coverage and used-port count, in one pass over each table
+    PORT_ARRAYS_SQL = """
+    SELECT
+        odp.id_odp,
+        odp.code_odc as id_odc,
+        odc.code_odc,
+        odc.coverage_odc as coverage_id,
+        cov.c_name,
+        COALESCE(odp.total_port, 0) as total_port,
+        COALESCE(usage_counts.used_ports, 0) as used_ports
+    FROM m_odp odp
+    JOIN m_odc odc ON odp.code_odc = odc.id_odc
+    JOIN coverage cov ON odc.coverage_odc = cov.coverage_id
+    LEFT JOIN (
+        SELECT id_odp, COUNT(*) as used_ports FROM customer GROUP BY id_odp
+    ) usage_counts ON usage_counts.id_odp = odp.id_odp
+    """
+
+    def load_port_arrays(self):
+        """Per-ODP columns as NumPy arrays, plus ODC code and coverage name lookups"""
+        rows = self.execute_query(self.PORT_ARRAYS_SQL)
+        count = len(rows)
+        arrays = {
+            column: np.fromiter((row[column] for row in rows), dtype=np.int64, count=count)
+            for column in ('id_odc', 'coverage_id', 'total_port', 'used_ports')
+        }
+        odc_names = {row['id_odc']: row['code_odc'] for row in rows}
+        coverage_names = {row['coverage_id']: row['c_name'] for row in rows}
+        return arrays, odc_names, coverage_names, getattr(rows, 'as_of', None)
+
+    def get_utilization_report(self, top_n=10):
+        """Network-wide utilization summary; None on database error"""
+        try:
+            started = time.perf_counter()
+            arrays, odc_names, coverage_names, as_of = self.load_port_arrays()
+            loaded = time.perf_counter()
+            report = compute_utilization(arrays, odc_names, coverage_names, top_n)
+            report['as_of'] = as_of
+            logger.info(
+                f"Utilization report over {report['odps']} ODPs: loaded in {(loaded - started) * 1000:.0f} ms, "
+                f"computed in {(time.perf_counter() - loaded) * 1000:.1f} ms"
+            )
+            return report
+        except pymysql.Error as e:
+            logger.error(f"MySQL error in get_utilization_report: {e}")
+            return None
+        except Exception as e:
+            logger.error(f"Unexpected error in get_utilization_report: {e}")
+            return None
+
+# Create global report database instance
+report_db = ReportQueries()
@@ -1,22 +1,102 @@
-from database.base_db import BaseDatabase
+from database.base_db import BaseDatabase, table_versions
+from config.settings import LOCATION_CACHE_TTL, COORDINATE_DECIMAL_COLUMNS
 import logging
+import threading
+import time
 
 logger = logging.getLogger(__name__)
 
+class LocationCache:
+    """Process-wide cache of the coverage location list with TTL and change check"""
+
+    def __init__(self, ttl):
+        self.ttl = ttl
+        self.locations = None
+        self.version = 0
+        self.fingerprint = None
+        self.checked_at = 0.0
+        self.lock = threading.Lock()
+
+    def is_fresh(self):
+        return self.locations is not None and time.monotonic() - self.checked_at < self.ttl
+
+    def invalidate(self):
+        with self.lock:
+            self.locations = None
+            self.fingerprint = None
+            self.version += 1
+
+_location_cache = LocationCache(LOCATION_CACHE_TTL)
+
 class SharedQueries(BaseDatabase):
     """Shared database queries used across multiple modules"""
-    
+
+    QUERY_TIMEOUTS = {"get_location_snapshot": 5}
+
+    LOCATIONS_SQL = "SELECT coverage_id, c_name FROM coverage WHERE c_name IS NOT NULL AND c_name != '' ORDER BY c_name"
+
+    # Cheap change check: row count, highest id and a CRC over the displayed columns
+    LOCATIONS_FINGERPRINT_SQL = """
+    SELECT
+        COUNT(*) as total,
+        COALESCE(MAX(coverage_id), 0) as max_id,
+        COALESCE(SUM(CRC32(CONCAT_WS('|', coverage_id, c_name))), 0) as checksum
+    FROM coverage
+    """
+
+    @staticmethod
+    def _decimal_coordinate_columns(alias, prefix):
+        """Extra SELECT columns for the backfilled decimal coordinates, when they are enabled"""
+        if not COORDINATE_DECIMAL_COLUMNS:
+            return ""
+        return f", {alias}.lat_decimal as {prefix}_lat_decimal, {alias}.lng_decimal as {prefix}_lng_decimal"
+
+    def _get_locations_fingerprint(self):
+        row = self.execute_query(self.LOCATIONS_FINGERPRINT_SQL)[0]
+        return (row["total"], row["max_id"], row["checksum"])
+
+    def get_location_snapshot(self):
+        """Get (version, locations); version changes whenever the cached list is reloaded"""
+        cache = _location_cache
+        if cache.is_fresh():
+            return cache.version, cache.locations
+
+        with cache.lock:
+            if cache.is_fresh():
+                return cache.version, cache.locations
+            try:
+                fingerprint = self._get_locations_fingerprint()
+                if cache.locations is not None and fingerprint == cache.fingerprint:
+                    cache.checked_at = time.monotonic()
+                    return cache.version, cache.locations
+
+                if cache.fingerprint is not None:
+                    table_versions.bump("coverage")
+                results = self.execute_query(self.LOCATIONS_SQL)
+                locations = [(row["coverage_id"], row["c_name"]) for row in results if row["c_name"]]
+                cache.locations = locations
+                cache.fingerprint = fingerprint
+                cache.checked_at = time.monotonic()
+                cache.version += 1
+                logger.info(f"Retrieved {len(locations)} unique locations (cache version {cache.version})")
+                return cache.version, locations
+            except Exception as e:
+                logger.error(f"Error in get_location_snapshot: {e}")
+                # Serve the last known list rather than nothing while the database is unhappy,
+                # and keep serving it for a TTL instead of retrying on every button press
+                if cache.locations is not None:
+                    cache.checked_at = time.monotonic()
+                    return cache.version, cache.locations
+                return cache.version, []
+
     def get_all_locations(self):
         """Get all coverage locations - shared implementation"""
-        try:
-            sql = "SELECT coverage_id, c_name FROM coverage WHERE c_name IS NOT NULL AND c_name != '' ORDER BY c_name"
-            results = self.execute_query(sql)
-            locations = [(row["coverage_id"], row["c_name"]) for row in results if row["c_name"]]
-            logger.info(f"Retrieved {len(locations)} unique locations")
-            return locations
-        except Exception as e:
-            logger.error(f"Error in get_all_locations: {e}")
-            return []
+        return self.get_location_snapshot()[1]
+
+    def invalidate_locations(self):
+        """Drop the cached location list so the next call reloads it"""
+        _location_cache.invalidate()
+        logger.info("Location cache invalidated")
 
 # Create global shared instance
-shared_db = SharedQueries()
\ No newline at end of file
+shared_db = SharedQueries()
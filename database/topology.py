@@ -0,0 +1,272 @@
+import logging
+import threading
+import time
+from database.base_db import BaseDatabase, AsyncQueryProxy
+from database.change_tracker import RefreshedStructure, TableChangeTracker, APPENDED, UNCHANGED
+from database.records import CoverageNode, OdcNode, OdpNode, CustomerNode, OdpRow, CustomerRow
+from config.settings import TOPOLOGY_REFRESH_INTERVAL, COORDINATE_DECIMAL_COLUMNS
+
+logger = logging.getLogger(__name__)
+
+class TopologyTable:
+    """How one table is read into snapshot nodes and grouped under its parent"""
+
+    __slots__ = ("table", "id_column", "columns", "node_type", "parent_attribute", "sort_attribute")
+
+    def __init__(self, table, id_column, columns, node_type, parent_attribute=None, sort_attribute=None):
+        self.table = table
+        self.id_column = id_column
+        self.columns = columns  # (sql column, node attribute) pairs
+        self.node_type = node_type
+        self.parent_attribute = parent_attribute
+        self.sort_attribute = sort_attribute
+
+
+# Parents before children; each level is grouped by parent_attribute and ordered by sort_attribute
+TOPOLOGY_TABLES = (
+    TopologyTable("coverage", "coverage_id", (("c_name", "c_name"),), CoverageNode),
+    TopologyTable(
+        "m_odc", "id_odc",
+        (("code_odc", "code_odc"), ("coverage_odc", "coverage_id"), ("latitude", "latitude"), ("longitude", "longitude")),
+        OdcNode, "coverage_id", "code_odc"
+    ),
+    TopologyTable(
+        "m_odp", "id_odp",
+        (("code_odp", "code_odp"), ("code_odc", "id_odc"), ("latitude", "latitude"),
+         ("longitude", "longitude"), ("total_port", "total_port"))
+        # Backfilled decimal coordinates spare the nearest ODP index from parsing raw strings
+        + ((("lat_decimal", "lat_decimal"), ("lng_decimal", "lng_decimal")) if COORDINATE_DECIMAL_COLUMNS else ()),
+        OdpNode, "id_odc", "code_odp"
+    ),
+    TopologyTable(
+        "customer", "customer_id",
+        (("name", "name"), ("address", "address"), ("no_port_odp", "no_port_odp"),
+         ("id_odp", "id_odp"), ("id_odc", "id_odc")),
+        CustomerNode, "id_odp", "no_port_odp"
+    ),
+)
+
+# Above this share of changed rows a table is reloaded whole instead of row by row
+FULL_RELOAD_FRACTION = 0.3
+
+# Ids per IN (...) query when reading changed rows
+FETCH_CHUNK_SIZE = 1000
+
+def _sorted_ids(ids, nodes, sort_attribute):
+    def key(node_id):
+        value = getattr(nodes[node_id], sort_attribute)
+        return (value is None, value if value is not None else 0, node_id)
+    return tuple(sorted(ids, key=key))
+
+def _group(nodes, parent_attribute, sort_attribute):
+    """parent id -> ordered child ids"""
+    groups = {}
+    for node_id, node in nodes.items():
+        groups.setdefault(getattr(node, parent_attribute), []).append(node_id)
+    return {parent: _sorted_ids(ids, nodes, sort_attribute) for parent, ids in groups.items()}
+
+def _regroup(groups, nodes, old_nodes, touched, parent_attribute, sort_attribute):
+    """Copy of groups with only the parents of touched nodes recomputed"""
+    affected = {getattr(old_nodes[i], parent_attribute) for i in touched if i in old_nodes}
+    affected |= {getattr(nodes[i], parent_attribute) for i in touched if i in nodes}
+    groups = dict(groups)
+    for parent in affected:
+        ids = [i for i in groups.get(parent, ()) if i not in touched]
+        ids += [i for i in touched if i in nodes and getattr(nodes[i], parent_attribute) == parent]
+        if ids:
+            groups[parent] = _sorted_ids(ids, nodes, sort_attribute)
+        else:
+            groups.pop(parent, None)
+    return groups
+
+
+class TopologySnapshot:
+    """Immutable coverage → ODC → ODP → customer tree; refreshes build a new one and swap it in"""
+
+    __slots__ = ("version", "nodes", "children", "locations")
+
+    def __init__(self, version, nodes, children, locations):
+        self.version = version
+        self.nodes = nodes        # table -> {id: node}
+        self.children = children  # table -> {parent id: ordered child ids}
+        self.locations = locations
+
+    @classmethod
+    def empty(cls):
+        return cls(0, {spec.table: {} for spec in TOPOLOGY_TABLES}, {spec.table: {} for spec in TOPOLOGY_TABLES}, [])
+
+    @staticmethod
+    def build_locations(coverages):
+        """(coverage_id, c_name) of named coverages in name order, as the location menus list them"""
+        named = [(node.coverage_id, node.c_name) for node in coverages.values() if node.c_name]
+        return sorted(named, key=lambda location: location[1])
+
+    def coverage_name(self, coverage_id):
+        coverage = self.nodes["coverage"].get(coverage_id)
+        return coverage.c_name if coverage else None
+
+    def odps_with_customers(self, coverage_id):
+        """ODPs of a coverage that have customers, ordered by ODC then ODP code"""
+        c_name = self.coverage_name(coverage_id)
+        if c_name is None:
+            return []
+        odcs, odps = self.nodes["m_odc"], self.nodes["m_odp"]
+        customers_by_odp = self.children["customer"]
+        values = []
+        for id_odc in self.children["m_odc"].get(coverage_id, ()):
+            code_odc = odcs[id_odc].code_odc
+            for id_odp in self.children["m_odp"].get(id_odc, ()):
+                customer_count = len(customers_by_odp.get(id_odp, ()))
+                if customer_count:
+                    odp = odps[id_odp]
+                    values.append((
+                        id_odp, odp.code_odp, code_odc, c_name, odp.total_port, customer_count,
+                        odp.latitude, odp.longitude
+                    ))
+        columns = ("id_odp", "code_odp", "code_odc", "c_name", "total_port", "customer_count",
+                   "odp_latitude", "odp_longitude")
+        return OdpRow.from_rows(columns, values)
+
+    def customers_in_odp(self, id_odp):
+        """Customers connected to an ODP, ordered by port"""
+        odp = self.nodes["m_odp"].get(id_odp)
+        if odp is None:
+            return []
+        odcs, customers = self.nodes["m_odc"], self.nodes["customer"]
+        values = []
+        for customer_id in self.children["customer"].get(id_odp, ()):
+            customer = customers[customer_id]
+            # The customer's own ODC, as the customer lookup query joins it
+            odc = odcs.get(customer.id_odc)
+            c_name = self.coverage_name(odc.coverage_id) if odc else None
+            if c_name is None:
+                continue
+            values.append((customer.name, customer.address, customer.no_port_odp, odp.code_odp, odc.code_odc, c_name))
+        columns = ("name", "address", "no_port_odp", "code_odp", "code_odc", "c_name")
+        return CustomerRow.from_rows(columns, values)
+
+
+class NetworkTopology(RefreshedStructure):
+    """Keeps a TopologySnapshot in sync with the coverage, ODC, ODP and customer tables
+
+    Appended rows are read by id range; other changes are found by diffing per-row
+    checksums, so only changed rows are read again.
+    """
+
+    DESCRIPTION = "Topology snapshot"
+
+    def __init__(self, db, refresh_interval):
+        self.db = db
+        self.refresh_interval = refresh_interval
+        self.trackers = {
+            spec.table: TableChangeTracker(db, spec.table, spec.id_column, [column for column, _ in spec.columns])
+            for spec in TOPOLOGY_TABLES
+        }
+        self._snapshot = None
+        self._refreshed_at = 0.0
+        self._refresh_lock = threading.Lock()
+        self.aio = AsyncQueryProxy(self)
+
+    @property
+    def is_ready(self):
+        return self._snapshot is not None
+
+    def _select_sql(self, spec):
+        columns = ", ".join(f"{column} as {attribute}" for column, attribute in spec.columns)
+        row_expr = self.trackers[spec.table].row_expr
+        return f"SELECT {spec.id_column}, {columns}, {row_expr} as row_crc FROM {spec.table}"
+
+    def _fetch(self, spec, where, params):
+        return self.db.execute_query(f"{self._select_sql(spec)} WHERE {where}", params, row_type=spec.node_type)
+
+    def _load_table(self, spec, current, change):
+        """Return (nodes, touched ids); touched is None when the table was read whole"""
+        tracker = self.trackers[spec.table]
+        id_column = spec.id_column
+
+        if tracker.has_baseline and change.status == APPENDED:
+            rows = self._fetch(spec, f"{id_column} > %s AND {id_column} <= %s", (change.low_id, change.high_id))
+            nodes = dict(current)
+            nodes.update((getattr(row, id_column), row) for row in rows)
+            return nodes, {getattr(row, id_column) for row in rows}
+
+        if tracker.has_baseline:
+            checksums = self.db.execute_query(
+                f"SELECT {id_column} as node_id, {tracker.row_expr} as row_crc FROM {spec.table} WHERE {id_column} <= %s",
+                (change.high_id,)
+            )
+            latest = {row["node_id"]: row["row_crc"] for row in checksums}
+            changed = [node_id for node_id, crc in latest.items() if node_id not in current or current[node_id].row_crc != crc]
+            deleted = [node_id for node_id in current if node_id not in latest]
+            if len(changed) <= FULL_RELOAD_FRACTION * max(len(latest), 1):
+                nodes = dict(current)
+                for node_id in deleted:
+                    del nodes[node_id]
+                for start in range(0, len(changed), FETCH_CHUNK_SIZE):
+                    chunk = tuple(changed[start:start + FETCH_CHUNK_SIZE])
+                    nodes.update((getattr(row, id_column), row) for row in self._fetch(spec, f"{id_column} IN %s", (chunk,)))
+                logger.info(f"Topology: {len(changed)} changed and {len(deleted)} deleted rows in {spec.table}")
+                return nodes, set(changed) | set(deleted)
+
+        rows = self._fetch(spec, f"{id_column} <= %s", (change.high_id,))
+        return {getattr(row, id_column): row for row in rows}, None
+
+    def refresh(self, seen_at=None):
+        """Apply table changes to a new snapshot and swap it in
+
+        seen_at is the refresh time a caller found stale; if another caller refreshed while
+        this one waited for the lock, there is nothing left to do.
+        """
+        with self._refresh_lock:
+            if seen_at is not None and self._refreshed_at != seen_at:
+                return
+            started = time.perf_counter()
+            old = self._snapshot or TopologySnapshot.empty()
+            changes = {table: tracker.check() for table, tracker in self.trackers.items()}
+
+            nodes, children, touched_tables = {}, {}, []
+            for spec in TOPOLOGY_TABLES:
+                change = changes[spec.table]
+                current = old.nodes[spec.table]
+                if self.trackers[spec.table].has_baseline and change.status == UNCHANGED:
+                    nodes[spec.table], children[spec.table] = current, old.children[spec.table]
+                    continue
+
+                table_nodes, touched = self._load_table(spec, current, change)
+                nodes[spec.table] = table_nodes
+                if touched is None or touched:
+                    touched_tables.append(spec.table)
+                if spec.parent_attribute is None:
+                    children[spec.table] = {}
+                elif touched is None:
+                    children[spec.table] = _group(table_nodes, spec.parent_attribute, spec.sort_attribute)
+                else:
+                    children[spec.table] = _regroup(
+                        old.children[spec.table], table_nodes, current, touched, spec.parent_attribute, spec.sort_attribute
+                    )
+
+            if touched_tables or self._snapshot is None:
+                locations = old.locations
+                if "coverage" in touched_tables or self._snapshot is None:
+                    locations = TopologySnapshot.build_locations(nodes["coverage"])
+                # One attribute assignment: readers see either the old tree or the new one
+                self._snapshot = TopologySnapshot(old.version + 1, nodes, children, locations)
+                logger.info(
+                    f"Topology snapshot v{self._snapshot.version} ({', '.join(touched_tables) or 'empty'} updated): "
+                    + ", ".join(f"{len(nodes[spec.table])} {spec.table}" for spec in TOPOLOGY_TABLES)
+                    + f" in {time.perf_counter() - started:.2f}s"
+                )
+
+            for table, change in changes.items():
+                self.trackers[table].accept(change)
+            self._refreshed_at = time.monotonic()
+
+    def get_snapshot(self):
+        """Current snapshot, refreshed first if due; None if it could not be built yet"""
+        try:
+            self.ensure_fresh()
+        except Exception as e:
+            logger.error(f"Topology snapshot unavailable: {e}")
+        return self._snapshot
+
+network_topology = NetworkTopology(BaseDatabase(), TOPOLOGY_REFRESH_INTERVAL)
@@ -0,0 +1,68 @@
+import logging
+from telegram import Update
+from telegram.ext import ContextTypes
+from config.settings import ADMIN_USER_IDS
+from database.report_queries import report_db
+from utils.message_formatter import format_utilization_report, format_runtime_stats
+from utils.message_handler import MessageHandler
+from utils.error_handler import ErrorHandler
+
+
+logger = logging.getLogger(__name__)
+
+def is_admin(update: Update):
+    """Whether the update comes from a user listed in ADMIN_USER_IDS"""
+    return update.effective_user is not None and update.effective_user.id in ADMIN_USER_IDS
+
+async def utilization_report(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin command: network-wide port utilization summary"""
+    ErrorHandler.log_handler_entry("utilization_report", update)
+    
+    try:
+        if not is_admin(update):
+            logger.warning(f"User {update.effective_user.id if update.effective_user else 'unknown'} denied /utilization")
+            await update.message.reply_text("❌ Perintah ini hanya untuk admin.")
+            return
+        
+        await update.message.reply_text("⏳ Menyusun laporan utilisasi...")
+        report = await report_db.aio.get_utilization_report()
+        if report is None:
+            return await ErrorHandler.handle_error(update, "Utilization report unavailable", "database_error", None)
+        
+        await MessageHandler.send_long_message(
+            update, format_utilization_report(report), parse_mode=None, is_callback=False
+        )
+        
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", None)
+
+async def runtime_stats(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    """Admin command: update processor, connection pool and availability counters of this process
+
+    With BOT_WORKERS above 1 these are the counters of the worker that owns the admin's chat.
+    """
+    ErrorHandler.log_handler_entry("runtime_stats", update)
+    
+    try:
+        if not is_admin(update):
+            logger.warning(f"User {update.effective_user.id if update.effective_user else 'unknown'} denied /stats")
+            await update.message.reply_text("❌ Perintah ini hanya untuk admin.")
+            return
+        
+        update_processor = context.application.update_processor
+        availability = report_db.get_availability_stats()
+        sections = [
+            ("Update", update_processor.get_stats() if hasattr(update_processor, "get_stats") else None),
+            ("Koneksi DB", report_db.get_pool_stats()),
+            ("Circuit breaker", availability['circuit']),
+            ("Offline snapshot", availability['offline_snapshot']),
+            ("Query coalescing", report_db.get_coalesce_stats()),
+        ]
+        logger.info(f"Runtime stats: {dict(sections)}")
+        
+        await MessageHandler.send_long_message(
+            update, format_runtime_stats(sections), parse_mode=None, is_callback=False
+        )
+        
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", None)
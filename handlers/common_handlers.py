@@ -17,8 +17,7 @@ async def start(update: Update, context: ContextTypes.DEFAULT_TYPE):
         user_id = update.effective_user.id
         
         # Clear any existing conversation state
-        if user_id in user_location:
-            del user_location[user_id]
+        if user_location.pop(user_id, None) is not None:
             logger.info(f"Cleared conversation state for user {user_id}")
         
         await show_main_menu(update, is_callback=False)
@@ -34,6 +33,7 @@ async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     
     try:
         user_id = update.effective_user.id if update.effective_user else "unknown"
+        user_location.pop(user_id, None)
         logger.info(f"Cancel command executed for user {user_id}")
         
         message = "Proses dibatalkan. Gunakan /cancel kapan saja untuk membatalkan operasi."
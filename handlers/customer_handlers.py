@@ -4,13 +4,15 @@ from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
 from telegram.constants import ParseMode
 from database.customer_queries import customer_db
-from utils.constants import     SELECT_LOCATION, CUSTOMER_SELECT_LOCATION, CUSTOMER_SELECT_ODP, CUSTOMER_NAVIGATE, CUSTOMER_NAME_SEARCH
-from utils.message_formatter import format_customer_search_results, format_customers_in_odp
+from utils.constants import     SELECT_LOCATION, CUSTOMER_SELECT_LOCATION, CUSTOMER_SELECT_ODP, CUSTOMER_NAVIGATE, CUSTOMER_NAME_SEARCH, \
+    CUSTOMER_PHONE_SEARCH, CUSTOMER_ADDRESS_SEARCH
+from utils.message_formatter import format_customer_search_results, format_customer_search_page, format_customers_in_odp
 from utils.ui_components import KeyboardBuilder, MessageTemplates
 from utils.helpers import show_main_menu
 from utils.message_handler import MessageHandler
 from utils.error_handler import ErrorHandler
 from database.shared_queries import shared_db
+from database.topology import network_topology
 from handlers.base_handler import BaseHandler
 
 
@@ -51,6 +53,19 @@ async def handle_customer_lookup_selection(update: Update, context: CallbackCont
         elif query.data == "customer_by_name":
             await query.edit_message_text(MessageTemplates.SEARCH_PROMPT_MESSAGE)
             return CUSTOMER_NAME_SEARCH  
+        elif query.data == "customer_by_phone":
+            await query.edit_message_text(MessageTemplates.PHONE_SEARCH_PROMPT_MESSAGE)
+            return CUSTOMER_PHONE_SEARCH
+        elif query.data == "customer_by_address":
+            await query.edit_message_text(MessageTemplates.ADDRESS_SEARCH_PROMPT_MESSAGE)
+            return CUSTOMER_ADDRESS_SEARCH
+        elif query.data == "search_page_next":
+            return await show_search_page(update, context, 1)
+        elif query.data == "search_page_prev":
+            return await show_search_page(update, context, -1)
+        elif query.data.startswith("suggest_"):
+            customer_id = int(query.data.replace("suggest_", ""))
+            return await show_suggested_customer(update, context, customer_id)
         elif query.data == "back_to_main_menu":
             await show_main_menu(update, is_callback=True)
             return SELECT_LOCATION
@@ -68,13 +83,21 @@ async def show_customer_location_selection(update: Update, context: CallbackCont
     
     try:
         query = update.callback_query
-        locations = shared_db.get_all_locations()
+        # Navigation is answered from the in-memory topology; the queries are only a fallback
+        snapshot = await network_topology.aio.get_snapshot()
+        if snapshot is not None:
+            cache_key, version, locations = "customer_locations", snapshot.version, snapshot.locations
+        else:
+            version, locations = await shared_db.aio.get_location_snapshot()
+            cache_key = "customer_locations_db"
         
         if not locations:
             await query.edit_message_text("❌ Tidak ada lokasi tersedia.")
             return ConversationHandler.END
 
-        reply_markup = KeyboardBuilder.customer_location_keyboard(locations)
+        reply_markup = KeyboardBuilder.cached_keyboard(
+            cache_key, version, KeyboardBuilder.customer_location_keyboard, locations
+        )
         message = "🔍 Pilih lokasi untuk melihat pelanggan:"
 
         await query.edit_message_text(message, reply_markup=reply_markup)
@@ -115,7 +138,11 @@ async def show_odp_selection(update: Update, context: CallbackContext, coverage_
     
     try:
         query = update.callback_query
-        odps = customer_db.get_odps_by_coverage(coverage_id)
+        snapshot = await network_topology.aio.get_snapshot()
+        if snapshot is not None:
+            odps = snapshot.odps_with_customers(coverage_id)
+        else:
+            odps = await customer_db.aio.get_odps_by_coverage(coverage_id)
         
         if not odps:
             await query.edit_message_text(
@@ -182,24 +209,150 @@ async def handle_customer_name_search(update: Update, context: CallbackContext):
         searching_message = await update.message.reply_text(MessageTemplates.SEARCHING_MESSAGE)
         
         # Search customers
-        customers = customer_db.search_customers_by_name(user_input)
+        page = await start_customer_search(context, "name", user_input)
 
-        if not customers:
-            reply_markup = KeyboardBuilder.no_results_keyboard()
+        if not page.customers:
+            # Near-misses from the in-memory index instead of another retry round trip
+            suggestions = await customer_db.aio.suggest_customers(user_input)
+            reply_markup = KeyboardBuilder.no_results_keyboard(suggestions)
             
             await searching_message.edit_text(
-                MessageTemplates.no_customers_found(user_input),
+                MessageTemplates.no_customers_found(user_input, suggestions),
                 reply_markup=reply_markup
             )
             return CUSTOMER_SELECT_LOCATION
         
-        # Format and send results
-        messages = format_customer_search_results(user_input, customers)
-        reply_markup = KeyboardBuilder.search_results_keyboard()
-        await MessageHandler.send_long_message(update, messages, reply_markup, is_callback=False)
+        # Results replace the searching message; further pages edit it in place
+        return await send_search_page(searching_message.edit_text, context, page)
         
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
+
+async def handle_customer_phone_search(update: Update, context: CallbackContext):
+    """Handle customer WhatsApp number search input"""
+    ErrorHandler.log_handler_entry("handle_customer_phone_search", update)
+
+    try:
+        user_input = update.message.text.strip()
+        logger.info(f"User {update.effective_user.id} searching for phone: {user_input}")
+
+        if sum(char.isdigit() for char in user_input) < 4:
+            await update.message.reply_text(
+                "❌ Silakan masukkan minimal 4 digit nomor.\n\n"
+                "Coba lagi atau gunakan /cancel untuk membatalkan."
+            )
+            return CUSTOMER_PHONE_SEARCH
+
+        searching_message = await update.message.reply_text(MessageTemplates.SEARCHING_MESSAGE)
+        page = await start_customer_search(context, "phone", user_input)
+        return await send_search_results(searching_message, context, user_input, page)
+
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
+
+async def handle_customer_address_search(update: Update, context: CallbackContext):
+    """Handle customer address search input"""
+    ErrorHandler.log_handler_entry("handle_customer_address_search", update)
+
+    try:
+        user_input = update.message.text.strip()
+        logger.info(f"User {update.effective_user.id} searching for address: {user_input}")
+
+        if len(user_input) < 2:
+            await update.message.reply_text(MessageTemplates.input_too_short())
+            return CUSTOMER_ADDRESS_SEARCH
+
+        searching_message = await update.message.reply_text(MessageTemplates.SEARCHING_MESSAGE)
+        page = await start_customer_search(context, "address", user_input)
+        return await send_search_results(searching_message, context, user_input, page)
+
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
+
+async def start_customer_search(context: CallbackContext, mode, search_term):
+    """Remember the search in user_data and fetch its first page"""
+    # cursors[n] is the cursor that fetches page n; page 0 starts without one
+    context.user_data['customer_search'] = {'mode': mode, 'term': search_term, 'cursors': [None], 'page': 0}
+    return await customer_db.aio.search_customers_page(mode, search_term)
+
+async def send_search_results(searching_message, context: CallbackContext, search_term, page):
+    """Replace the searching message with the first results page, or with a no-results message"""
+    if not page.customers:
+        await searching_message.edit_text(
+            MessageTemplates.no_customers_found(search_term),
+            reply_markup=KeyboardBuilder.no_results_keyboard()
+        )
         return CUSTOMER_SELECT_LOCATION
-        
+
+    return await send_search_page(searching_message.edit_text, context, page)
+
+async def send_search_page(edit_message, context: CallbackContext, page):
+    """Render the current search page into one message through edit_message"""
+    search = context.user_data['customer_search']
+    if page.next_cursor is not None and len(search['cursors']) == search['page'] + 1:
+        search['cursors'].append(page.next_cursor)
+
+    message = format_customer_search_page(
+        search['term'], page.customers, search['page'], customer_db.SEARCH_PAGE_SIZE, page.total
+    )
+    reply_markup = KeyboardBuilder.search_results_keyboard(
+        has_previous=search['page'] > 0,
+        has_next=page.next_cursor is not None
+    )
+    await edit_message(
+        message,
+        reply_markup=reply_markup,
+        parse_mode=ParseMode.MARKDOWN,
+        disable_web_page_preview=True
+    )
+    return CUSTOMER_SELECT_LOCATION
+
+async def show_search_page(update: Update, context: CallbackContext, step: int):
+    """Move the current search step pages forward (1) or back (-1), editing the results message"""
+    ErrorHandler.log_handler_entry("show_search_page", update)
+
+    try:
+        query = update.callback_query
+        search = context.user_data.get('customer_search')
+
+        if not search:
+            await query.edit_message_text(
+                "❌ Sesi pencarian sudah berakhir. Silakan cari lagi.",
+                reply_markup=KeyboardBuilder.no_results_keyboard()
+            )
+            return CUSTOMER_SELECT_LOCATION
+
+        page_index = search['page'] + step
+        if page_index < 0 or page_index >= len(search['cursors']):
+            return CUSTOMER_SELECT_LOCATION
+
+        search['page'] = page_index
+        page = await customer_db.aio.search_customers_page(search['mode'], search['term'], search['cursors'][page_index])
+        if page.restarted:
+            # The search switched between the index and the LIKE fallback; its cursors are void
+            search['cursors'], search['page'] = [None], 0
+        return await send_search_page(query.edit_message_text, context, page)
+
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
+
+async def show_suggested_customer(update: Update, context: CallbackContext, customer_id: int):
+    """Show the customer picked from the fuzzy search suggestions"""
+    ErrorHandler.log_handler_entry("show_suggested_customer", update)
+
+    try:
+        customers = await customer_db.aio.get_customers_by_ids([customer_id])
+
+        if not customers:
+            await update.callback_query.edit_message_text("❌ Customer tidak ditemukan.")
+            return CUSTOMER_SELECT_LOCATION
+
+        messages = format_customer_search_results(customers[0].get('name', ''), customers)
+        reply_markup = KeyboardBuilder.search_results_keyboard()
+        await MessageHandler.send_long_message(update, messages, reply_markup, is_callback=True)
+
+        return CUSTOMER_SELECT_LOCATION
+
     except Exception as e:
         return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
 
@@ -209,25 +362,20 @@ async def show_customers_in_odp(update: Update, context: CallbackContext, id_odp
 
     try:
         query = update.callback_query
-        customers = customer_db.get_customers_by_odp(id_odp)
+        snapshot = await network_topology.aio.get_snapshot()
+        if snapshot is not None:
+            customers = snapshot.customers_in_odp(id_odp)
+        else:
+            customers = await customer_db.aio.get_customers_by_odp(id_odp)
         
         if not customers:
             await query.edit_message_text("❌ Tidak ada pelanggan aktif di ODP ini.")
             return ConversationHandler.END
         
-        # Format customer list message
-        message = format_customers_in_odp(customers)
-        
-        # Handle long messages
-        if len(message) > MessageHandler.MAX_MESSAGE_LENGTH:
-            messages = [message[i:i+MessageHandler.MAX_MESSAGE_LENGTH] for i in range(0, len(message), MessageHandler.MAX_MESSAGE_LENGTH)]
-            await MessageHandler.send_long_message(update, messages[:-1], None, is_callback=True)
-            message = messages[-1]
-
-        
+        # Customer list split between whole entries; names are shown as plain text
+        messages = format_customers_in_odp(customers)
         reply_markup = KeyboardBuilder.customer_navigation_keyboard()
-        
-        await query.edit_message_text(message, reply_markup=reply_markup)
+        await MessageHandler.send_long_message(update, messages, reply_markup, parse_mode=None, is_callback=True)
         return CUSTOMER_NAVIGATE
         
     except Exception as e:
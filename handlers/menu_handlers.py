@@ -3,6 +3,7 @@ from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
 from utils.helpers import show_location_selection
 from handlers.customer_handlers import show_customer_lookup_options
+from handlers.port_handlers import ask_for_nearest_location
 from handlers.base_handler import BaseHandler
 from utils.error_handler import ErrorHandler
 
@@ -24,6 +25,8 @@ async def handle_main_menu(update: Update, context: CallbackContext):
             return await show_location_selection(update, is_callback=True)
         elif query.data == "find_customer":
             return await show_customer_lookup_options(update, context)
+        elif query.data == "nearest_odp":
+            return await ask_for_nearest_location(update, context)
         else:
             await query.edit_message_text("❌ Pilihan tidak dikenal. Silakan mulai ulang dengan /start")
             return ConversationHandler.END
@@ -1,11 +1,15 @@
 import logging
 from telegram import Update
 from telegram.ext import CallbackContext, ConversationHandler
+from telegram.constants import ParseMode
+from telegram.error import BadRequest
+from config.settings import PORT_PAGE_SIZE, NEAREST_ODP_COUNT, NEAREST_ODP_MAX_DISTANCE_KM
 from database.port_queries import port_db
-from utils.constants import user_location, NAVIGATE, SELECT_LOCATION
+from database.odp_locator import odp_locator
+from utils.constants import user_location, NAVIGATE, SELECT_LOCATION, NEAREST_ODP
 from utils.helpers import show_location_selection
-from utils.message_formatter import format_port_availability_message
-from utils.ui_components import KeyboardBuilder
+from utils.message_formatter import format_port_availability_page, port_page_count, port_odc_pages, format_nearest_odps
+from utils.ui_components import KeyboardBuilder, MessageTemplates
 from utils.error_handler import ErrorHandler
 from handlers.base_handler import BaseHandler
 
@@ -28,32 +32,24 @@ async def location_selected(update: Update, context: CallbackContext):
         selected_data = query.data
         
         # Handle main menu selections
-        if selected_data in ["check_ports", "find_customer"]:
+        if selected_data in ["check_ports", "find_customer", "nearest_odp"]:
             from handlers.menu_handlers import handle_main_menu
             return await handle_main_menu(update, context)
         
         # Handle port check location selection
         if selected_data.isdigit():
             coverage_id = int(selected_data)
-            location_data = port_db.get_location_data(coverage_id)
+            location_data = await port_db.aio.get_location_data(coverage_id)
             
             if location_data is None:
                 await query.answer("âŒ Terjadi kesalahan database")
             
             if location_data:
                 user_location[user_id] = location_data
-                location_name = location_data[0].get('c_name', 'Unknown')
-                
-                messages = format_port_availability_message(location_name, location_data)
-                reply_markup = KeyboardBuilder.port_navigation_keyboard()
+                logger.debug(f"Session store: {user_location.get_stats()}")
                 
                 await BaseHandler.safe_callback_answer(update)
-                await query.edit_message_text("Lokasi berhasil diset.")
-                
-                from utils.message_handler import MessageHandler
-                await MessageHandler.send_long_message(update, messages, reply_markup, is_callback=True)
-                
-                return NAVIGATE
+                return await show_port_page(query, location_data, 0)
             else:
                 await query.answer("âŒ Lokasi tidak ditemukan")
 
@@ -79,9 +75,99 @@ async def handle_port_navigation(update: Update, context: CallbackContext):
         # Handle port-specific navigation
         if query.data == "back_to_locations":
             return await show_location_selection(update, is_callback=True)
+        elif query.data == "port_page_noop":
+            return NAVIGATE
+        elif query.data.startswith("port_page_"):
+            # Pages are rendered from the rows kept for this user; no new query
+            location_data = user_location.get(query.from_user.id)
+            if not location_data:
+                return await show_location_selection(update, is_callback=True)
+            return await show_port_page(query, location_data, int(query.data.replace("port_page_", "")))
         else:
             return await ErrorHandler.handle_error(update, context, "Unknown option", "invalid_selection", ConversationHandler.END)
 
     
     except Exception as e:
         return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
+
+async def show_port_page(query, location_data, page_index):
+    """Edit the port availability message in place to show one page"""
+    location_name = location_data[0].get('c_name', 'Unknown')
+    page_count = port_page_count(location_data, PORT_PAGE_SIZE)
+    page_index = min(max(page_index, 0), page_count - 1)
+    
+    message = format_port_availability_page(
+        location_name, location_data, page_index, PORT_PAGE_SIZE, as_of=getattr(location_data, 'as_of', None)
+    )
+    reply_markup = KeyboardBuilder.port_page_keyboard(
+        page_index, page_count, port_odc_pages(location_data, PORT_PAGE_SIZE)
+    )
+    
+    try:
+        await query.edit_message_text(
+            message,
+            reply_markup=reply_markup,
+            parse_mode=ParseMode.MARKDOWN,
+            disable_web_page_preview=True
+        )
+    except BadRequest as e:
+        # A button of an older keyboard can still point at the page already shown
+        if "not modified" not in str(e).lower():
+            raise
+    return NAVIGATE
+
+async def ask_for_nearest_location(update: Update, context: CallbackContext):
+    """Ask for the location to search nearest ODPs from, with a button that shares it"""
+    ErrorHandler.log_handler_entry("ask_for_nearest_location", update)
+
+    try:
+        query = update.callback_query
+        await query.edit_message_text(MessageTemplates.NEAREST_ODP_PROMPT_MESSAGE)
+        # Location buttons exist only on reply keyboards, so they go on a message of their own
+        await query.message.reply_text("👇", reply_markup=KeyboardBuilder.share_location_keyboard())
+        return NEAREST_ODP
+    
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
+
+async def nearest_odp_location_received(update: Update, context: CallbackContext):
+    """Answer a shared location with the nearest ODPs that still have free ports"""
+    ErrorHandler.log_handler_entry("nearest_odp_location_received", update)
+
+    try:
+        location = update.message.location
+        odps = await odp_locator.aio.nearest_available(location.latitude, location.longitude, NEAREST_ODP_COUNT)
+        
+        if odps is None:
+            return await ErrorHandler.handle_error(update, "Nearest ODP search unavailable", "database_error", NEAREST_ODP)
+        
+        await update.message.reply_text(
+            format_nearest_odps(odps, NEAREST_ODP_MAX_DISTANCE_KM),
+            reply_markup=KeyboardBuilder.nearest_odp_keyboard(),
+            parse_mode=ParseMode.MARKDOWN,
+            disable_web_page_preview=True
+        )
+        return NEAREST_ODP
+    
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
+
+async def handle_nearest_odp_navigation(update: Update, context: CallbackContext):
+    """Handle navigation buttons under the nearest ODP results"""
+    ErrorHandler.log_handler_entry("handle_nearest_odp_navigation", update)
+
+    try:
+        query = update.callback_query
+        await BaseHandler.safe_callback_answer(update)
+        
+        common_result = await BaseHandler.handle_common_navigation(update, context, query.data)
+        if common_result is not None:
+            return common_result
+        
+        if query.data == "nearest_odp":
+            return await ask_for_nearest_location(update, context)
+        else:
+            return await ErrorHandler.handle_error(update, f"Unknown option {query.data}", "invalid_selection", ConversationHandler.END)
+    
+    except Exception as e:
+        return await ErrorHandler.handle_error(update, e, "system_error", ConversationHandler.END)
@@ -1,35 +1,85 @@
+import asyncio
 import logging
 from telegram.ext import Application, CommandHandler, CallbackQueryHandler, ConversationHandler, MessageHandler, filters
 
-from config.settings import TELEGRAM_TOKEN, validate_environment
+from config.settings import (
+    TELEGRAM_TOKEN, validate_environment, BOT_MODE, WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH,
+    WEBHOOK_URL, WEBHOOK_SECRET_TOKEN, WEBHOOK_MAX_CONNECTIONS, MAX_CONCURRENT_UPDATES, BOT_WORKERS,
+    PERSISTENCE_PATH, PERSISTENCE_FLUSH_INTERVAL
+)
 from utils.constants import (
     SELECT_LOCATION, NAVIGATE, CUSTOMER_SELECT_LOCATION, 
-    CUSTOMER_SELECT_ODP, CUSTOMER_NAVIGATE, CUSTOMER_NAME_SEARCH
+    CUSTOMER_SELECT_ODP, CUSTOMER_NAVIGATE, CUSTOMER_NAME_SEARCH,
+    CUSTOMER_PHONE_SEARCH, CUSTOMER_ADDRESS_SEARCH, NEAREST_ODP, user_location
 )
 from handlers.common_handlers import start, cancel
-from handlers.port_handlers import cekodp, location_selected, handle_port_navigation
+from handlers.port_handlers import (
+    cekodp, location_selected, handle_port_navigation, nearest_odp_location_received, handle_nearest_odp_navigation
+)
 from handlers.customer_handlers import (
     handle_customer_lookup_selection, handle_customer_location_selection,
-    handle_customer_navigation, handle_customer_name_search
+    handle_customer_navigation, handle_customer_name_search,
+    handle_customer_phone_search, handle_customer_address_search
 )
 from handlers.menu_handlers import handle_navigation
+from handlers.admin_handlers import utilization_report, runtime_stats
+from database.base_db import db_executor
+from database.port_usage import port_usage
+from database.customer_index import customer_index
+from database.topology import network_topology
+from utils.webhook_server import run_webhook_server
+from utils.update_processor import PerChatUpdateProcessor
+from utils.sharded_workers import ShardedDispatcher
+from utils.persistence import SQLitePersistence, worker_path
 
 logger = logging.getLogger(__name__)
 
-def create_application():
-    """Create and configure the bot application"""
+# A shared location message; a live location's periodic edits are not new searches
+SHARED_LOCATION = filters.LOCATION & ~filters.UpdateType.EDITED_MESSAGE
+
+async def warm_up(application):
+    """Build in-memory data structures before the first update arrives"""
+    loop = asyncio.get_running_loop()
+    for structure in (port_usage, customer_index, network_topology):
+        try:
+            await loop.run_in_executor(db_executor, structure.ensure_fresh)
+        except Exception as e:
+            # Not fatal: every structure is also built lazily on first use
+            logger.warning(f"Warm-up of {type(structure).__name__} failed: {e}")
+
+def create_application(with_updater=True, worker_index=None):
+    """Create and configure the bot application
+
+    Worker processes pass with_updater=False: their updates arrive from the front process.
+    Their worker_index selects a persistence file of their own.
+    """
     try:
         # Validate environment
         validate_environment()
         
         # Create application
-        application = Application.builder().token(TELEGRAM_TOKEN).build()
+        builder = (
+            Application.builder()
+            .token(TELEGRAM_TOKEN)
+            .concurrent_updates(PerChatUpdateProcessor(MAX_CONCURRENT_UPDATES))
+            .post_init(warm_up)
+        )
+        if not with_updater:
+            builder = builder.updater(None)
+        if PERSISTENCE_PATH:
+            path = PERSISTENCE_PATH if worker_index is None else worker_path(PERSISTENCE_PATH, worker_index)
+            builder = builder.persistence(
+                SQLitePersistence(path, PERSISTENCE_FLUSH_INTERVAL, sessions=user_location)
+            )
+        application = builder.build()
         
         # Create conversation handler
         main_conv_handler = ConversationHandler(
             entry_points=[
                 CommandHandler("start", start),
-                CommandHandler("cekodp", cekodp)
+                CommandHandler("cekodp", cekodp),
+                # A shared location starts a nearest ODP search from anywhere
+                MessageHandler(SHARED_LOCATION, nearest_odp_location_received)
             ],
             states={
                 SELECT_LOCATION: [CallbackQueryHandler(location_selected)],
@@ -37,7 +87,13 @@ def create_application():
                 CUSTOMER_SELECT_LOCATION: [CallbackQueryHandler(handle_customer_lookup_selection)],
                 CUSTOMER_SELECT_ODP: [CallbackQueryHandler(handle_customer_location_selection)],
                 CUSTOMER_NAVIGATE: [CallbackQueryHandler(handle_customer_navigation)],
-                CUSTOMER_NAME_SEARCH: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_customer_name_search)]
+                CUSTOMER_NAME_SEARCH: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_customer_name_search)],
+                CUSTOMER_PHONE_SEARCH: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_customer_phone_search)],
+                CUSTOMER_ADDRESS_SEARCH: [MessageHandler(filters.TEXT & ~filters.COMMAND, handle_customer_address_search)],
+                NEAREST_ODP: [
+                    MessageHandler(SHARED_LOCATION, nearest_odp_location_received),
+                    CallbackQueryHandler(handle_nearest_odp_navigation)
+                ]
             },
             fallbacks=[
                 CommandHandler("cancel", cancel),
@@ -46,11 +102,15 @@ def create_application():
                 CallbackQueryHandler(handle_navigation)
             ],
             allow_reentry=True,
+            name="main_conversation",
+            persistent=bool(PERSISTENCE_PATH),
         )
         
         # Register handlers
         application.add_handler(main_conv_handler)
         application.add_handler(CommandHandler("cancel", cancel))
+        application.add_handler(CommandHandler("utilization", utilization_report))
+        application.add_handler(CommandHandler("stats", runtime_stats))
         
         logger.info("Bot application configured successfully")
         return application
@@ -66,12 +126,29 @@ def main():
         print("🤖 Starting BNet ODP Management Bot")
         print(f'='*50)
         
-        application = create_application()
+        if BOT_WORKERS > 1:
+            validate_environment()
+            print(f"🧵 Sharding updates by chat across {BOT_WORKERS} worker processes")
+            application = ShardedDispatcher(create_application, BOT_WORKERS).build_front_application(TELEGRAM_TOKEN)
+        else:
+            application = create_application()
         
         print("✅ Bot started successfully!")
-        print("📡 Polling for messages...")
         
-        application.run_polling()
+        if BOT_MODE == "webhook":
+            print(f"🌐 Listening for webhook updates on {WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH}...")
+            asyncio.run(run_webhook_server(
+                application,
+                listen=WEBHOOK_LISTEN,
+                port=WEBHOOK_PORT,
+                url_path=WEBHOOK_PATH,
+                secret_token=WEBHOOK_SECRET_TOKEN or None,
+                webhook_url=WEBHOOK_URL or None,
+                max_connections=WEBHOOK_MAX_CONNECTIONS
+            ))
+        else:
+            print("📡 Polling for messages...")
+            application.run_polling()
         
     except KeyboardInterrupt:
         print("\n🛑 Bot stopped by user")
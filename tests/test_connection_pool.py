@@ -0,0 +1,27 @@
+from database.connection_pool import ConnectionPool, PooledConnection
+
+
+class FakeConnection:
+    def __init__(self):
+        self.closed = False
+
+    def ping(self, reconnect=False):
+        pass
+
+    def close(self):
+        self.closed = True
+
+
+def test_connection_released_after_close_all_is_closed(monkeypatch):
+    pool = ConnectionPool({}, min_size=0, max_size=2)
+    monkeypatch.setattr(pool, "_open", lambda: PooledConnection(FakeConnection()))
+    idle, checked_out = pool.acquire(), pool.acquire()
+    pool.release(idle)
+
+    pool.close_all()
+    assert idle.connection.closed
+    pool.release(checked_out)
+
+    assert checked_out.connection.closed
+    assert pool.get_stats()["size"] == 0
+    assert pool.get_stats()["idle"] == 0
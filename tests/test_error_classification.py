@@ -0,0 +1,56 @@
+import pymysql
+import pytest
+
+from database import base_db
+from database.base_db import BaseDatabase, QueryTimeoutError, circuit_breaker
+
+
+class FailingDatabase(BaseDatabase):
+    """Database whose every query fails with the given error"""
+
+    def __init__(self, error):
+        super().__init__()
+        self.error = error
+
+    def _run_mysql_query(self, query, params, row_type, timeout):
+        raise self.error
+
+
+@pytest.fixture(autouse=True)
+def closed_circuit(monkeypatch):
+    monkeypatch.setattr(base_db.offline_snapshot, "path", None)
+    circuit_breaker.record_success()
+    yield
+    circuit_breaker.record_success()
+
+
+def failures():
+    return circuit_breaker.get_stats()["consecutive_failures"]
+
+
+@pytest.mark.parametrize("errno", [1205, 1213])
+def test_statement_errors_leave_the_breaker_alone(errno):
+    db = FailingDatabase(pymysql.OperationalError(errno, "rejected"))
+    with pytest.raises(pymysql.OperationalError):
+        db.execute_query("SELECT 1", coalesce=False)
+    assert failures() == 0
+
+
+@pytest.mark.parametrize("error", [
+    pymysql.OperationalError(2003, "Can't connect"),
+    pymysql.OperationalError(2006, "Gone away"),
+    pymysql.InterfaceError(0, ""),
+])
+def test_connection_failures_count(error):
+    with pytest.raises(type(error)):
+        FailingDatabase(error).execute_query("SELECT 1", coalesce=False)
+    assert failures() == 1
+
+
+def test_server_timeout_counts_as_timeout():
+    timeouts = circuit_breaker.get_stats()["timeouts"]
+    db = FailingDatabase(pymysql.OperationalError(3024, "maximum statement execution time exceeded"))
+    with pytest.raises(QueryTimeoutError):
+        db.execute_query("SELECT 1", coalesce=False)
+    assert failures() == 1
+    assert circuit_breaker.get_stats()["timeouts"] == timeouts + 1
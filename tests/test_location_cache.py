@@ -0,0 +1,52 @@
+import pymysql
+import pytest
+
+from database import shared_queries
+from database.shared_queries import LocationCache, SharedQueries
+
+
+class FlakyDatabase(SharedQueries):
+    """Coverage table of two rows; every query fails while down is set"""
+
+    def __init__(self):
+        super().__init__()
+        self.down = False
+        self.queries = 0
+
+    def execute_query(self, query, params=None, **kwargs):
+        self.queries += 1
+        if self.down:
+            raise pymysql.OperationalError(2003, "Can't connect")
+        if query == self.LOCATIONS_FINGERPRINT_SQL:
+            return [{"total": 2, "max_id": 2, "checksum": 7}]
+        return [{"coverage_id": 1, "c_name": "A"}, {"coverage_id": 2, "c_name": "B"}]
+
+
+@pytest.fixture
+def cache(monkeypatch):
+    cache = LocationCache(60)
+    monkeypatch.setattr(shared_queries, "_location_cache", cache)
+    return cache
+
+
+def test_failed_check_serves_cached_list_until_the_next_ttl(cache):
+    db = FlakyDatabase()
+    version, locations = db.get_location_snapshot()
+    cache.checked_at -= 61
+    db.down = True
+
+    assert db.get_location_snapshot() == (version, locations)
+    queries = db.queries
+    assert db.get_location_snapshot() == (version, locations)
+    assert db.queries == queries
+
+
+def test_invalidate_reloads_under_a_new_version(cache):
+    db = FlakyDatabase()
+    version, _ = db.get_location_snapshot()
+    queries = db.queries
+    db.invalidate_locations()
+    new_version, locations = db.get_location_snapshot()
+    assert new_version > version
+    assert locations == [(1, "A"), (2, "B")]
+    assert db.queries > queries
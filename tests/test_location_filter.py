@@ -0,0 +1,21 @@
+import datetime
+
+from telegram import Chat, Location, Message, Update, User
+
+from main import SHARED_LOCATION
+
+
+def location_update(edited):
+    message = Message(
+        1, datetime.datetime.now(datetime.timezone.utc), Chat(5, "private"),
+        from_user=User(5, "Budi", False), location=Location(112.75, -7.25, live_period=900)
+    )
+    return Update(1, edited_message=message) if edited else Update(1, message=message)
+
+
+def test_shared_location_starts_a_search():
+    assert SHARED_LOCATION.check_update(location_update(edited=False))
+
+
+def test_live_location_updates_are_ignored():
+    assert not SHARED_LOCATION.check_update(location_update(edited=True))
@@ -0,0 +1,28 @@
+from utils.message_builder import build_messages, message_length, split_message, utf16_length
+
+
+def test_split_message_never_exceeds_limit_after_newline_cut():
+    pieces = split_message("a\nbbbbbbbb*ccc*", 10)
+    assert "".join(pieces) == "a\nbbbbbbbb*ccc*"
+    assert all(message_length(piece) <= 10 for piece in pieces)
+
+
+def test_split_message_keeps_links_whole():
+    text = ("word " * 50 + "[lnk](http://x.y/" + "a" * 30 + ") 🟢\n") * 50
+    pieces = split_message(text, 500)
+    assert "".join(pieces) == text
+    for piece in pieces:
+        assert message_length(piece) <= 500
+        assert piece.count("[") == piece.count("](")
+
+
+def test_split_message_counts_utf16_units():
+    pieces = split_message("x" * 10 + "😀" * 10, 7, markdown=False)
+    assert "".join(pieces) == "x" * 10 + "😀" * 10
+    assert all(utf16_length(piece) <= 7 for piece in pieces)
+
+
+def test_build_messages_splits_oversized_fragment():
+    messages = list(build_messages("H\n", ["a\n" * 3000, "b\n" * 10], "C\n", limit=1000))
+    assert all(utf16_length(message) <= 1000 for message in messages)
+    assert "".join(messages).count("a") == 3000
@@ -0,0 +1,24 @@
+from database.odp_locator import OdpGridIndex
+from database.records import OdpNode
+from database.topology import TopologySnapshot
+
+
+def odp(id_odp, latitude, longitude, **decimal_columns):
+    node = OdpNode.from_rows(
+        ("id_odp", "code_odp", "id_odc", "latitude", "longitude", "total_port", *decimal_columns),
+        [(id_odp, f"ODP-{id_odp}", 1, latitude, longitude, 8, *decimal_columns.values())]
+    )[0]
+    return id_odp, node
+
+
+def test_index_prefers_decimal_columns_and_parses_the_rest():
+    snapshot = TopologySnapshot.empty()
+    snapshot.nodes["m_odp"].update([
+        # Raw text unparseable, but the backfill filled the decimal columns
+        odp(1, "garbled", "garbled", lat_decimal=-7.25, lng_decimal=112.75),
+        odp(2, "7°15'0\"S", "112°45'36\"T"),
+        odp(3, "", ""),
+    ])
+    index = OdpGridIndex.build(snapshot, 0.01)
+    assert index.size == 2
+    assert [id_odp for _, id_odp in index.nearest(-7.25, 112.75, 3, 5)] == [1, 2]
@@ -0,0 +1,53 @@
+import sqlite3
+
+import pytest
+
+from database import customer_queries
+from database.customer_queries import CustomerQueries
+from database.offline_snapshot import OfflineSnapshot
+
+STORED_NUMBERS = {1: "0812-3456-789", 2: "+62 812 3456 789", 3: "(0812) 3456.789", 4: "0813-0000-111"}
+
+
+class SQLiteQueries(CustomerQueries):
+    """Customer queries run on an in-memory SQLite copy of the tables they join"""
+
+    def __init__(self):
+        super().__init__()
+        self.connection = sqlite3.connect(":memory:")
+        self.connection.executescript("""
+            CREATE TABLE coverage (coverage_id INTEGER, c_name TEXT);
+            CREATE TABLE m_odc (id_odc INTEGER, code_odc TEXT, coverage_odc INTEGER);
+            CREATE TABLE m_odp (id_odp INTEGER, code_odp TEXT, latitude TEXT, longitude TEXT);
+            CREATE TABLE customer (customer_id INTEGER, name TEXT, address TEXT, no_port_odp INTEGER,
+                                   no_wa TEXT, id_odp INTEGER, id_odc INTEGER);
+            INSERT INTO coverage VALUES (1, 'Kota');
+            INSERT INTO m_odc VALUES (1, 'ODC-1', 1);
+            INSERT INTO m_odp VALUES (1, 'ODP-1', '', '');
+        """)
+        self.connection.executemany(
+            "INSERT INTO customer VALUES (?, ?, '', 1, ?, 1, 1)",
+            [(customer_id, f"Budi {customer_id}", number) for customer_id, number in STORED_NUMBERS.items()]
+        )
+
+    def execute_query(self, query, params=None, row_type=None, **kwargs):
+        cursor = self.connection.execute(*OfflineSnapshot.translate(query, params))
+        columns = [column[0] for column in cursor.description]
+        return row_type.from_rows(columns, cursor.fetchall())
+
+
+@pytest.fixture(autouse=True)
+def index_down(monkeypatch):
+    def unavailable():
+        raise RuntimeError("index down")
+    monkeypatch.setattr(customer_queries.customer_index, "ensure_fresh", unavailable)
+
+
+@pytest.mark.parametrize("typed", ["08123456789", "+62 812-3456-789", "3456789"])
+def test_like_fallback_matches_every_stored_spelling(typed):
+    page = SQLiteQueries().search_customers_page("phone", typed)
+    assert [customer.customer_id for customer in page.customers] == [1, 2, 3]
+
+
+def test_like_fallback_without_digits_finds_nothing():
+    assert SQLiteQueries().search_customers_page("phone", "+62").customers == []
@@ -0,0 +1,45 @@
+import asyncio
+
+from telegram.error import BadRequest
+
+from handlers.port_handlers import show_port_page
+from utils.constants import NAVIGATE
+from utils.ui_components import KeyboardBuilder
+
+
+def location_data(odps_per_odc, odc_count):
+    return [
+        {"c_name": "Kota", "code_odc": f"ODC-{odc}", "code_odp": f"ODP-{odc}-{odp}", "total_port": 8,
+         "odp_available_port": 4, "odc_latitude": "", "odc_longitude": "", "odp_latitude": "", "odp_longitude": ""}
+        for odc in range(odc_count) for odp in range(odps_per_odc)
+    ]
+
+
+def odc_callbacks(markup):
+    return {
+        button.text: button.callback_data
+        for row in markup.inline_keyboard for button in row if button.text.startswith("🔌")
+    }
+
+
+def test_odc_buttons_of_the_shown_page_do_nothing():
+    markup = KeyboardBuilder.port_page_keyboard(0, 3, [("A", 0), ("B", 0), ("C", 2)])
+    assert odc_callbacks(markup) == {"🔌 A": "port_page_noop", "🔌 B": "port_page_noop", "🔌 C": "port_page_2"}
+
+
+class Query:
+    """Callback query whose message already shows the page being requested"""
+
+    def __init__(self):
+        self.edits = 0
+
+    async def edit_message_text(self, *args, **kwargs):
+        self.edits += 1
+        raise BadRequest("Message is not modified: specified new message content and reply markup are exactly "
+                         "the same as a current content and reply markup of the message")
+
+
+def test_showing_the_page_already_on_screen_stays_in_navigation():
+    query = Query()
+    assert asyncio.run(show_port_page(query, location_data(4, 5), 0)) == NAVIGATE
+    assert query.edits == 1
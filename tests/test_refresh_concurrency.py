@@ -0,0 +1,71 @@
+import threading
+import time
+
+import pytest
+
+from database.customer_index import CustomerSearchIndex
+from database.port_usage import PortUsageSummary
+from database.topology import NetworkTopology
+
+STRUCTURES = [(PortUsageSummary, 1), (CustomerSearchIndex, 1), (NetworkTopology, 4)]
+
+
+class CountingDatabase:
+    """Stand-in database answering every table as empty and counting change checks"""
+
+    def __init__(self):
+        self.fingerprint_checks = 0
+        self._lock = threading.Lock()
+        # Cleared to hold change checks until the test releases them
+        self.gate = threading.Event()
+        self.gate.set()
+
+    def execute_query(self, query, params=None, row_type=None, **kwargs):
+        if "known_checksum" in query:
+            with self._lock:
+                self.fingerprint_checks += 1
+            self.gate.wait(5)
+            # Slow enough that every caller piles up behind the refresh
+            time.sleep(0.01)
+            return [{"total": 0, "max_id": 0, "known_checksum": 0, "checksum": 0}]
+        return []
+
+
+def run_concurrently(function, count=16):
+    threads = [threading.Thread(target=function) for _ in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+
+@pytest.mark.parametrize("structure_type, trackers", STRUCTURES)
+def test_concurrent_first_build_runs_once(structure_type, trackers):
+    db = CountingDatabase()
+    structure = structure_type(db, 60)
+    run_concurrently(structure.ensure_fresh)
+    assert structure.is_ready
+    assert db.fingerprint_checks == trackers
+
+
+@pytest.mark.parametrize("structure_type, trackers", STRUCTURES)
+def test_stale_structure_is_served_while_one_background_refresh_runs(structure_type, trackers):
+    db = CountingDatabase()
+    structure = structure_type(db, 60)
+    structure.ensure_fresh()
+    # Make the structure stale, as at an interval boundary
+    structure._refreshed_at -= 61
+    stale_at = structure._refreshed_at
+    db.fingerprint_checks = 0
+    db.gate.clear()
+
+    # Every caller returns at once, served the stale copy while the refresh is held
+    run_concurrently(structure.ensure_fresh)
+    assert structure._refreshed_at == stale_at
+    db.gate.set()
+
+    deadline = time.monotonic() + 5
+    while structure._refreshed_at == stale_at and time.monotonic() < deadline:
+        time.sleep(0.01)
+    assert structure._refreshed_at != stale_at
+    assert db.fingerprint_checks == trackers
@@ -0,0 +1,88 @@
+import pytest
+
+from database import customer_queries
+from database.customer_index import CustomerSearchIndex
+from database.customer_queries import CustomerQueries
+
+
+class IndexOnlyQueries(CustomerQueries):
+    """Customer queries answered from the index, hydrating ids without a database"""
+
+    def get_customers_by_ids(self, customer_ids):
+        return list(customer_ids)
+
+
+@pytest.fixture
+def index(monkeypatch):
+    index = CustomerSearchIndex(None, 60)
+    index._load([
+        {"customer_id": customer_id, "name": f"Budi {customer_id:02d}", "no_wa": f"0812{customer_id:04d}",
+         "address": "Jalan Mawar"}
+        for customer_id in range(1, 8)
+    ])
+    monkeypatch.setattr(index, "ensure_fresh", lambda: None)
+    monkeypatch.setattr(customer_queries, "customer_index", index)
+    monkeypatch.setattr(CustomerQueries, "SEARCH_MODES", {
+        "name": (index.search, "name", str),
+        "phone": (index.search_phone, "no_wa", str),
+        "address": (index.search_address, "address", str),
+    })
+    return index
+
+
+def pages(db, mode, term):
+    page = db.search_customers_page(mode, term, limit=3)
+    result = [page.customers]
+    while page.next_cursor is not None:
+        page = db.search_customers_page(mode, term, page.next_cursor, limit=3)
+        result.append(page.customers)
+    return result
+
+
+@pytest.mark.parametrize("mode, term", [("name", "budi"), ("phone", "0812"), ("address", "mawar")])
+def test_pages_cover_every_hit_once(index, mode, term):
+    assert pages(IndexOnlyQueries(), mode, term) == [[1, 2, 3], [4, 5, 6], [7]]
+
+
+@pytest.mark.parametrize("mode, term", [("name", "budi"), ("phone", "0812"), ("address", "mawar")])
+def test_pages_reach_past_twenty_hits(index, mode, term):
+    index._load([
+        {"customer_id": customer_id, "name": f"Budi {customer_id:02d}", "no_wa": f"0812{customer_id:04d}",
+         "address": "Jalan Mawar"}
+        for customer_id in range(8, 51)
+    ])
+    db = IndexOnlyQueries()
+    assert db.search_customers_page(mode, term, limit=3).total == 50
+    assert [customer for page in pages(db, mode, term) for customer in page] == list(range(1, 51))
+
+
+def test_next_page_is_not_shifted_by_a_new_better_match(index):
+    db = IndexOnlyQueries()
+    first = db.search_customers_page("name", "budi", limit=3)
+    # Sorts before every shown customer: an offset cursor would repeat customer 3
+    index._load([{"customer_id": 8, "name": "Budi 00", "no_wa": "", "address": ""}])
+    second = db.search_customers_page("name", "budi", first.next_cursor, limit=3)
+    assert second.customers == [4, 5, 6]
+
+
+def test_like_cursor_on_the_recovered_index_restarts(index):
+    page = IndexOnlyQueries().search_customers_page("name", "budi", ("like", ("Budi 03", 3)), limit=3)
+    assert page.restarted
+    assert page.customers == [1, 2, 3]
+
+
+def test_index_cursor_on_the_like_fallback_restarts(monkeypatch):
+    def unavailable():
+        raise RuntimeError("index down")
+
+    queries = []
+
+    class LikeOnlyQueries(CustomerQueries):
+        def execute_query(self, query, params=None, **kwargs):
+            queries.append(params)
+            return []
+
+    monkeypatch.setattr(customer_queries.customer_index, "ensure_fresh", unavailable)
+    page = LikeOnlyQueries().search_customers_page("name", "budi", ("index", ((0, "budi 03"), 3)), limit=3)
+    assert page.restarted
+    assert queries == [("%budi%", 4)]
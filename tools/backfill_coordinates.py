@@ -0,0 +1,84 @@
+"""Fill the lat_decimal/lng_decimal columns of m_odc and m_odp from their raw coordinates
+
+With COORDINATE_DECIMAL_COLUMNS=true the bot builds maps links from these columns and
+skips parsing DMS strings at render time. Rows whose raw coordinates are missing or
+unparseable get NULL and keep the old behaviour. Only rows whose stored value differs
+are written, so the job can run periodically (e.g. from cron) to pick up edited rows.
+
+Usage:
+    python tools/backfill_coordinates.py --add-columns   # first run: create the columns
+    python tools/backfill_coordinates.py --dry-run
+"""
+import argparse
+import decimal
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database.base_db import BaseDatabase
+from utils.geo import normalize_coordinates
+
+# table -> primary key
+TABLES = {"m_odc": "id_odc", "m_odp": "id_odp"}
+
+# Seven decimal places: about 1 cm, more than any stored coordinate carries
+COLUMN_TYPE = "DECIMAL(10,7)"
+QUANTUM = decimal.Decimal("0.0000001")
+
+def add_columns(connection, table):
+    """Create the decimal columns on table unless they exist already"""
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT COUNT(*) as present FROM information_schema.COLUMNS "
+            "WHERE TABLE_SCHEMA = DATABASE() AND TABLE_NAME = %s AND COLUMN_NAME IN ('lat_decimal', 'lng_decimal')",
+            (table,)
+        )
+        if cursor.fetchone()["present"] == 2:
+            return
+        cursor.execute(
+            f"ALTER TABLE {table} ADD COLUMN lat_decimal {COLUMN_TYPE} NULL, ADD COLUMN lng_decimal {COLUMN_TYPE} NULL"
+        )
+        print(f"{table}: added lat_decimal, lng_decimal")
+
+def _quantize(value):
+    return None if value is None else decimal.Decimal(value).quantize(QUANTUM)
+
+def backfill_table(connection, table, id_column, batch_size, dry_run):
+    """Convert the whole coordinate columns of table in one batch and write the changed rows"""
+    with connection.cursor() as cursor:
+        cursor.execute(f"SELECT {id_column} as row_id, latitude, longitude, lat_decimal, lng_decimal FROM {table}")
+        rows = cursor.fetchall()
+
+    pairs = normalize_coordinates([row["latitude"] for row in rows], [row["longitude"] for row in rows])
+    updates = []
+    for row, pair in zip(rows, pairs):
+        lat, lng = (_quantize(pair[0]), _quantize(pair[1])) if pair else (None, None)
+        if (lat, lng) != (row["lat_decimal"], row["lng_decimal"]):
+            updates.append((lat, lng, row["row_id"]))
+
+    if not dry_run:
+        with connection.cursor() as cursor:
+            for start in range(0, len(updates), batch_size):
+                cursor.executemany(
+                    f"UPDATE {table} SET lat_decimal = %s, lng_decimal = %s WHERE {id_column} = %s",
+                    updates[start:start + batch_size]
+                )
+    invalid = sum(1 for pair in pairs if pair is None)
+    print(f"{table}: {len(rows)} rows, {len(updates)} {'to update' if dry_run else 'updated'}, {invalid} without valid coordinates")
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--add-columns", action="store_true", help="create the decimal columns if missing")
+    parser.add_argument("--dry-run", action="store_true", help="only report how many rows would change")
+    parser.add_argument("--batch-size", type=int, default=1000, help="rows per UPDATE batch")
+    args = parser.parse_args()
+
+    with BaseDatabase().get_db_connection() as connection:
+        for table, id_column in TABLES.items():
+            if args.add_columns and not args.dry_run:
+                add_columns(connection, table)
+            backfill_table(connection, table, id_column, args.batch_size, args.dry_run)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,61 @@
+"""Stand-in for Telegram: POST a synthetic Update to a locally running webhook server
+
+Usage (bot started with BOT_MODE=webhook and no WEBHOOK_URL):
+    python tools/send_test_update.py "/start"
+    python tools/send_test_update.py --callback check_ports --chat-id 1001
+"""
+import argparse
+import json
+import os
+import sys
+import time
+import urllib.request
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config.settings import WEBHOOK_LISTEN, WEBHOOK_PORT, WEBHOOK_PATH, WEBHOOK_SECRET_TOKEN
+
+def build_update(update_id, chat_id, text=None, callback_data=None):
+    """Minimal Update JSON for a text message or an inline button press"""
+    user = {"id": chat_id, "is_bot": False, "first_name": "Stand-in"}
+    chat = {"id": chat_id, "type": "private", "first_name": "Stand-in"}
+    message = {"message_id": update_id, "date": int(time.time()), "chat": chat, "from": user}
+
+    if callback_data is not None:
+        return {
+            "update_id": update_id,
+            "callback_query": {
+                "id": str(update_id),
+                "from": user,
+                "chat_instance": str(chat_id),
+                "data": callback_data,
+                "message": dict(message, text="..."),
+            },
+        }
+
+    message["text"] = text
+    if text.startswith("/"):
+        message["entities"] = [{"type": "bot_command", "offset": 0, "length": len(text.split()[0])}]
+    return {"update_id": update_id, "message": message}
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("text", nargs="?", default="/start", help="message text to send")
+    parser.add_argument("--callback", help="send an inline button press with this callback data instead")
+    parser.add_argument("--chat-id", type=int, default=1000)
+    parser.add_argument("--url", default=f"http://{WEBHOOK_LISTEN}:{WEBHOOK_PORT}/{WEBHOOK_PATH.strip('/')}")
+    parser.add_argument("--secret", default=WEBHOOK_SECRET_TOKEN)
+    args = parser.parse_args()
+
+    update = build_update(int(time.time() * 1000) % 2**31, args.chat_id, args.text, args.callback)
+    request = urllib.request.Request(
+        args.url,
+        data=json.dumps(update).encode(),
+        headers={"Content-Type": "application/json", "X-Telegram-Bot-Api-Secret-Token": args.secret},
+        method="POST",
+    )
+    with urllib.request.urlopen(request, timeout=10) as response:
+        print(f"{response.status} {args.url}")
+
+if __name__ == "__main__":
+    main()
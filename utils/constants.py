@@ -1,4 +1,6 @@
 from telegram.ext import ConversationHandler
+from config.settings import SESSION_MAX_USERS, SESSION_IDLE_TTL, SESSION_MAX_BYTES
+from utils.session_store import SessionStore
 
 # Conversation states
 SELECT_LOCATION = 1
@@ -7,7 +9,14 @@ CUSTOMER_SELECT_LOCATION = 3
 CUSTOMER_SELECT_ODP = 4
 CUSTOMER_NAVIGATE = 5
 CUSTOMER_NAME_SEARCH = 6
+CUSTOMER_PHONE_SEARCH = 7
+CUSTOMER_ADDRESS_SEARCH = 8
+NEAREST_ODP = 9
 WAITING_USERNAME = 10
 WAITING_PASSWORD = 11
-# Global user state storage
-user_location = {}  
\ No newline at end of file
+# Global user state storage: user_id -> location rows, bounded and evicting
+user_location = SessionStore(
+    max_entries=SESSION_MAX_USERS,
+    idle_ttl=SESSION_IDLE_TTL,
+    max_bytes=SESSION_MAX_BYTES
+)
@@ -0,0 +1,93 @@
+"""Coordinate parsing shared by message formatting, the nearest ODP locator and the backfill tool
+
+Coordinates are stored as free text: decimal degrees, or DMS such as 7°15'30.5"S.
+"""
+import decimal
+import functools
+import re
+from config.settings import COORDINATE_CACHE_SIZE
+
+@functools.lru_cache(maxsize=COORDINATE_CACHE_SIZE)
+def _parse_coordinate(dms_str):
+    """Parse one raw coordinate string; memoized, since each ODC's coordinates repeat on all its ODPs"""
+    try:
+        dms_str = dms_str.strip().replace(' ','')
+        
+        # Check if it's already in decimal format
+        if '°' not in dms_str or ("'" not in dms_str and '"' not in dms_str):
+            clean_str = dms_str.replace('°', '').strip()
+            return float(clean_str)
+        
+        # regex matching for DMS format
+        pattern = r"(\d+)°(\d+)'([\d.]+)\"([NSEWT])"
+        match = re.match(pattern, dms_str)
+        
+        if not match:
+            return None
+            
+        degrees = int(match.group(1))
+        minutes = int(match.group(2))
+        seconds = float(match.group(3))
+        direction = match.group(4).upper()
+        
+        # Convert to decimal
+        decimal = degrees + minutes/60 + seconds/3600
+        
+        """
+        Apply direction (S and W are negative, T is treated as E for East)
+        sebenarnya tidak perlu west karena indonesia sepenuhnya di T/E tpi oklah
+        """
+
+        if direction in ['S', 'W']:
+            decimal = -decimal
+        elif direction == 'T':  # T for Timur East in Indonesian
+            decimal = decimal
+        
+        return decimal
+        
+    except Exception:
+        return None
+
+def convert_dms_to_decimal(dms_str):
+    """Convert DMS (Degrees, Minutes, Seconds) to decimal degrees"""
+    if isinstance(dms_str, (int, float, decimal.Decimal)) and not isinstance(dms_str, bool):
+        return float(dms_str)
+    return _parse_coordinate(str(dms_str))
+
+def normalize_coordinate_pair(latitude, longitude):
+    """(latitude, longitude) in decimal degrees, or None if missing, unparseable or out of range"""
+    try:
+
+        lat_str = str(latitude).strip()
+        lng_str = str(longitude).strip()
+        
+        # coordinates validation
+        if not lat_str or not lng_str or lat_str in ['', '0', 'NULL', 'null'] or lng_str in ['', '0', 'NULL', 'null']:
+            return None
+        
+        # Convert DMS to decimal
+        lat_decimal = convert_dms_to_decimal(lat_str)
+        lng_decimal = convert_dms_to_decimal(lng_str)
+        
+        if lat_decimal is None or lng_decimal is None:
+            return None
+            
+        # Validate reasonable coordinate ranges
+        if not (-90 <= lat_decimal <= 90) or not (-180 <= lng_decimal <= 180):
+            return None
+            
+        return lat_decimal, lng_decimal
+        
+    except Exception:
+        return None
+
+def normalize_coordinates(latitudes, longitudes):
+    """normalize_coordinate_pair over two whole columns; each distinct raw pair is converted once"""
+    converted = {}
+    pairs = []
+    for latitude, longitude in zip(latitudes, longitudes):
+        key = (str(latitude), str(longitude))
+        if key not in converted:
+            converted[key] = normalize_coordinate_pair(latitude, longitude)
+        pairs.append(converted[key])
+    return pairs
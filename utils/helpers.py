@@ -14,7 +14,7 @@ async def show_location_selection(update, is_callback=False):
     ErrorHandler.log_handler_entry("show_location_selection", update)
     
     try:
-        locations = shared_db.get_all_locations()        
+        version, locations = await shared_db.aio.get_location_snapshot()
         if not locations:
             error_message = "❌ Tidak ada lokasi tersedia atau terjadi masalah dengan database."
             logger.warning("No locations available or database error")
@@ -25,7 +25,9 @@ async def show_location_selection(update, is_callback=False):
                 await update.message.reply_text(error_message)
             return ConversationHandler.END
 
-        reply_markup = KeyboardBuilder.location_selection_keyboard(locations)
+        reply_markup = KeyboardBuilder.cached_keyboard(
+            "port_locations", version, KeyboardBuilder.location_selection_keyboard, locations
+        )
         message = "Silakan pilih lokasi ODP:"
 
         if is_callback:
@@ -0,0 +1,129 @@
+"""Chunked message building for results too long for one Telegram message
+
+Telegram measures message length in UTF-16 code units of the text after entity
+parsing, so emoji count double and a Markdown link counts only its label.
+"""
+import re
+from telegram.constants import MessageLimit
+
+MAX_MESSAGE_LENGTH = MessageLimit.MAX_TEXT_LENGTH
+
+# Legacy Markdown entities, which must never be split: pre and code blocks, links, bold and italic
+_MARKDOWN_ENTITY = re.compile(r"```.*?```|`[^`]*`|\[([^\]\n]*)\]\([^)\n]*\)|\*[^*\n]+\*|_[^_\n]+_", re.DOTALL)
+_LINK = re.compile(r"\[([^\]\n]*)\]\([^)\n]*\)")
+
+# Split points when a text has no room for whole lines: newlines, other whitespace, then words
+_PLAIN_ATOM = re.compile(r"\n|[^\S\n]+|\S+")
+
+def utf16_length(text):
+    """Length of text as Telegram counts it"""
+    return len(text.encode("utf-16-le")) // 2
+
+def message_length(text, markdown=True):
+    """UTF-16 length of text once Telegram has parsed it; links count only their label
+
+    Other Markdown markers are counted as if they were shown, which only overestimates.
+    """
+    if markdown and "](" in text:
+        text = _LINK.sub(r"\1", text)
+    return utf16_length(text)
+
+def _hard_split(text, limit):
+    """Split text that has no safe break point into pieces of at most limit UTF-16 units"""
+    pieces, start, length = [], 0, 0
+    for position, character in enumerate(text):
+        size = 2 if ord(character) > 0xFFFF else 1
+        if length + size > limit:
+            pieces.append(text[start:position])
+            start, length = position, 0
+        length += size
+    pieces.append(text[start:])
+    return pieces
+
+def _atoms(text, markdown):
+    """Pieces text may be split between: whole Markdown entities, newlines, whitespace runs and words"""
+    position = 0
+    if markdown:
+        for match in _MARKDOWN_ENTITY.finditer(text):
+            yield from _PLAIN_ATOM.findall(text, position, match.start())
+            yield match.group(0)
+            position = match.end()
+    yield from _PLAIN_ATOM.findall(text, position)
+
+def split_message(text, limit=MAX_MESSAGE_LENGTH, markdown=True):
+    """Split text into as few pieces within limit as possible, never inside a Markdown entity
+
+    Pieces are filled as far as the limit allows and broken after the last whole line that
+    fits; a line longer than a whole message is broken between words. Only an entity or word
+    longer than a whole message is cut through.
+    """
+    if message_length(text, markdown) <= limit:
+        return [text]
+
+    pieces, parts, sizes, length = [], [], [], 0
+    last_newline = None
+    for atom in _atoms(text, markdown):
+        if message_length(atom, markdown) > limit:
+            # No safe break point exists: cut it, as the only way to send it at all
+            chunks = _hard_split(atom, limit)
+        else:
+            chunks = (atom,)
+        for chunk in chunks:
+            size = message_length(chunk, markdown)
+            # The text after the last newline may itself not leave room for the chunk;
+            # then it goes out whole as the next piece
+            while parts and length + size > limit:
+                cut = len(parts) if last_newline is None else last_newline + 1
+                pieces.append("".join(parts[:cut]))
+                parts, sizes = parts[cut:], sizes[cut:]
+                length = sum(sizes)
+                last_newline = None
+            parts.append(chunk)
+            sizes.append(size)
+            length += size
+            if chunk == "\n":
+                last_newline = len(parts) - 1
+    if parts:
+        pieces.append("".join(parts))
+    return pieces
+
+def build_messages(header, fragments, continuation_header=None, limit=MAX_MESSAGE_LENGTH, markdown=True):
+    """Yield messages of header plus as many whole fragments as fit within limit
+
+    Fragments are collected in a list with a running length, so building is linear in
+    the output size. Each message is yielded as soon as it is full, so a caller can send
+    it while the following fragments are still being rendered. Later messages open with
+    continuation_header (header if not given). A fragment too long for any message is
+    split with split_message(). markdown=False measures the text as plain text.
+    """
+    if continuation_header is None:
+        continuation_header = header
+    header_length = message_length(header, markdown)
+    continuation_length = message_length(continuation_header, markdown)
+    parts = [header]
+    length = header_length
+    has_fragments = False
+
+    for fragment in fragments:
+        size = message_length(fragment, markdown)
+        if has_fragments and length + size > limit:
+            yield "".join(parts).rstrip()
+            parts = [continuation_header]
+            length = continuation_length
+            has_fragments = False
+        if length + size > limit:
+            pieces = split_message(fragment, limit - max(header_length, continuation_length), markdown)
+            for piece in pieces[:-1]:
+                parts.append(piece)
+                yield "".join(parts).rstrip()
+                parts = [continuation_header]
+                length = continuation_length
+            fragment = pieces[-1]
+            size = message_length(fragment, markdown)
+        parts.append(fragment)
+        length += size
+        has_fragments = True
+
+    message = "".join(parts)
+    if message.strip():
+        yield message.rstrip()
@@ -1,194 +1,237 @@
-import re
-"""Message formatting utilities for consistent Telegram message display"""
+from utils.geo import normalize_coordinate_pair
+from utils.message_builder import build_messages
+"""Message formatting utilities for consistent Telegram message display
 
-def convert_dms_to_decimal(dms_str):
-    """Convert DMS (Degrees, Minutes, Seconds) to decimal degrees"""
-    try:
-        dms_str = str(dms_str).strip().replace(' ','')
-        
-        # Check if it's already in decimal format
-        if '°' not in dms_str or ("'" not in dms_str and '"' not in dms_str):
-            clean_str = dms_str.replace('°', '').strip()
-            return float(clean_str)
-        
-        # regex matching for DMS format
-        pattern = r"(\d+)°(\d+)'([\d.]+)\"([NSEWT])"
-        match = re.match(pattern, dms_str)
-        
-        if not match:
-            return None
-            
-        degrees = int(match.group(1))
-        minutes = int(match.group(2))
-        seconds = float(match.group(3))
-        direction = match.group(4).upper()
-        
-        # Convert to decimal
-        decimal = degrees + minutes/60 + seconds/3600
-        
-        """
-        Apply direction (S and W are negative, T is treated as E for East)
-        sebenarnya tidak perlu west karena indonesia sepenuhnya di T/E tpi oklah
-        """
-
-        if direction in ['S', 'W']:
-            decimal = -decimal
-        elif direction == 'T':  # T for Timur East in Indonesian
-            decimal = decimal
-        
-        return decimal
-        
-    except Exception:
-        return None
+Row arguments may be dicts or compact records (OdpRow, CustomerRow from
+database.records); both answer row.get(field, default).
+"""
 
 def create_google_maps_url(latitude, longitude):
     """Create Google Maps URL from coordinates (handles both DMS and decimal formats)"""
-    try:
-
-        lat_str = str(latitude).strip()
-        lng_str = str(longitude).strip()
-        
-        # coordinates validation
-        if not lat_str or not lng_str or lat_str in ['', '0', 'NULL', 'null'] or lng_str in ['', '0', 'NULL', 'null']:
-            return None
-        
-        # Convert DMS to decimal
-        lat_decimal = convert_dms_to_decimal(lat_str)
-        lng_decimal = convert_dms_to_decimal(lng_str)
-        
-        if lat_decimal is None or lng_decimal is None:
-            return None
-            
-        # Validate reasonable coordinate ranges
-        if not (-90 <= lat_decimal <= 90) or not (-180 <= lng_decimal <= 180):
-            return None
-            
-        return f"https://maps.google.com/maps?q={lat_decimal},{lng_decimal}"
-        
-    except Exception:
+    pair = normalize_coordinate_pair(latitude, longitude)
+    if pair is None:
         return None
+    return f"https://maps.google.com/maps?q={pair[0]},{pair[1]}"
 
-def format_port_availability_message(location_name, location_data):
-    """Format port availability data into readable messages with coordinates and long message handling"""
+def entry_maps_url(entry, prefix):
+    """Maps URL for a row's {prefix}_latitude/longitude; backfilled decimal columns skip parsing"""
+    lat_decimal = entry.get(f'{prefix}_lat_decimal')
+    lng_decimal = entry.get(f'{prefix}_lng_decimal')
+    if lat_decimal is not None and lng_decimal is not None:
+        return f"https://maps.google.com/maps?q={float(lat_decimal)},{float(lng_decimal)}"
+    return create_google_maps_url(entry.get(f'{prefix}_latitude', ''), entry.get(f'{prefix}_longitude', ''))
+
+def format_odc_header(entry):
+    """Format the ODC block shown above its ODPs"""
+    odc_code = entry.get('code_odc', 'N/A')
+    odc_lat = entry.get('odc_latitude', '')
+    odc_lng = entry.get('odc_longitude', '')
+    
+    header = f"===="*10+"\n"
+    header += f"  🔌 ODC: {odc_code}\n"
+
+    # Add ODC coordinates if available
+    odc_maps_url = entry_maps_url(entry, 'odc')
+    if odc_maps_url:
+        header += f"  📍[{odc_lat},{odc_lng}]({odc_maps_url})\n"+"===="*10+"\n\n" # ini utk markdown
+    else:
+        header += f"  📍 Lokasi ODC tidak tersedia\n"+"===="*10+"\n\n"
+    return header
+
+def format_odp_entry(entry):
+    """Format one ODP with its port counts"""
+    odp_code = entry.get('code_odp', 'N/A')
+    total_port = entry.get('total_port', 'N/A')
+    available_port = entry.get('odp_available_port', 'N/A')
+    odp_lat = entry.get('odp_latitude', '')
+    odp_lng = entry.get('odp_longitude', '')
+    
+    entry_text = f"  📡 ODP: {odp_code}\n"
+    entry_text += f"  📢 Total Port: {total_port}\n"
+    entry_text += f"  🟢 Port Tersedia: {available_port}\n"
+    
+    # Add ODP coordinates if available
+    odp_maps_url = entry_maps_url(entry, 'odp')
+    if odp_maps_url:
+        entry_text += f"  📍 [{odp_lat},{odp_lng}]({odp_maps_url})\n\n" #ini utk markdown
+    else:
+        entry_text += f"  📍 Lokasi ODP tidak tersedia\n\n"
+    return entry_text
+
+def format_data_as_of(as_of):
+    """Notice for data answered from the offline snapshot while the database is down"""
+    if as_of is None:
+        return ""
+    return f"⚠️ Database tidak tersedia, data per {as_of:%d-%m-%Y %H:%M}\n\n"
+
+def port_page_count(location_data, page_size):
+    """Number of pages the port availability view needs"""
+    return max((len(location_data) + page_size - 1) // page_size, 1)
+
+def port_odc_pages(location_data, page_size):
+    """(ODC code, page index of its first ODP) for the ODC jump list"""
+    odc_pages = {}
+    for position, entry in enumerate(location_data):
+        odc_pages.setdefault(entry.get('code_odc', 'N/A'), position // page_size)
+    return list(odc_pages.items())
+
+def format_port_availability_page(location_name, location_data, page_index, page_size, as_of=None):
+    """Format one page of the port availability view; only that page's rows are rendered"""
     
     if not location_data:
-        return [f"📊 Lokasi: {location_name}\n\n❌ Tidak ada data ODP tersedia."]
+        return f"📊 Lokasi: {location_name}\n\n❌ Tidak ada data ODP tersedia."
+    
+    page_count = port_page_count(location_data, page_size)
+    page_index = min(max(page_index, 0), page_count - 1)
+    start = page_index * page_size
     
-    messages = []
-    current_message = f"📊 Lokasi: {location_name}\n\n"
+    message = f"📊 Lokasi: {location_name} (Halaman {page_index + 1}/{page_count})\n\n"
+    message += format_data_as_of(as_of)
+    # Every page opens with its ODC header, even when the ODC continues from the previous page
     current_odc = None
     
-    for entry in location_data:
+    for entry in location_data[start:start + page_size]:
         odc_code = entry.get('code_odc', 'N/A')
-        odp_code = entry.get('code_odp', 'N/A')
-        total_port = entry.get('total_port', 'N/A')
-        available_port = entry.get('odp_available_port', 'N/A')
-        
-        # ODP & ODC coordinates
-        odc_lat = entry.get('odc_latitude', '')
-        odc_lng = entry.get('odc_longitude', '')
-        odp_lat = entry.get('odp_latitude', '')
-        odp_lng = entry.get('odp_longitude', '')
-        
-        entry_text = ""
-        
-        # Show ODC info only when it changes (grouped display)
         if current_odc != odc_code:
             current_odc = odc_code
-            
-            entry_text += f"===="*10+"\n"
-            entry_text += f"  🔌 ODC: {odc_code}\n"
-
-            # Add ODC coordinates if available
-            odc_maps_url = create_google_maps_url(odc_lat, odc_lng)
-            if odc_maps_url:
-                entry_text += f"  📍[{odc_lat},{odc_lng}]({odc_maps_url})\n"+"===="*10+"\n\n" # ini utk markdown
-            else:
-                entry_text += f"  📍 Lokasi ODC tidak tersedia\n"+"===="*10+"\n\n"
-        
-        # ODP information
-        entry_text += f"  📡 ODP: {odp_code}\n"
-        entry_text += f"  📢 Total Port: {total_port}\n"
-        entry_text += f"  🟢 Port Tersedia: {available_port}\n"
-        
-        # Add ODP coordinates if available
-        odp_maps_url = create_google_maps_url(odp_lat, odp_lng)
-        if odp_maps_url:
-            entry_text += f"  📍 [{odp_lat},{odp_lng}]({odp_maps_url})\n\n" #ini utk markdown
-        else:
-            entry_text += f"  📍 Lokasi ODP tidak tersedia\n\n"
-        
-        # Check if adding this entry would exceed Telegram's limit
-        if len(current_message + entry_text) > 4000:
-            # Save current message and start a new one
-            messages.append(current_message.rstrip())
-            current_message = f"📊 Lokasi: {location_name} (continued...)\n\n" + entry_text
-        else:
-            current_message += entry_text
+            message += format_odc_header(entry)
+        message += format_odp_entry(entry)
     
-    # Add the last message
-    if current_message.strip():
-        messages.append(current_message.rstrip())
+    return message.rstrip()
+
+def format_distance(distance_km):
+    """Distance in metres below one kilometre, otherwise in kilometres"""
+    if distance_km < 1:
+        return f"{distance_km * 1000:.0f} m"
+    return f"{distance_km:.1f} km"
+
+def format_nearest_odps(odps, max_distance_km):
+    """Format the nearest ODPs with free ports, closest first, into one message"""
+    if not odps:
+        return f"❌ Tidak ada ODP dengan port tersedia dalam radius {format_distance(max_distance_km)} dari lokasi Anda."
     
-    return messages
+    parts = [f"📍 {len(odps)} ODP terdekat dengan port tersedia:\n\n"]
+    for i, odp in enumerate(odps, 1):
+        odp_maps_url = entry_maps_url(odp, 'odp')
+        location_markdown = f" [View on Maps]({odp_maps_url})" if odp_maps_url else ""
+        parts.append(
+            f"{i}. 📡 ODP: {odp.get('code_odp', 'N/A')} ({format_distance(odp.get('distance_km', 0))})\n"
+            f"   🔌 ODC: {odp.get('code_odc', 'N/A')} · 📍 {odp.get('c_name', 'N/A')}\n"
+            f"   🟢 Port Tersedia: {odp.get('odp_available_port', 'N/A')}/{odp.get('total_port', 'N/A')}"
+            f"{location_markdown}\n\n"
+        )
+    return "".join(parts).rstrip()
 
-def format_customer_search_results(search_term, customers):
-    """Format customer search results into readable messages"""
-    messages = []
-    current_message = f"🔍 Search Results for '{search_term}'\n"
-    current_message += f"Found {len(customers)} customer(s):\n\n"
+def format_utilization_report(report):
+    """Format the network-wide utilization report into plain-text messages"""
+    header = (
+        f"📈 Utilisasi Port Jaringan\n\n"
+        + format_data_as_of(report.get('as_of'))
+        + f"📡 ODP: {report['odps']} ({report['odps_without_ports']} tanpa data port)\n"
+        f"📢 Total Port: {report['total_ports']}\n"
+        f"🔴 Terpakai: {report['used_ports']} ({report['utilization']:.1%})\n"
+        f"🟢 Tersedia: {report['free_ports']}\n"
+        f"📊 Median ODP: {report['median_utilization']:.0f}%, P90: {report['p90_utilization']:.0f}%\n\n"
+    )
     
-    for i, customer in enumerate(customers, 1):
+    def sections():
+        lines = ["Sebaran utilisasi ODP:\n"]
+        lines += [f"  {low:>3}-{high:<3}%: {count}\n" for low, high, count in report['distribution']]
+        lines.append(f"  Penuh    : {report['saturated']} (melebihi kapasitas: {report['over_capacity']})\n")
+        lines.append(f"  Kosong   : {report['empty']}\n\n")
+        yield "".join(lines)
         
-        # ODP coordinates  
-        odp_lat = customer.get('odp_latitude', '')
-        odp_lng = customer.get('odp_longitude', '')        
-        odp_maps_url = create_google_maps_url(odp_lat, odp_lng)
-        
-        # Add ODP coordinates if available
-        location_markdown = f"[View on Maps]({odp_maps_url})" if odp_maps_url else ""
-
-        customer_info = (
-            f"{i}. 👤 {customer.get('name', 'N/A')}\n"
-            f"   🏠 Alamat: {customer.get('address', 'N/A')}\n"
-            f"   📍 Lokasi: {customer.get('c_name', 'N/A')}\n"
-            f"   🔌 ODC: {customer.get('code_odc', 'N/A')}\n"
-            f"   📡 ODP: {customer.get('code_odp', 'N/A')} {location_markdown}\n"
-            f"   📢 Port: {customer.get('no_port_odp', 'N/A')}\n"
-            f"   📞 No. Telp: {customer.get('no_wa', 'N/A')}\n\n"
-        )
+        for title, rows in (("Coverage", report['top_coverages']), ("ODC", report['top_odcs'])):
+            lines = [f"{title} paling padat:\n"]
+            lines += [
+                f"  {i}. {name}: {used}/{total} ({utilization:.0%}, {saturated}/{odps} ODP penuh)\n"
+                for i, (name, odps, used, total, utilization, saturated) in enumerate(rows, 1)
+            ]
+            yield "".join(lines) + "\n"
+    
+    return build_messages(header, sections(), "📈 Utilisasi Port Jaringan (continued...)\n\n", markdown=False)
 
-        # Check if adding this entry would exceed Telegram's limit
-        if len(current_message + customer_info) > 4000:
-            # Save current message and start a new one
-            messages.append(current_message.rstrip())
-            current_message = f"🔍 Search Results for '{search_term}' (continued...)\n\n" + customer_info
-        else:
-            current_message += customer_info
+def format_runtime_stats(sections):
+    """Format (title, stats dict or None) pairs of process counters into plain-text messages"""
+    def format_value(value):
+        return f"{value:.2f}" if isinstance(value, float) else str(value)
+
+    def blocks():
+        for title, stats in sections:
+            if stats is None:
+                yield f"{title}: -\n\n"
+                continue
+            lines = [f"{title}:\n"]
+            lines += [f"  {key}: {format_value(value)}\n" for key, value in stats.items()]
+            yield "".join(lines) + "\n"
+
+    return build_messages("⚙️ Statistik Proses\n\n", blocks(), "⚙️ Statistik Proses (continued...)\n\n", markdown=False)
+
+def format_customer_entry(number, customer):
+    """Format one customer search hit"""
+    
+    # ODP coordinates  
+    odp_lat = customer.get('odp_latitude', '')
+    odp_lng = customer.get('odp_longitude', '')        
+    odp_maps_url = entry_maps_url(customer, 'odp')
+    
+    # Add ODP coordinates if available
+    location_markdown = f"[View on Maps]({odp_maps_url})" if odp_maps_url else ""
+
+    return (
+        f"{number}. 👤 {customer.get('name', 'N/A')}\n"
+        f"   🏠 Alamat: {customer.get('address', 'N/A')}\n"
+        f"   📍 Lokasi: {customer.get('c_name', 'N/A')}\n"
+        f"   🔌 ODC: {customer.get('code_odc', 'N/A')}\n"
+        f"   📡 ODP: {customer.get('code_odp', 'N/A')} {location_markdown}\n"
+        f"   📢 Port: {customer.get('no_port_odp', 'N/A')}\n"
+        f"   📞 No. Telp: {customer.get('no_wa', 'N/A')}\n\n"
+    )
+
+def format_customer_search_results(search_term, customers):
+    """Format customer search results into messages, yielded one at a time as each fills up"""
+    return build_messages(
+        f"🔍 Search Results for '{search_term}'\nFound {len(customers)} customer(s):\n\n",
+        (format_customer_entry(i, customer) for i, customer in enumerate(customers, 1)),
+        f"🔍 Search Results for '{search_term}' (continued...)\n\n"
+    )
+
+def format_customer_search_page(search_term, customers, page_index, page_size, total=None):
+    """Format one page of customer search results as a single message"""
+    first_number = page_index * page_size + 1
+    last_number = first_number + len(customers) - 1
     
-    # Add the last message
-    if current_message.strip():
-        messages.append(current_message.rstrip())
+    message = f"🔍 Search Results for '{search_term}'\n"
+    if total is not None:
+        message += f"Showing {first_number}-{last_number} of {total} customer(s):\n\n"
+    else:
+        message += f"Page {page_index + 1}, showing {first_number}-{last_number}:\n\n"
     
-    return messages
+    message += "".join(format_customer_entry(i, customer) for i, customer in enumerate(customers, first_number))
+    return message.rstrip()
+
+def format_odp_customer_entry(number, customer):
+    """Format one customer connected to an ODP"""
+    return (
+        f"{number}. 👤 {customer.get('name', 'N/A')}\n"
+        f"   🏠 Alamat: {customer.get('address', 'N/A') if 'address' in customer else 'N/A'}\n"
+        f"   📢 Port: {customer.get('no_port_odp', 'N/A')}\n\n"
+    )
 
 def format_customers_in_odp(customers):
-    """Format customers in ODP data into a readable message"""
+    """Format customers in ODP data into plain-text messages, yielded one at a time as each fills up"""
     first_customer = customers[0]
     location_name = first_customer.get('c_name', 'Unknown')
     odc_code = first_customer.get('code_odc', 'N/A')
     odp_code = first_customer.get('code_odp', 'N/A')
     
-    message = f"👥 Customers in ODP {odp_code}\n"
-    message += f"📍 Lokasi: {location_name}\n"
-    message += f"🔌 ODC: {odc_code}\n\n"
-    
-    for i, customer in enumerate(customers, 1):
-        message += f"{i}. 👤 {customer.get('name', 'N/A')}\n"
-        message += f"   🏠 Alamat: {customer.get('address', 'N/A') if 'address' in customer else 'N/A'}\n"
-        message += f"   📢 Port: {customer.get('no_port_odp', 'N/A')}\n\n"
-    
-    return message
+    header = f"👥 Customers in ODP {odp_code}\n📍 Lokasi: {location_name}\n🔌 ODC: {odc_code}\n\n"
+    return build_messages(
+        header,
+        (format_odp_customer_entry(i, customer) for i, customer in enumerate(customers, 1)),
+        f"👥 Customers in ODP {odp_code} (continued...)\n\n",
+        markdown=False
+    )
 
 def format_error_message(error_type, details=None):
     """Format error messages consistently"""
@@ -1,19 +1,34 @@
 import logging
 from telegram.constants import ParseMode
+from utils.message_builder import MAX_MESSAGE_LENGTH, split_message
 
 logger = logging.getLogger(__name__)
 
 class MessageHandler:
     """Centralized message handling for long messages"""
     
-    MAX_MESSAGE_LENGTH = 4000
+    MAX_MESSAGE_LENGTH = MAX_MESSAGE_LENGTH
     
     @staticmethod
     async def send_long_message(update, messages, reply_markup=None, parse_mode=ParseMode.MARKDOWN, is_callback=True):
-        """Send potentially long messages, splitting if necessary"""
+        """Send potentially long messages, splitting if necessary
+
+        messages may be any iterable, e.g. a formatter's generator: each message is sent
+        as soon as the one after it is rendered (needed to know which one gets the markup).
+        A message over Telegram's limit is split between lines, outside Markdown entities.
+        """
+        markdown = parse_mode in (ParseMode.MARKDOWN, ParseMode.MARKDOWN_V2)
         try:
-            for i, message in enumerate(messages):
-                current_markup = reply_markup if i == len(messages) - 1 else None
+            iterator = (
+                piece
+                for message in messages
+                for piece in split_message(message, MAX_MESSAGE_LENGTH, markdown)
+            )
+            message = next(iterator, None)
+            i = 0
+            while message is not None:
+                following = next(iterator, None)
+                current_markup = reply_markup if following is None else None
                 
                 if is_callback and i == 0:
                     # Edit first message for callback queries
@@ -32,6 +47,8 @@ class MessageHandler:
                         parse_mode=parse_mode,
                         disable_web_page_preview=True
                     )
+                message = following
+                i += 1
         except Exception as e:
             logger.error(f"Error sending long message: {e}")
             raise
\ No newline at end of file
@@ -0,0 +1,216 @@
+import asyncio
+import json
+import logging
+import os
+import pickle
+import sqlite3
+import time
+from concurrent.futures import ThreadPoolExecutor
+from telegram.ext import BasePersistence, PersistenceInput
+
+logger = logging.getLogger(__name__)
+
+def worker_path(path, worker_index):
+    """Persistence file of one worker process, e.g. bot_state.worker1.sqlite3
+
+    A worker only receives its own chats' updates; sharing one file would make every worker
+    restore all sessions and delete other workers' rows when it evicts them.
+    """
+    root, extension = os.path.splitext(path)
+    return f"{root}.worker{worker_index}{extension}"
+
+class SQLitePersistence(BasePersistence):
+    """Conversation states, user_data and session store entries kept in a local SQLite file
+
+    Writes are write-behind: update calls only record what changed, and one background
+    task writes everything collected so far in a single transaction on its own thread.
+    The Application calls the update methods every update_interval seconds, so updates
+    never wait for the disk.
+    """
+
+    SCHEMA = (
+        "CREATE TABLE IF NOT EXISTS conversations (name TEXT, conversation_key TEXT, state BLOB, "
+        "PRIMARY KEY (name, conversation_key))",
+        "CREATE TABLE IF NOT EXISTS user_data (user_id INTEGER PRIMARY KEY, data BLOB)",
+        "CREATE TABLE IF NOT EXISTS sessions (session_key BLOB PRIMARY KEY, value BLOB, updated_at REAL)",
+    )
+
+    def __init__(self, path, update_interval, sessions=None):
+        super().__init__(
+            store_data=PersistenceInput(bot_data=False, chat_data=False, user_data=True, callback_data=False),
+            update_interval=update_interval
+        )
+        self.path = path
+        self.sessions = sessions
+        # One writer thread: SQLite writes stay serialized and off the event loop and the DB executor
+        self._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="persistence")
+        self._connection = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        with self._connection:
+            for statement in self.SCHEMA:
+                self._connection.execute(statement)
+
+        # Pending writes, newest value per key wins; None marks a delete
+        self._dirty_conversations = {}
+        self._dirty_users = {}
+        self._dirty_sessions = set()
+        self._flush_task = None
+        self.stats = {
+            'flushes': 0,
+            'rows_written': 0,
+            'flush_errors': 0,
+        }
+
+        if sessions is not None:
+            self._restore_sessions()
+            sessions.on_change = self._session_changed
+
+    def _restore_sessions(self):
+        """Reload session store entries that were not idle past the store's TTL at shutdown"""
+        cutoff = time.time() - self.sessions.idle_ttl
+        rows = self._connection.execute(
+            "SELECT session_key, value FROM sessions WHERE updated_at >= ?", (cutoff,)
+        ).fetchall()
+        for key, value in rows:
+            try:
+                self.sessions.set(pickle.loads(key), pickle.loads(value))
+            except Exception as e:
+                logger.warning(f"Skipping unreadable session entry: {e}")
+        logger.info(f"Restored {len(rows)} sessions from {self.path}")
+
+    def _session_changed(self, key):
+        self._dirty_sessions.add(key)
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Start one background write for everything marked dirty, unless one is already pending"""
+        if self._flush_task is not None and not self._flush_task.done():
+            return
+        try:
+            self._flush_task = asyncio.get_running_loop().create_task(self._write_pending())
+        except RuntimeError:
+            # No loop (e.g. a session touched during startup); the next flush picks it up
+            pass
+
+    def _take_pending(self):
+        """Serialize and clear the pending writes; runs on the event loop so values are not mutated meanwhile"""
+        conversations = [
+            (name, json.dumps(key), None if state is None else pickle.dumps(state))
+            for (name, key), state in self._dirty_conversations.items()
+        ]
+        users = [
+            (user_id, None if data is None else pickle.dumps(data))
+            for user_id, data in self._dirty_users.items()
+        ]
+        sessions = []
+        now = time.time()
+        for key in self._dirty_sessions:
+            value = self.sessions.peek(key)
+            sessions.append((pickle.dumps(key), None if value is None else pickle.dumps(value), now))
+        self._dirty_conversations = {}
+        self._dirty_users = {}
+        self._dirty_sessions = set()
+        return conversations, users, sessions
+
+    def _write(self, conversations, users, sessions):
+        with self._connection:
+            for name, key, state in conversations:
+                if state is None:
+                    self._connection.execute(
+                        "DELETE FROM conversations WHERE name = ? AND conversation_key = ?", (name, key)
+                    )
+                else:
+                    self._connection.execute(
+                        "INSERT OR REPLACE INTO conversations VALUES (?, ?, ?)", (name, key, state)
+                    )
+            for user_id, data in users:
+                if data is None:
+                    self._connection.execute("DELETE FROM user_data WHERE user_id = ?", (user_id,))
+                else:
+                    self._connection.execute("INSERT OR REPLACE INTO user_data VALUES (?, ?)", (user_id, data))
+            for key, value, updated_at in sessions:
+                if value is None:
+                    self._connection.execute("DELETE FROM sessions WHERE session_key = ?", (key,))
+                else:
+                    self._connection.execute("INSERT OR REPLACE INTO sessions VALUES (?, ?, ?)", (key, value, updated_at))
+
+    async def _write_pending(self):
+        conversations, users, sessions = self._take_pending()
+        if not (conversations or users or sessions):
+            return
+        try:
+            await asyncio.get_running_loop().run_in_executor(
+                self._executor, self._write, conversations, users, sessions
+            )
+            self.stats['flushes'] += 1
+            self.stats['rows_written'] += len(conversations) + len(users) + len(sessions)
+        except Exception as e:
+            self.stats['flush_errors'] += 1
+            logger.error(f"Persistence write failed, {len(conversations) + len(users) + len(sessions)} rows lost: {e}")
+
+    def _load_blobs(self, query, params=()):
+        return self._connection.execute(query, params).fetchall()
+
+    async def get_user_data(self):
+        rows = self._load_blobs("SELECT user_id, data FROM user_data")
+        return {user_id: pickle.loads(data) for user_id, data in rows}
+
+    async def get_chat_data(self):
+        return {}
+
+    async def get_bot_data(self):
+        return {}
+
+    async def get_callback_data(self):
+        return None
+
+    async def get_conversations(self, name):
+        rows = self._load_blobs("SELECT conversation_key, state FROM conversations WHERE name = ?", (name,))
+        return {tuple(json.loads(key)): pickle.loads(state) for key, state in rows}
+
+    async def update_conversation(self, name, key, new_state):
+        self._dirty_conversations[(name, key)] = new_state
+        self._schedule_flush()
+
+    async def update_user_data(self, user_id, data):
+        self._dirty_users[user_id] = data
+        self._schedule_flush()
+
+    async def update_chat_data(self, chat_id, data):
+        pass
+
+    async def update_bot_data(self, data):
+        pass
+
+    async def update_callback_data(self, data):
+        pass
+
+    async def drop_chat_data(self, chat_id):
+        pass
+
+    async def drop_user_data(self, user_id):
+        self._dirty_users[user_id] = None
+        self._schedule_flush()
+
+    async def refresh_user_data(self, user_id, user_data):
+        pass
+
+    async def refresh_chat_data(self, chat_id, chat_data):
+        pass
+
+    async def refresh_bot_data(self, bot_data):
+        pass
+
+    async def flush(self):
+        """Write whatever is still pending; called by the Application on shutdown"""
+        if self._flush_task is not None:
+            await self._flush_task
+        await self._write_pending()
+        self._executor.shutdown(wait=True)
+        self._connection.close()
+        logger.info(f"Persistence flushed: {self.get_stats()}")
+
+    def get_stats(self):
+        """Counters plus writes still pending"""
+        stats = dict(self.stats)
+        stats['pending'] = len(self._dirty_conversations) + len(self._dirty_users) + len(self._dirty_sessions)
+        return stats
@@ -0,0 +1,184 @@
+import logging
+import sys
+import time
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+class CompactRows:
+    """Read-only row list stored as one shared column tuple plus a value tuple per row
+
+    Indexing returns a plain dict built on demand, so callers keep using row.get(...)
+    while the stored form carries no per-row key strings or dict overhead.
+    """
+
+    __slots__ = ("columns", "rows")
+
+    def __init__(self, columns, rows):
+        self.columns = columns
+        self.rows = rows
+
+    @classmethod
+    def from_dicts(cls, dict_rows):
+        if not dict_rows:
+            return cls((), ())
+        columns = tuple(dict_rows[0].keys())
+        return cls(columns, tuple(tuple(row.get(column) for column in columns) for row in dict_rows))
+
+    def __len__(self):
+        return len(self.rows)
+
+    def __bool__(self):
+        return bool(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return CompactRows(self.columns, self.rows[index])
+        return dict(zip(self.columns, self.rows[index]))
+
+    def __iter__(self):
+        columns = self.columns
+        for values in self.rows:
+            yield dict(zip(columns, values))
+
+def compact(value):
+    """Store lists of dict rows as CompactRows and record lists as tuples; anything else as is"""
+    # List subclasses carry extra attributes (e.g. an offline snapshot's as_of); keep them whole
+    if type(value) is list and value:
+        if all(isinstance(row, dict) for row in value):
+            return CompactRows.from_dicts(value)
+        # Records are already compact; a tuple just drops the list's spare capacity
+        return tuple(value)
+    return value
+
+def estimate_size(value, _seen=None):
+    """Approximate deep size in bytes of a stored value"""
+    seen = _seen if _seen is not None else set()
+    if id(value) in seen:
+        return 0
+    seen.add(id(value))
+    size = sys.getsizeof(value)
+    if isinstance(value, CompactRows):
+        size += estimate_size(value.columns, seen) + estimate_size(value.rows, seen)
+    elif isinstance(value, dict):
+        size += sum(estimate_size(k, seen) + estimate_size(v, seen) for k, v in value.items())
+    elif isinstance(value, (list, tuple, set, frozenset)):
+        size += sum(estimate_size(item, seen) for item in value)
+    elif hasattr(value, "__slots__"):
+        size += sum(estimate_size(getattr(value, slot, None), seen) for slot in value.__slots__)
+    return size
+
+class SessionStore:
+    """Per-user session data bounded by an LRU entry cap, an idle TTL and a memory budget"""
+
+    def __init__(self, max_entries, idle_ttl, max_bytes, on_change=None):
+        self.max_entries = max_entries
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        # Called with the key whenever an entry is stored or removed (e.g. by persistence)
+        self.on_change = on_change
+        self._entries = OrderedDict()  # key -> (value, size, last_access), least recently used first
+        self._total_bytes = 0
+        self.stats = {
+            'hits': 0,
+            'misses': 0,
+            'evictions_lru': 0,
+            'evictions_idle': 0,
+            'evictions_memory': 0,
+        }
+
+    def _notify(self, key):
+        if self.on_change is not None:
+            self.on_change(key)
+
+    def _remove(self, key):
+        value, size, _ = self._entries.pop(key)
+        self._total_bytes -= size
+        self._notify(key)
+        return value
+
+    def _expire_idle(self, now):
+        """Drop entries idle longer than idle_ttl; they sit at the front of the LRU order"""
+        while self._entries:
+            key, (_, _, last_access) = next(iter(self._entries.items()))
+            if now - last_access <= self.idle_ttl:
+                break
+            self._remove(key)
+            self.stats['evictions_idle'] += 1
+
+    def _enforce_limits(self, keep_key):
+        while len(self._entries) > self.max_entries:
+            self._remove(next(iter(self._entries)))
+            self.stats['evictions_lru'] += 1
+        while self._total_bytes > self.max_bytes and len(self._entries) > 1:
+            key = next(iter(self._entries))
+            if key == keep_key:
+                break
+            self._remove(key)
+            self.stats['evictions_memory'] += 1
+
+    def get(self, key, default=None):
+        now = time.monotonic()
+        entry = self._entries.get(key)
+        if entry is None or now - entry[2] > self.idle_ttl:
+            if entry is not None:
+                self._remove(key)
+                self.stats['evictions_idle'] += 1
+            self.stats['misses'] += 1
+            return default
+        self._entries[key] = (entry[0], entry[1], now)
+        self._entries.move_to_end(key)
+        self.stats['hits'] += 1
+        return entry[0]
+
+    def set(self, key, value):
+        now = time.monotonic()
+        if key in self._entries:
+            self._remove(key)
+        value = compact(value)
+        size = estimate_size(value)
+        self._entries[key] = (value, size, now)
+        self._total_bytes += size
+        self._notify(key)
+        self._expire_idle(now)
+        self._enforce_limits(key)
+
+    def peek(self, key, default=None):
+        """Stored value without refreshing its LRU position or idle time"""
+        entry = self._entries.get(key)
+        return default if entry is None else entry[0]
+
+    def pop(self, key, default=None):
+        if key in self._entries:
+            return self._remove(key)
+        return default
+
+    def __contains__(self, key):
+        entry = self._entries.get(key)
+        return entry is not None and time.monotonic() - entry[2] <= self.idle_ttl
+
+    def __getitem__(self, key):
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __setitem__(self, key, value):
+        self.set(key, value)
+
+    def __delitem__(self, key):
+        if key not in self._entries:
+            raise KeyError(key)
+        self._remove(key)
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get_stats(self):
+        """Counters plus current occupancy"""
+        stats = dict(self.stats)
+        stats['entries'] = len(self._entries)
+        stats['bytes'] = self._total_bytes
+        return stats
+
+_MISSING = object()
@@ -0,0 +1,131 @@
+import asyncio
+import logging
+import multiprocessing
+import signal
+from telegram import Update
+from telegram.ext import Application, TypeHandler
+from utils.update_processor import ordering_key
+
+logger = logging.getLogger(__name__)
+
+# Sentinel put on a worker queue to make the worker finish its pending updates and exit
+STOP = None
+
+def shard_for(update, shard_count):
+    """Worker index for an update; all updates of one chat go to the same worker"""
+    key = ordering_key(update)
+    if key is None:
+        return 0
+    if isinstance(key, tuple):
+        key = key[1]
+    return key % shard_count
+
+async def _serve_worker(application, shard, queue):
+    loop = asyncio.get_running_loop()
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+        await application.start()
+        logger.info(f"Worker {shard} ready")
+        try:
+            while True:
+                data = await loop.run_in_executor(None, queue.get)
+                if data is STOP:
+                    break
+                update = Update.de_json(data, application.bot)
+                if update:
+                    await application.update_queue.put(update)
+            # Let already queued updates finish before stopping
+            await application.update_queue.join()
+        finally:
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+    if application.post_shutdown:
+        await application.post_shutdown(application)
+
+def run_worker(create_application, shard, queue):
+    """Worker process entry point: the full handler stack without an updater, fed from queue"""
+    # Ctrl+C reaches the whole process group; workers stop on the front's STOP sentinel instead
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    application = create_application(with_updater=False, worker_index=shard)
+    asyncio.run(_serve_worker(application, shard, queue))
+    logger.info(f"Worker {shard} stopped")
+
+class ShardedDispatcher:
+    """Front-process side of worker mode: forwards each update to the worker owning its chat
+
+    Conversation state, user sessions, caches and DB pools live in the worker processes.
+    A chat always maps to the same worker, so its state stays local to that process and
+    is persisted in that worker's own file.
+    """
+
+    def __init__(self, create_application, worker_count):
+        self.create_application = create_application
+        self.worker_count = worker_count
+        self._context = multiprocessing.get_context("spawn")
+        self._queues = [self._context.Queue() for _ in range(worker_count)]
+        self._processes = [None] * worker_count
+        self.stats = {
+            'forwarded': 0,
+            'restarts': 0,
+        }
+
+    def _start_worker(self, shard):
+        process = self._context.Process(
+            target=run_worker,
+            args=(self.create_application, shard, self._queues[shard]),
+            name=f"bot-worker-{shard}",
+            daemon=False
+        )
+        process.start()
+        self._processes[shard] = process
+        logger.info(f"Started worker {shard} (pid {process.pid})")
+
+    async def start(self, application):
+        """post_init hook of the front application"""
+        for shard in range(self.worker_count):
+            self._start_worker(shard)
+
+    async def stop(self, application):
+        """post_shutdown hook of the front application"""
+        for queue in self._queues:
+            queue.put(STOP)
+        loop = asyncio.get_running_loop()
+        for shard, process in enumerate(self._processes):
+            if process is None:
+                continue
+            await loop.run_in_executor(None, process.join, 30)
+            if process.is_alive():
+                logger.warning(f"Worker {shard} did not stop in time, terminating")
+                process.terminate()
+
+    async def forward(self, update, context):
+        """Catch-all handler of the front application"""
+        shard = shard_for(update, self.worker_count)
+        if not self._processes[shard].is_alive():
+            logger.error(f"Worker {shard} exited with code {self._processes[shard].exitcode}, restarting")
+            self.stats['restarts'] += 1
+            # A worker killed inside queue.get() leaves the queue's reader lock held for good
+            self._queues[shard] = self._context.Queue()
+            self._start_worker(shard)
+        self._queues[shard].put(update.to_dict())
+        self.stats['forwarded'] += 1
+
+    def build_front_application(self, token):
+        """Application that only receives updates (polling or webhook) and forwards them"""
+        application = (
+            Application.builder()
+            .token(token)
+            .post_init(self.start)
+            .post_shutdown(self.stop)
+            .build()
+        )
+        application.add_handler(TypeHandler(Update, self.forward))
+        return application
+
+    def get_stats(self):
+        """Counters plus per-worker liveness"""
+        stats = dict(self.stats)
+        stats['workers_alive'] = sum(1 for process in self._processes if process and process.is_alive())
+        return stats
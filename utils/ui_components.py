@@ -1,16 +1,30 @@
 """UI component utilities for creating consistent keyboard layouts"""
 
-from telegram import InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import InlineKeyboardButton, InlineKeyboardMarkup, KeyboardButton, ReplyKeyboardMarkup
+
+# Built keyboards keyed by name, stored with the data version they were built from
+_keyboard_cache = {}
 
 class KeyboardBuilder:
     """Helper class for building consistent keyboard layouts"""
     
+    @staticmethod
+    def cached_keyboard(key, version, build, *args):
+        """Return the keyboard cached under key, rebuilding it only when version changes"""
+        cached = _keyboard_cache.get(key)
+        if cached is not None and cached[0] == version:
+            return cached[1]
+        reply_markup = build(*args)
+        _keyboard_cache[key] = (version, reply_markup)
+        return reply_markup
+    
     @staticmethod
     def main_menu_keyboard():
         """Build main menu keyboard"""
         return InlineKeyboardMarkup([
             [InlineKeyboardButton("📊 Cek Ketersediaan Port", callback_data="check_ports")],
-            [InlineKeyboardButton("👥 Cari Customer", callback_data="find_customer")]
+            [InlineKeyboardButton("👥 Cari Customer", callback_data="find_customer")],
+            [InlineKeyboardButton("📍 ODP Terdekat", callback_data="nearest_odp")]
         ])
     
     @staticmethod
@@ -19,6 +33,8 @@ class KeyboardBuilder:
         return InlineKeyboardMarkup([
             [InlineKeyboardButton("🔍 Cari berdasarkan Lokasi", callback_data="customer_by_location")],
             [InlineKeyboardButton("🔎 Cari Nama Customer", callback_data="customer_by_name")],
+            [InlineKeyboardButton("📞 Cari No. WA", callback_data="customer_by_phone")],
+            [InlineKeyboardButton("🏠 Cari Alamat", callback_data="customer_by_address")],
             [InlineKeyboardButton("🏠 Menu Utama", callback_data="back_to_main_menu")]
         ])
     
@@ -62,6 +78,51 @@ class KeyboardBuilder:
             [InlineKeyboardButton("❌ Selesai", callback_data="finish")]
         ])
     
+    @staticmethod
+    def port_page_keyboard(page_index, page_count, odc_pages, max_odc_buttons=30):
+        """Build paged port view keyboard: page buttons, ODC jump list, then port navigation"""
+        keyboard = []
+        if page_count > 1:
+            page_buttons = []
+            if page_index > 0:
+                page_buttons.append(InlineKeyboardButton("⬅️", callback_data=f"port_page_{page_index - 1}"))
+            page_buttons.append(InlineKeyboardButton(f"{page_index + 1}/{page_count}", callback_data="port_page_noop"))
+            if page_index < page_count - 1:
+                page_buttons.append(InlineKeyboardButton("➡️", callback_data=f"port_page_{page_index + 1}"))
+            keyboard.append(page_buttons)
+            
+            # Jump straight to the page where each ODC starts, three per row; ODCs starting on
+            # the page shown do nothing, since re-sending the same page is rejected by Telegram
+            odc_buttons = [
+                InlineKeyboardButton(
+                    f"🔌 {odc_code}",
+                    callback_data="port_page_noop" if odc_page == page_index else f"port_page_{odc_page}"
+                )
+                for odc_code, odc_page in odc_pages[:max_odc_buttons]
+            ]
+            keyboard.extend(odc_buttons[i:i + 3] for i in range(0, len(odc_buttons), 3))
+        
+        keyboard.extend(KeyboardBuilder.port_navigation_keyboard().inline_keyboard)
+        return InlineKeyboardMarkup(keyboard)
+    
+    @staticmethod
+    def share_location_keyboard():
+        """Build the reply keyboard whose button sends the user's current location"""
+        return ReplyKeyboardMarkup(
+            [[KeyboardButton("📍 Kirim Lokasi Saya", request_location=True)]],
+            resize_keyboard=True,
+            one_time_keyboard=True
+        )
+    
+    @staticmethod
+    def nearest_odp_keyboard():
+        """Build nearest ODP results navigation keyboard"""
+        return InlineKeyboardMarkup([
+            [InlineKeyboardButton("📍 Cari dari Lokasi Lain", callback_data="nearest_odp")],
+            [InlineKeyboardButton("🏠 Menu Utama", callback_data="back_to_main_menu")],
+            [InlineKeyboardButton("❌ Selesai", callback_data="finish")]
+        ])
+    
     @staticmethod
     def customer_navigation_keyboard():
         """Build customer lookup navigation keyboard"""
@@ -73,9 +134,15 @@ class KeyboardBuilder:
         ])
     
     @staticmethod
-    def search_results_keyboard():
-        """Build search results navigation keyboard"""
-        return InlineKeyboardMarkup([
+    def search_results_keyboard(has_previous=False, has_next=False):
+        """Build search results navigation keyboard, with page buttons when there are more results"""
+        page_buttons = []
+        if has_previous:
+            page_buttons.append(InlineKeyboardButton("⬅️ Sebelumnya", callback_data="search_page_prev"))
+        if has_next:
+            page_buttons.append(InlineKeyboardButton("Berikutnya ➡️", callback_data="search_page_next"))
+        
+        return InlineKeyboardMarkup(([page_buttons] if page_buttons else []) + [
             [InlineKeyboardButton("🔎 Cari Lagi", callback_data="customer_by_name")],
             [InlineKeyboardButton("🔍 Cari berdasarkan Lokasi", callback_data="customer_by_location")],
             [InlineKeyboardButton("🏠 Menu Utama", callback_data="back_to_main_menu")],
@@ -83,9 +150,13 @@ class KeyboardBuilder:
         ])
     
     @staticmethod
-    def no_results_keyboard():
-        """Build no results keyboard"""
-        return InlineKeyboardMarkup([
+    def no_results_keyboard(suggestions=None):
+        """Build no results keyboard, with one button per suggested customer"""
+        keyboard = [
+            [InlineKeyboardButton(f"👤 {name}", callback_data=f"suggest_{customer_id}")]
+            for customer_id, name in suggestions or []
+        ]
+        return InlineKeyboardMarkup(keyboard + [
             [InlineKeyboardButton("🔎 Cari Lagi", callback_data="customer_by_name")],
             [InlineKeyboardButton("🔍 Cari berdasarkan Lokasi", callback_data="customer_by_location")],
             [InlineKeyboardButton("🏠 Menu Utama", callback_data="back_to_main_menu")]
@@ -102,7 +173,9 @@ class MessageTemplates:
     CUSTOMER_LOOKUP_MESSAGE = (
         "🔍 Opsi Pencarian Customer:\n\n"
         "📍 Cari berdasarkan Lokasi - Cari customer berdasarkan ODP\n"
-        "🔎 Cari berdasarkan Nama - Cari customer langsung berdasarkan nama"
+        "🔎 Cari berdasarkan Nama - Cari customer langsung berdasarkan nama\n"
+        "📞 Cari No. WA - Cari customer berdasarkan nomor WhatsApp\n"
+        "🏠 Cari Alamat - Cari customer berdasarkan kata di alamat"
     )
     
     SEARCH_PROMPT_MESSAGE = (
@@ -113,11 +186,42 @@ class MessageTemplates:
         "- Gunakan /cancel untuk membatalkan pencarian"
     )
     
+    PHONE_SEARCH_PROMPT_MESSAGE = (
+        "📞 Silakan ketik nomor WhatsApp customer:\n\n"
+        "💡 Tips:\n"
+        "- Format +62, 62 atau 0 di depan sama saja (contoh: '0812-3456-789' atau '+62 812 3456 789')\n"
+        "- Anda juga dapat mengetik beberapa digit awal atau akhir nomor\n"
+        "- Gunakan /cancel untuk membatalkan pencarian"
+    )
+    
+    ADDRESS_SEARCH_PROMPT_MESSAGE = (
+        "🏠 Silakan ketik alamat atau sebagian alamat customer:\n\n"
+        "💡 Tips:\n"
+        "- Semua kata harus ada di alamat (contoh: 'mawar 12' akan menemukan 'Jl. Mawar No. 12')\n"
+        "- Kata terakhir boleh tidak lengkap\n"
+        "- Gunakan /cancel untuk membatalkan pencarian"
+    )
+    
+    NEAREST_ODP_PROMPT_MESSAGE = (
+        "📍 Kirim lokasi Anda untuk mencari ODP terdekat yang masih punya port tersedia.\n\n"
+        "💡 Tips:\n"
+        "- Tekan tombol 'Kirim Lokasi Saya' di bawah, atau kirim lokasi lewat menu 📎\n"
+        "- Anda juga dapat mengirim lokasi kapan saja tanpa membuka menu ini\n"
+        "- Gunakan /cancel untuk membatalkan"
+    )
+    
     LOADING_MESSAGE = "⏳ Loading..."
     SEARCHING_MESSAGE = "🔍 Mencari Customer..."
     
     @staticmethod
-    def no_customers_found(search_term):
+    def no_customers_found(search_term, suggestions=None):
+        if suggestions:
+            names = "\n".join(f"• {name}" for _, name in suggestions)
+            return (
+                f"❌ Tidak ditemukan customer untuk '{search_term}'\n\n"
+                f"Mungkin maksud Anda:\n{names}\n\n"
+                f"Pilih salah satu nama di bawah atau cari lagi."
+            )
         return (
             f"❌ Tidak ditemukan customer untuk '{search_term}'\n\n"
             f"Saran:\n"
@@ -0,0 +1,93 @@
+import asyncio
+import logging
+from telegram import Update
+from telegram.ext import BaseUpdateProcessor
+
+logger = logging.getLogger(__name__)
+
+def ordering_key(update):
+    """Chat id, or user id for chatless updates (inline queries); None means no ordering needed"""
+    if not isinstance(update, Update):
+        return None
+    if update.effective_chat:
+        return update.effective_chat.id
+    if update.effective_user:
+        return ("user", update.effective_user.id)
+    return None
+
+class PerChatUpdateProcessor(BaseUpdateProcessor):
+    """Processes updates from different chats concurrently and updates from one chat in order
+
+    ConversationHandler keeps one state per chat/user and assumes that chat's updates are
+    handled one by one. Each update first waits for its chat's lock (asyncio locks wake
+    waiters in FIFO order, i.e. arrival order) and then for a slot of the global limit.
+    """
+
+    def __init__(self, max_concurrent_updates):
+        super().__init__(max_concurrent_updates)
+        self._chat_locks = {}  # ordering key -> [lock, updates holding or waiting for it]
+        self._pending = 0
+        self._running = 0
+        self.stats = {
+            'processed': 0,
+            'failed': 0,
+            'max_pending': 0,
+        }
+
+    async def process_update(self, update, coroutine):
+        self._pending += 1
+        self.stats['max_pending'] = max(self.stats['max_pending'], self._pending)
+        logger.debug(f"Update queue depth: {self.queue_depth} waiting, {self._running} running")
+        key = ordering_key(update)
+        try:
+            if key is None:
+                await super().process_update(update, coroutine)
+                return
+
+            entry = self._chat_locks.get(key)
+            if entry is None:
+                entry = self._chat_locks[key] = [asyncio.Lock(), 0]
+            entry[1] += 1
+            try:
+                async with entry[0]:
+                    await super().process_update(update, coroutine)
+            finally:
+                entry[1] -= 1
+                if entry[1] == 0:
+                    del self._chat_locks[key]
+        finally:
+            self._pending -= 1
+
+    async def do_process_update(self, update, coroutine):
+        self._running += 1
+        try:
+            await coroutine
+            self.stats['processed'] += 1
+        except Exception:
+            # Application.process_update already routes handler errors to error handlers
+            self.stats['failed'] += 1
+            raise
+        finally:
+            self._running -= 1
+
+    async def initialize(self):
+        pass
+
+    async def shutdown(self):
+        if self._pending:
+            logger.info(f"Update processor shutting down with {self._pending} updates still pending")
+
+    @property
+    def queue_depth(self):
+        """Updates received but not yet being handled (waiting on their chat or the global limit)"""
+        return self._pending - self._running
+
+    def get_stats(self):
+        """Counters plus current queue depth"""
+        stats = dict(self.stats)
+        stats['pending'] = self._pending
+        stats['running'] = self._running
+        stats['queue_depth'] = self.queue_depth
+        stats['active_chats'] = len(self._chat_locks)
+        stats['limit'] = self.max_concurrent_updates
+        return stats
@@ -0,0 +1,84 @@
+import asyncio
+import json
+import logging
+import signal
+from telegram import Update
+from tornado.httpserver import HTTPServer
+from tornado.web import Application as TornadoApplication, RequestHandler
+
+logger = logging.getLogger(__name__)
+
+class TelegramWebhookHandler(RequestHandler):
+    """Accepts Update JSON POSTed by Telegram (or a local stand-in) and queues it"""
+
+    SUPPORTED_METHODS = ("POST",)
+
+    def initialize(self, bot_application, secret_token):
+        self.bot_application = bot_application
+        self.secret_token = secret_token
+
+    async def post(self):
+        if self.secret_token and self.request.headers.get("X-Telegram-Bot-Api-Secret-Token") != self.secret_token:
+            logger.warning(f"Rejected webhook request with bad secret token from {self.request.remote_ip}")
+            self.set_status(403)
+            return
+
+        try:
+            data = json.loads(self.request.body)
+        except ValueError:
+            self.set_status(400)
+            return
+
+        update = Update.de_json(data, self.bot_application.bot)
+        if update:
+            await self.bot_application.update_queue.put(update)
+        self.set_status(200)
+
+    def log_exception(self, typ, value, tb):
+        logger.error(f"Error handling webhook request: {value}")
+
+
+async def run_webhook_server(application, listen, port, url_path, secret_token=None,
+                             webhook_url=None, max_connections=40):
+    """Serve the application from an embedded HTTP server until SIGINT/SIGTERM
+
+    The webhook is registered with Telegram only when webhook_url is given, so the
+    same server can be run locally and fed synthetic updates by a stand-in.
+    """
+    path = "/" + url_path.strip("/")
+    server = HTTPServer(TornadoApplication([
+        (path, TelegramWebhookHandler, {'bot_application': application, 'secret_token': secret_token})
+    ]))
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for stop_signal in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(stop_signal, stop_event.set)
+
+    async with application:
+        if application.post_init:
+            await application.post_init(application)
+
+        if webhook_url:
+            await application.bot.set_webhook(
+                url=webhook_url,
+                secret_token=secret_token,
+                max_connections=max_connections,
+                allowed_updates=Update.ALL_TYPES
+            )
+            logger.info(f"Webhook registered at {webhook_url}")
+
+        await application.start()
+        server.listen(port, address=listen)
+        logger.info(f"Webhook server listening on {listen}:{port}{path}")
+
+        try:
+            await stop_event.wait()
+        finally:
+            server.stop()
+            await application.stop()
+            if application.post_stop:
+                await application.post_stop(application)
+
+    if application.post_shutdown:
+        await application.post_shutdown(application)